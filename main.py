@@ -1,9 +1,13 @@
-from contextlib import redirect_stdout
+import argparse
+import bisect
 import sys
 import html
 import re
-from PySide6.QtCore import QPoint, Qt
-from PySide6.QtGui import QTextCursor, QIntValidator
+import time
+from array import array
+from dataclasses import asdict, replace
+from PySide6.QtCore import QAbstractTableModel, QModelIndex, QPoint, Qt, QTimer
+from PySide6.QtGui import QIntValidator, QKeySequence, QShortcut, QTextCursor
 from PySide6.QtWidgets import (
     QApplication,
     QLabel,
@@ -12,12 +16,15 @@ from PySide6.QtWidgets import (
     QLineEdit,
     QMainWindow,
     QTextEdit,
+    QTableView,
+    QHeaderView,
     QPushButton,
     QRadioButton,
     QVBoxLayout,
     QWidget,
-    QDialog,
     QCheckBox,
+    QComboBox,
+    QCompleter,
     QSizeGrip,
 )
 from tavist.model import (
@@ -30,13 +37,45 @@ from tavist.model import (
     DamageType,
     Tavist,
     WeaponDamageDice,
+    expected_attack_damage,
     expected_full_attack,
-    recommend_setup,
+    expected_full_attack_by_ac,
 )
-from tavist.tracking import ACTargetTracker, format_bound, accumulate_known_hits, damage_for_hit
+from tavist.events import (
+    AttackResolved,
+    EventBus,
+    FullAttackSummary,
+    RecommendationChanged,
+    TrackerUpdated,
+    terminal_sink,
+)
+from tavist.instrument import INSTRUMENTS, timed, timer
+from tavist.journal import DEFAULT_JOURNAL_PATH, SessionJournal, SessionState
+from tavist.library import OpponentLibrary
+from tavist.profiling import ProfileCapture, default_regions, source_region
+from tavist.stats import CombatStats, load_history, save_history
+from tavist.gridcache import GridCache, grid_key, iter_dpr_grid, load_dpr_grid
+from tavist.outcomes import full_attack_pmf, pmf_mean, prob_at_least
+from tavist.target import Target, parse_target_spec
+from tavist.recommend import (
+    AnytimeRecommender,
+    Prefetcher,
+    RecommendationCache,
+    SetupChoice,
+    recommend_for_targets,
+    recommend_joint_setup,
+    setup_modes,
+)
+from tavist.tracking import ACTargetTracker, TrackerRegistry, format_bound, accumulate_known_hits, damage_for_hit
 from tavist.controller import (
+    AttackLineIndex,
+    CandidateIndex,
     apply_tracking_selection,
+    compute_damage_for_ac,
     format_attack_line,
+    full_attack_sequence,
+    parse_result_filter,
+    result_field,
     summarize_damage_ranges,
 )
 
@@ -205,6 +244,213 @@ class TitleBar(QWidget):
         self.oldPos = None
 
 
+class AttackTableModel(QAbstractTableModel):
+    # every attack of the session, one row each; sorting and filtering happen here on
+    # row indices, and the view only asks for the cells it draws
+    FIXED_COLUMNS = [
+        ("round", "Round"),
+        ("label", "Attack"),
+        ("total", "Total"),
+        ("die", "d20"),
+        ("threat", "Threat"),
+        ("confirm", "Confirm"),
+        ("normal", "Normal"),
+        ("critical", "Critical"),
+    ]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._results: list[dict] = []
+        self._rounds = array("I")
+        self._labels: list[str] = []
+        self._rounds_seen = 0
+        # visible result indices in ascending sort order, with their sort keys
+        self._rows: list[int] = []
+        self._keys: list[tuple] = []
+        self._sort_column = -1
+        self._descending = False
+        self._filter = None
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.FIXED_COLUMNS) + len(self._labels)
+
+    def headerData(self, section: int, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or orientation != Qt.Horizontal:
+            return super().headerData(section, orientation, role)
+        if section < len(self.FIXED_COLUMNS):
+            return self.FIXED_COLUMNS[section][1]
+        return self._labels[section - len(self.FIXED_COLUMNS)]
+
+    def result_index(self, row: int) -> int:
+        return self._rows[-1 - row if self._descending else row]
+
+    def value(self, idx: int, column: int):
+        if column == 0:
+            return self._rounds[idx]
+        if column < len(self.FIXED_COLUMNS):
+            return result_field(self._results[idx], self.FIXED_COLUMNS[column][0])
+        return self._results[idx]["breakdown_normal"].get(self._labels[column - len(self.FIXED_COLUMNS)])
+
+    def data(self, index: QModelIndex, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        idx, column = self.result_index(index.row()), index.column()
+        if role == Qt.DisplayRole:
+            value = self.value(idx, column)
+            if isinstance(value, bool):
+                return "yes" if value else ""
+            if column >= len(self.FIXED_COLUMNS):
+                crit = self._results[idx]["breakdown_critical"].get(self._labels[column - len(self.FIXED_COLUMNS)])
+                if crit is not None and crit != value:
+                    return f"{value or 0} / {crit}"
+            return "" if value is None else str(value)
+        if role == Qt.UserRole:
+            return self.value(idx, column)
+        if role == Qt.ToolTipRole and column == 1:
+            return format_attack_line(self._results[idx], None)
+        if role == Qt.TextAlignmentRole and column != 1:
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        return None
+
+    def _key(self, idx: int) -> tuple:
+        value = self.value(idx, self._sort_column)
+        # blanks sort after every value; the result index keeps equal values in roll order
+        return (value is None, 0 if value is None else value, idx)
+
+    def _visible(self, idx: int) -> bool:
+        return self._filter is None or self._filter(self._results[idx])
+
+    def _rebuild(self):
+        self.beginResetModel()
+        try:
+            self._rows = [idx for idx in range(len(self._results)) if self._visible(idx)]
+            self._keys = []
+            if self._sort_column >= 0:
+                self._keys = sorted(self._key(idx) for idx in self._rows)
+                self._rows = [key[-1] for key in self._keys]
+        finally:
+            # a failing filter must not leave attached views stuck mid-reset
+            self.endResetModel()
+
+    def sort(self, column: int, order=Qt.AscendingOrder):
+        self._sort_column = column if 0 <= column < self.columnCount() else -1
+        self._descending = self._sort_column >= 0 and order == Qt.DescendingOrder
+        self._rebuild()
+
+    def set_filter(self, text: str):
+        self._filter = parse_result_filter(text)
+        self._rebuild()
+
+    def append_round(self, results: list[dict]):
+        self._rounds_seen += 1
+        new_labels = sorted({label for r in results for label in r["breakdown_normal"]} - set(self._labels))
+        if new_labels:
+            first = self.columnCount()
+            self.beginInsertColumns(QModelIndex(), first, first + len(new_labels) - 1)
+            self._labels += new_labels
+            self.endInsertColumns()
+        added = []
+        for r in results:
+            self._results.append(r)
+            self._rounds.append(self._rounds_seen)
+            if self._visible(len(self._results) - 1):
+                added.append(len(self._results) - 1)
+        if self._sort_column < 0:
+            if added:
+                self.beginInsertRows(QModelIndex(), len(self._rows), len(self._rows) + len(added) - 1)
+                self._rows += added
+                self.endInsertRows()
+            return
+        for idx in added:
+            key = self._key(idx)
+            pos = bisect.bisect_left(self._keys, key)
+            row = len(self._rows) - pos if self._descending else pos
+            self.beginInsertRows(QModelIndex(), row, row)
+            self._keys.insert(pos, key)
+            self._rows.insert(pos, idx)
+            self.endInsertRows()
+
+    def rows(self) -> list[dict]:
+        # the visible results in display order
+        return [self._results[self.result_index(row)] for row in range(len(self._rows))]
+
+
+class TrackingPanel(QGroupBox):
+    # lives in the main window and is refilled in place after each attack
+    def __init__(self, parent=None):
+        super().__init__("Attack Results", parent)
+        layout = QVBoxLayout(self)
+        self.bound_label = QLabel()
+        layout.addWidget(self.bound_label)
+        layout.addWidget(QLabel("Select the lowest-AC attack that HIT, or All Misses."))
+        self.buttons: list[QPushButton] = []
+        self._button_layout = QVBoxLayout()
+        layout.addLayout(self._button_layout)
+        actions = QHBoxLayout()
+        self.miss_button = QPushButton("All Misses")
+        self.miss_button.clicked.connect(lambda: self._finish({"all_miss": True}))
+        self.cancel_button = QPushButton("Cancel")
+        self.cancel_button.clicked.connect(lambda: self._finish(None))
+        actions.addWidget(self.miss_button)
+        actions.addWidget(self.cancel_button)
+        layout.addLayout(actions)
+        self._totals: list[int] = []
+        self._on_select = None
+        self._on_cancel = None
+        self.hide()
+
+    def _button(self, idx: int) -> QPushButton:
+        while len(self.buttons) <= idx:
+            btn = QPushButton()
+            btn.clicked.connect(lambda _=False, i=len(self.buttons): self._finish({"total": self._totals[i]}))
+            self._button_layout.addWidget(btn)
+            self.buttons.append(btn)
+        return self.buttons[idx]
+
+    def show_candidates(self, tracker: ACTargetTracker, candidates: list[dict], on_select, on_cancel=None):
+        # a prompt still open from an earlier attack counts as cancelled
+        self.cancel_pending()
+        self.setUpdatesEnabled(False)
+        self.bound_label.setText(f"Current AC range: {format_bound(tracker)}")
+        self._totals = [r["attack_total"] for r in candidates]
+        for idx, r in enumerate(candidates):
+            label = f"{r['label']} (AC {r['attack_total']})"
+            if r.get("threat") and r.get("confirm_total"):
+                label += f" / confirm {r['confirm_total']}"
+            btn = self._button(idx)
+            btn.setText(label)
+            btn.show()
+        for btn in self.buttons[len(candidates):]:
+            btn.hide()
+        self._on_select = on_select
+        self._on_cancel = on_cancel
+        self.setUpdatesEnabled(True)
+        self.show()
+
+    def cancel_pending(self):
+        on_cancel = self._on_cancel
+        self._on_select = self._on_cancel = None
+        if on_cancel is not None:
+            on_cancel()
+
+    def dismiss(self):
+        self.cancel_pending()
+        self.hide()
+
+    def _finish(self, selection: dict | None):
+        if selection is None:
+            self.dismiss()
+            return
+        on_select = self._on_select
+        self._on_select = self._on_cancel = None
+        self.hide()
+        if on_select is not None:
+            on_select(selection)
+
+
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -247,6 +493,11 @@ class MainWindow(QMainWindow):
         self.expertise.setValidator(int_validator)
 
         self.auto_button = QPushButton("New Opponent")
+        self.target_select = QComboBox()
+        self.opponent_name = QLineEdit()
+        self.opponent_name.setPlaceholderText("Opponent")
+        self.target_defenses = QLineEdit()
+        self.target_defenses.setPlaceholderText("DR 5/slashing, fire 10, 20%")
 
         self.two_handed = QPushButton()
         self.two_handed.setCheckable(True)
@@ -258,6 +509,10 @@ class MainWindow(QMainWindow):
         targeting_layout.addWidget(self.target_ac)
         targeting_layout.addWidget(QLabel("Combat Expertise:"))
         targeting_layout.addWidget(self.expertise)
+        targeting_layout.addWidget(QLabel("Defenses:"))
+        targeting_layout.addWidget(self.target_defenses)
+        targeting_layout.addWidget(self.target_select)
+        targeting_layout.addWidget(self.opponent_name)
         targeting_layout.addWidget(self.auto_button)
         targeting_group = QGroupBox("Targeting")
         targeting_group.setLayout(targeting_layout)
@@ -367,6 +622,9 @@ class MainWindow(QMainWindow):
         main_layout.addWidget(status_group)
         main_layout.addWidget(attacks_group)
 
+        self.tracking_panel = TrackingPanel()
+        main_layout.addWidget(self.tracking_panel)
+
         dpr_row = QHBoxLayout()
         self.dpr_label = QLabel("Expected DPR: —")
         self.ac_bound = QLabel("AC bound: ?>")
@@ -378,6 +636,10 @@ class MainWindow(QMainWindow):
         
         main_layout.addLayout(dpr_row)
 
+        self.stats_label = QLabel("No attacks yet.")
+        self.stats_label.setStyleSheet("color: #a6adc8;")
+        main_layout.addWidget(self.stats_label)
+
         self.log_output = QTextEdit()
         self.log_output.setReadOnly(True)
         self.log_output.setMinimumHeight(160)
@@ -388,6 +650,32 @@ class MainWindow(QMainWindow):
         self.log_output.setMinimumWidth(800)
         main_layout.addWidget(self.log_output)
 
+        self.results_filter = QLineEdit()
+        self.results_filter.setPlaceholderText("Filter results: first total>=25 threat fire>0")
+        main_layout.addWidget(self.results_filter)
+        self.results_model = AttackTableModel(self)
+        self.results_view = QTableView()
+        self.results_view.setModel(self.results_model)
+        # no sort until a header is clicked, so rows stay in roll order
+        self.results_view.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+        self.results_view.setSortingEnabled(True)
+        # fixed row heights let the view lay out tens of thousands of rows without measuring them
+        rows = self.results_view.verticalHeader()
+        rows.setSectionResizeMode(QHeaderView.Fixed)
+        rows.setDefaultSectionSize(self.results_view.fontMetrics().height() + 6)
+        rows.hide()
+        self.results_view.setMinimumHeight(160)
+        main_layout.addWidget(self.results_view)
+
+        # timing histograms; toggled with Ctrl+Shift+D
+        self.debug_panel = QTextEdit()
+        self.debug_panel.setReadOnly(True)
+        self.debug_panel.setLineWrapMode(QTextEdit.NoWrap)
+        self.debug_panel.setStyleSheet("font-family: monospace;")
+        self.debug_panel.setMinimumHeight(140)
+        self.debug_panel.hide()
+        main_layout.addWidget(self.debug_panel)
+
         # Add all the main controls to the content layout
         content_layout.addLayout(main_layout)
         
@@ -445,39 +733,65 @@ class MainWindow(QMainWindow):
                            rect.bottom() - self.size_grip.height() - 6)
 
 
-class DualWriter:
-    def __init__(self):
-        self.parts: list[str] = []
-
-    def write(self, text: str):
-        sys.__stdout__.write(text)
-        self.parts.append(text)
-
-    def flush(self):
-        sys.__stdout__.flush()
-
-    def text(self) -> str:
-        return "".join(self.parts)
+def render_log_line(raw_line: str) -> str:
+    escaped = raw_line.replace("&", "&amp;").replace("<", "&lt;")
+    bold_match = re.search(r"\*\*(.+?)\*\*", escaped)
+    if bold_match:
+        content = re.sub(r"\*\*(.+?)\*\*", r"\1", escaped)
+        # Gold for hits/important info
+        return f'<span style="font-weight:bold; color: #f9e2af;">{content}</span>'
+    # Subtle text for normal logs
+    return f'<span style="color: #bac2de;">{escaped}</span>'
 
 
+@timed("append_log")
 def append_log(window: MainWindow, text: str):
-    def _escape(s: str) -> str:
-        return s.replace("&", "&amp;").replace("<", "&lt;")
-
     for raw_line in text.split("\n"):
-        escaped = _escape(raw_line)
-        bold_match = re.search(r"\*\*(.+?)\*\*", escaped)
-        if bold_match:
-            content = re.sub(r"\*\*(.+?)\*\*", r"\1", escaped)
-            # Gold for hits/important info
-            window.log_output.append(f'<span style="font-weight:bold; color: #f9e2af;">{content}</span>')
-        else:
-            # Subtle text for normal logs
-            window.log_output.append(f'<span style="color: #bac2de;">{escaped}</span>')
+        window.log_output.append(render_log_line(raw_line))
     cursor = window.log_output.textCursor()
     cursor.movePosition(QTextCursor.End)
     window.log_output.setTextCursor(cursor)
     window.log_output.ensureCursorVisible()
+    # restored lines count too, so this is each entry's index in the journaled log
+    window._log_entries = getattr(window, "_log_entries", 0) + 1
+    journal = getattr(window, "_journal", None)
+    if journal is not None:
+        journal.record("log", text=text)
+
+
+def append_attack_line(window: MainWindow, result: dict, tracker: ACTargetTracker | None):
+    if tracker is None:
+        append_log(window, format_attack_line(result, tracker))
+        return
+    lines = getattr(window, "_attack_lines", None)
+    if lines is None:
+        lines = window._attack_lines = []
+    index = next((idx for idx in lines if idx.tracker is tracker), None)
+    if index is None:
+        index = AttackLineIndex(tracker)
+        lines.append(index)
+    index.refresh()
+    # the log only grows, so a line's block number is a stable handle
+    document = window.log_output.document()
+    handle = 0 if document.isEmpty() else document.blockCount()
+    if not hasattr(window, "_log_entry_of"):
+        window._log_entry_of = {}
+    window._log_entry_of[handle] = getattr(window, "_log_entries", 0)
+    append_log(window, index.add(handle, result))
+
+
+@timed("refresh_attack_lines")
+def refresh_attack_lines(window: MainWindow):
+    document = window.log_output.document()
+    journal = getattr(window, "_journal", None)
+    for index in getattr(window, "_attack_lines", []):
+        for handle, text in index.refresh():
+            cursor = QTextCursor(document.findBlockByNumber(handle))
+            cursor.movePosition(QTextCursor.EndOfBlock, QTextCursor.KeepAnchor)
+            cursor.insertHtml(render_log_line(text))
+            if journal is not None:
+                # a restored session shows the line as it reads now, not as first rolled
+                journal.record("log_edit", index=window._log_entry_of[handle], text=text)
 
 
 def make_dice_toggle(roll: DamageRoll, cond: DamageDice):
@@ -538,16 +852,35 @@ def make_power_attack_update(tavist: "Tavist"):
     return update
 
 
+def event_bus(window: MainWindow) -> EventBus:
+    # the log sink is always there; main() adds the terminal, journal and statistics
+    bus = getattr(window, "_bus", None)
+    if bus is None:
+        bus = window._bus = EventBus()
+
+        def log_sink(event: AttackResolved):
+            append_log(window, event.report())
+            append_log(window, "")
+
+        bus.subscribe(log_sink, (AttackResolved,))
+        bus.subscribe(lambda event: window.results_model.append_round(event.results), (FullAttackSummary,))
+    return bus
+
+
+def publish_tracker(window: MainWindow):
+    registry = getattr(window, "_targets", None)
+    tracker = getattr(window, "_ac_tracker", None)
+    if registry is None or tracker is None:
+        return
+    event = TrackerUpdated(registry.active, tracker.lower, tracker.upper, tracker.damage_done)
+    if getattr(window, "_last_tracker_event", None) != event:
+        window._last_tracker_event = event
+        event_bus(window).publish(event)
+
+
 def perform_attack_with_log(attack: AttackAction, window: MainWindow):
     def do_attack():
-        writer = DualWriter()
-        with redirect_stdout(writer):
-            result = attack.do_attack()
-        log_text = writer.text().rstrip()
-        if log_text:
-            append_log(window, log_text)
-            append_log(window, "")
-        return result
+        return attack.do_attack(bus=event_bus(window))
 
     return do_attack
 
@@ -562,17 +895,12 @@ def wrap_full_attack(
         append_log(window, "=== Full Attack ===")
         results: list[dict] = []
 
-        for idx, bonus in enumerate(attacks):
-            wrap_bonus_adjustment(
-                tavist.katana_attack_action, attack_names[idx], tavist.bab, bonus
-            )()
-            results.append(perform_attack_with_log(tavist.katana_attack_action, window)())
-
-        if not tavist.two_handed_mode:
-            wrap_bonus_adjustment(tavist.wakasashi_attack_action, "off-hand", tavist.bab, 12)()
-            results.append(perform_attack_with_log(tavist.wakasashi_attack_action, window)())
+        for action, name, bonus in full_attack_sequence(tavist, attacks, attack_names):
+            wrap_bonus_adjustment(action, name, tavist.bab, bonus)()
+            results.append(perform_attack_with_log(action, window)())
 
-        ranges = summarize_damage_ranges(results)
+        target = current_target(window)
+        ranges = summarize_damage_ranges(results, target)
         if ranges:
             append_log(window, "--- Damage by AC ---")
             for lower, upper, damage, breakdown in ranges:
@@ -582,20 +910,26 @@ def wrap_full_attack(
                     parts = [f"{k} {v}" for k, v in sorted(breakdown.items())]
                     return " (" + ", ".join(parts) + ")"
 
+                # how this roll sits in the exact distribution at the range's top AC; these
+                # stay in full_attack_pmf's in-memory LRU, only DPR grids go to disk
+                ac = lower + 1 if upper is None else upper
+                pmf = full_attack_pmf(tavist, ac, tavist.two_handed_mode, attacks, target)
+                odds = f" | mean {pmf_mean(pmf):.1f}, P(≥ {damage}) {prob_at_least(pmf, damage):.0%}"
                 if upper is None and lower is not None:
-                    append_log(window, f"AC > {lower}: {damage} dmg{bd_text()}")
+                    append_log(window, f"AC > {lower}: {damage} dmg{bd_text()}{odds}")
                 elif lower is None:
-                    append_log(window, f"AC ≤ {upper}: {damage} dmg{bd_text()}")
+                    append_log(window, f"AC ≤ {upper}: {damage} dmg{bd_text()}{odds}")
                 else:
-                    append_log(window, f"{lower} < AC ≤ {upper}: {damage} dmg{bd_text()}")
+                    append_log(window, f"{lower} < AC ≤ {upper}: {damage} dmg{bd_text()}{odds}")
         if results:
             append_log(window, "--- Per attack ---")
             tracker = getattr(window, "_ac_tracker", None)
             if tracker:
                 append_log(window, f"AC bound: {format_bound(tracker)}")
             for r in results:
-                append_log(window, format_attack_line(r, tracker))
+                append_attack_line(window, r, tracker)
         append_log(window, "")
+        event_bus(window).publish(FullAttackSummary("full_attack", results, ranges))
 
         return results
 
@@ -615,8 +949,9 @@ def wrap_single_attack(window: MainWindow, tavist: "Tavist", attacks: list[int],
 
         if results:
             tracker = getattr(window, "_ac_tracker", None)
-            append_log(window, format_attack_line(results[0], tracker))
+            append_attack_line(window, results[0], tracker)
             append_log(window, "")
+        event_bus(window).publish(FullAttackSummary("attack", results))
         return results
 
     return do_attack
@@ -638,11 +973,45 @@ def wrap_auto_recommend(
             ac = int(window.target_ac.text() or "0")
         except ValueError:
             ac = 99
-        tracker = getattr(window, "_ac_tracker", None)
-        if tracker:
-            tracker.reset()
+        registry = getattr(window, "_targets", None)
+        if registry is not None:
+            # keep what we learned about the previous foe; start a fresh tracker,
+            # seeded from the opponent library when the name is known
+            typed = window.opponent_name.text().strip()
+            library = getattr(window, "_library", None)
+            matches = library.search(typed, limit=1) if library is not None and typed else []
+            entry = matches[0] if matches else None
+            name = registry.add(entry.name if entry else typed or None, entry.tracker() if entry else None)
+            if typed:
+                window._library_targets[name] = entry.name if entry else typed
+            window._ac_tracker = registry.switch(name)
+            if entry is not None and (entry.ac_lower != 0 or entry.ac_upper != 99):
+                ac = window._ac_tracker.estimate()
+                window.target_ac.blockSignals(True)
+                window.target_ac.setText(str(ac))
+                window.target_ac.blockSignals(False)
+                hp = f", {entry.hp} hp" if entry.hp else ""
+                append_log(window, f"Library: {entry.name} AC {format_bound(window._ac_tracker)}{hp}")
+            window.target_select.blockSignals(True)
+            window.target_select.addItem(name)
+            window.target_select.setCurrentText(name)
+            window.target_select.blockSignals(False)
+            window.ac_bound.setText(f"AC bound: {format_bound(window._ac_tracker)}")
             window.damage_done.setText("Damage done: 0")
-        pa, two = recommend_setup(tavist, ac, attacks, attack_names)
+        else:
+            tracker = getattr(window, "_ac_tracker", None)
+            if tracker:
+                tracker.reset()
+                window.damage_done.setText("Damage done: 0")
+        choice = recommend_joint_setup(
+            tavist,
+            ac,
+            attacks,
+            attack_names,
+            min_defense=-tavist.combat_expertise.bonus,
+            target=current_target(window),
+        )
+        pa, two = choice.power_attack, choice.two_handed
         tavist.set_two_handed(two)
         window.two_handed.setChecked(two)
         tavist.set_power_attack(pa)
@@ -656,19 +1025,21 @@ def wrap_auto_recommend(
     return do_auto
 
 
-def update_dpr_label(
-    window: MainWindow, tavist: "Tavist", attacks: list[int], attack_names: list[str]
-):
-    try:
-        ac = int(window.target_ac.text() or "0")
-    except ValueError:
-        ac = 99
-    curr_two = tavist.two_handed_mode
-    dpr = expected_full_attack(tavist, ac, curr_two, attacks, attack_names)
-    window.dpr_label.setText(f"Expected DPR (AC {ac}): {dpr:.1f}")
+# one frame at 60 Hz, with headroom for the rest of the click handler
+RECOMMEND_BUDGET_S = 0.008
+# speculative work runs in short slices so it never delays the next click
+PREFETCH_SLICE_S = 0.004
+# tracker ranges at most this wide are precomputed AC by AC
+PREFETCH_RANGE = 12
 
-    best_pa, best_two = recommend_setup(tavist, ac, attacks, attack_names)
+
+def show_recommendation(window: MainWindow, tavist: "Tavist", ac: int, dpr: float, choice: SetupChoice):
+    best_pa, best_two = choice.power_attack, choice.two_handed
     mode = "2H" if best_two else "TWF"
+    # expertise only costs attack bonus, so the search never goes above the expertise the
+    # player asked for: it is a floor, shown here and never applied over their field
+    if choice.expertise:
+        mode += f" CE {choice.expertise}"
     window.reccommended_poweratt.setText(str(best_pa))
     if not window.poweratt_lock.isChecked():
         window.poweratt.blockSignals(True)
@@ -678,10 +1049,337 @@ def update_dpr_label(
     window.dpr_label.setText(
         f"Expected DPR (AC {ac}): {dpr:.1f} | Best: PA {best_pa} {mode}"
     )
+    if getattr(window, "_last_recommendation", None) != (ac, choice):
+        window._last_recommendation = (ac, choice)
+        event_bus(window).publish(RecommendationChanged(ac, dpr, choice))
+
+
+def refine_recommendation(
+    window: MainWindow,
+    tavist: "Tavist",
+    recommender: AnytimeRecommender,
+    ac: int,
+    min_defense: int,
+    dpr: float,
+):
+    def refine():
+        # a newer update_dpr_label call owns the label now
+        if getattr(window, "_recommender", None) is not recommender:
+            return
+        before = recommender.best
+        choice = recommender.run(RECOMMEND_BUDGET_S)
+        if choice is not before:
+            show_recommendation(window, tavist, ac, dpr, choice)
+        if not recommender.done:
+            QTimer.singleShot(0, refine)
+        else:
+            cache = getattr(window, "_recommendations", None)
+            if cache is not None:
+                cache.put(recommender.modes, ac, min_defense, choice)
+
+    return refine
+
+
+def run_prefetch(window: MainWindow):
+    def step():
+        prefetcher = getattr(window, "_prefetcher", None)
+        if prefetcher is not None and prefetcher.step(PREFETCH_SLICE_S):
+            QTimer.singleShot(0, step)
+
+    return step
+
+
+def schedule_prefetch(window: MainWindow, modes: tuple, ac: int, min_defense: int):
+    prefetcher = getattr(window, "_prefetcher", None)
+    if prefetcher is None:
+        return
+    tracker = getattr(window, "_ac_tracker", None)
+    extra_acs = []
+    if tracker and tracker.upper != 99:
+        if tracker.upper - tracker.lower <= PREFETCH_RANGE:
+            # a narrow prior (e.g. from the opponent library): table the whole range
+            extra_acs = list(range(tracker.lower + 1, tracker.upper + 1))
+        else:
+            extra_acs = [tracker.lower + 1, tracker.estimate(), tracker.upper]
+    was_idle = prefetcher.pending == 0
+    prefetcher.schedule(modes, ac, min_defense, extra_acs)
+    if was_idle and prefetcher.pending:
+        QTimer.singleShot(0, run_prefetch(window))
+
+
+def run_grid_build(window: MainWindow, key: str, steps, values):
+    def step():
+        # a newer configuration owns the builder now
+        if getattr(window, "_grid_build", None) != key:
+            return
+        deadline = time.perf_counter() + PREFETCH_SLICE_S
+        for _ in steps:
+            if time.perf_counter() >= deadline:
+                QTimer.singleShot(0, step)
+                return
+        window._grids.put(key, values)
+        window._grid_build = None
+
+    return step
+
+
+def current_grid(window: MainWindow, modes: tuple):
+    # map-and-read when this configuration was ever seen before; otherwise build it in slices
+    grids = getattr(window, "_grids", None)
+    if grids is None:
+        return None
+    grid = load_dpr_grid(grids, modes, build=False)
+    if grid is None:
+        key = grid_key(modes)
+        if getattr(window, "_grid_build", None) != key:
+            window._grid_build = key
+            values = array("d")
+            QTimer.singleShot(0, run_grid_build(window, key, iter_dpr_grid(modes, values), values))
+    return grid
+
+
+def apply_results_filter(window: MainWindow):
+    try:
+        window.results_model.set_filter(window.results_filter.text())
+    except ValueError as exc:
+        window.results_filter.setToolTip(str(exc))
+        return
+    window.results_filter.setToolTip("")
+
+
+def current_target(window: MainWindow) -> Target:
+    # a half-typed spec counts as no defenses until it parses
+    try:
+        target = parse_target_spec(window.target_defenses.text())
+    except ValueError as exc:
+        window.target_defenses.setToolTip(str(exc))
+        return Target()
+    window.target_defenses.setToolTip("")
+    return target
+
+
+@timed("update_dpr_label")
+def update_dpr_label(
+    window: MainWindow, tavist: "Tavist", attacks: list[int], attack_names: list[str]
+):
+    try:
+        ac = int(window.target_ac.text() or "0")
+    except ValueError:
+        ac = 99
+    target = current_target(window)
+    curr_two = tavist.two_handed_mode
+    min_defense = -tavist.combat_expertise.bonus
+    modes = setup_modes(tavist, attacks, target)
+    grid = current_grid(window, modes)
+    pa = tavist.power_attack_value
+    if grid is not None and grid.covers(ac, pa, min_defense):
+        dpr = grid.dpr(curr_two, pa, min_defense, ac)
+    else:
+        dpr = expected_full_attack(tavist, ac, curr_two, attacks, attack_names, target)
+    window.dpr_label.setText(f"Expected DPR (AC {ac}): {dpr:.1f}")
+
+    cache = getattr(window, "_recommendations", None)
+    cached = cache.get(modes, ac, min_defense) if cache is not None else None
+    if grid is not None and grid.covers(ac):
+        window._recommender = None
+        show_recommendation(window, tavist, ac, dpr, grid.best(ac, min_defense))
+    elif cached is not None:
+        window._recommender = None
+        show_recommendation(window, tavist, ac, dpr, cached)
+    else:
+        recommender = AnytimeRecommender(
+            tavist, ac, attacks, attack_names, min_defense=min_defense, modes=modes
+        )
+        window._recommender = recommender
+        choice = recommender.run(RECOMMEND_BUDGET_S)
+        show_recommendation(window, tavist, ac, dpr, choice)
+        if not recommender.done:
+            QTimer.singleShot(
+                0, refine_recommendation(window, tavist, recommender, ac, min_defense, dpr)
+            )
+        elif cache is not None:
+            cache.put(modes, ac, min_defense, choice)
+    if grid is None:
+        schedule_prefetch(window, modes, ac, min_defense)
     tracker = getattr(window, "_ac_tracker", None)
+    if tracker and tracker.upper != 99:
+        curve_acs = list(range(tracker.lower + 1, tracker.upper + 1))
+    else:
+        curve_acs = list(range(max(0, ac - 5), ac + 6))
+    # show_recommendation may have moved PA
+    pa = tavist.power_attack_value
+    if grid is not None and all(grid.covers(a, pa, min_defense) for a in (curve_acs[0], curve_acs[-1])):
+        curve = grid.curve(tavist.two_handed_mode, pa, min_defense, curve_acs)
+    else:
+        curve = expected_full_attack_by_ac(tavist, curve_acs, tavist.two_handed_mode, attacks, target)
+    window.dpr_label.setToolTip("\n".join(f"AC {a}: {d:.1f}" for a, d in zip(curve_acs, curve)))
     if tracker:
         window.ac_bound.setText(f"AC bound: {format_bound(tracker)}")
         window.damage_done.setText(f"Damage done: {tracker.damage_done}")
+    refresh_target_summary(window, tavist, attacks, attack_names, target)
+    remember_target(window)
+    refresh_attack_lines(window)
+    publish_tracker(window)
+    journal_state(window)
+
+
+def refresh_target_summary(
+    window: MainWindow, tavist: "Tavist", attacks: list[int], attack_names: list[str], target: Target | None = None
+):
+    registry = getattr(window, "_targets", None)
+    if registry is None:
+        return
+    lines = []
+    for rec in recommend_for_targets(
+        registry, tavist, attacks, attack_names, getattr(window, "_recommendations", None), target
+    ):
+        mode = "2H" if rec.best.two_handed else "TWF"
+        bound = format_bound(registry.trackers[rec.name])
+        lines.append(
+            f"{rec.name}: AC {bound} (est {rec.ac}) | now {rec.current_dpr:.1f} | "
+            f"best PA {rec.best.power_attack} {mode} {rec.best.dpr:.1f}"
+        )
+    lines.append(f"Total damage done: {registry.total_damage()}")
+    window.target_select.setToolTip("\n".join(lines))
+
+
+def remember_target(window: MainWindow):
+    library = getattr(window, "_library", None)
+    registry = getattr(window, "_targets", None)
+    if library is None or registry is None:
+        return
+    library_name = window._library_targets.get(registry.active)
+    if library_name:
+        library.record_bounds(library_name, registry.current)
+
+
+JOURNAL_CHECKS = ["evil", "surge", "fatigued", "two_handed", "tracking", "poweratt_lock"]
+JOURNAL_FIELDS = ["poweratt", "expertise", "target_ac", "target_defenses", "ext_hit", "ext_str"]
+
+
+def toggle_debug_panel(window: MainWindow):
+    panel = window.debug_panel
+    if panel.isVisible():
+        panel.hide()
+        window._debug_timer.stop()
+        return
+    INSTRUMENTS.enabled = True
+    refresh_debug_panel(window)
+    panel.show()
+    window._debug_timer.start(1000)
+
+
+def refresh_debug_panel(window: MainWindow):
+    window.debug_panel.setPlainText(INSTRUMENTS.format() if INSTRUMENTS.histograms else "No timings recorded yet.")
+
+
+def log_gauges(window: MainWindow) -> dict:
+    # the log's HTML lives in Qt's memory, which tracemalloc cannot see
+    document = window.log_output.document()
+    return {"log_characters": document.characterCount(), "log_blocks": document.blockCount()}
+
+
+def toggle_profiling(window: MainWindow):
+    capture = window._profile
+    if not capture.active:
+        capture.start()
+        append_log(window, f"Profiling started; writing to {capture.directory}")
+        return
+    written = capture.stop()
+    append_log(window, f"Profile written: {written['pstats']}")
+    append_log(window, f"Allocation growth: {written['growth']}")
+
+
+def record_round_stats(
+    window: MainWindow, tavist: Tavist, results: list[dict], attacks: list[int], attack_names: list[str], full: bool
+):
+    # damage is judged against the AC as it stands when the round is rolled; with tracking
+    # on, hits wait for classify_round_stats after the player's answer moves the bounds
+    try:
+        ac = int(window.target_ac.text() or "0")
+    except ValueError:
+        ac = 99
+    tracker = None if window.tracking.isChecked() else window._ac_tracker
+    # rolled hits are never lost to concealment here, so neither are the expected ones
+    target = replace(current_target(window), concealment=0)
+    if full:
+        expected = expected_full_attack(tavist, ac, tavist.two_handed_mode, attacks, attack_names, target)
+    else:
+        expected = expected_attack_damage(tavist.katana_attack_action, ac, target)
+    actual, _ = compute_damage_for_ac(results, ac, target)
+    for stats in window._stats:
+        for r in results:
+            stats.record_attack(r, tracker)
+        stats.record_round(actual, expected)
+    show_stats(window)
+
+
+def classify_round_stats(window: MainWindow, tracker: ACTargetTracker, results: list[dict]):
+    stats = getattr(window, "_stats", ())
+    for entry in stats:
+        for r in results:
+            entry.classify_attack(r, tracker)
+    if stats:
+        show_stats(window)
+
+
+def show_stats(window: MainWindow):
+    session, history = window._stats
+    window.stats_label.setText(
+        f"{session.summary('Session')}\n{history.summary('History')}\n"
+        f"Damage done (all opponents): {window._targets.total_damage()}"
+    )
+
+
+def journal_state(window: MainWindow):
+    journal = getattr(window, "_journal", None)
+    if journal is None:
+        return
+    # record_changed drops repeats, so calling this on every signal stays cheap
+    for name in JOURNAL_CHECKS:
+        journal.record_changed("toggle", name, name=name, value=getattr(window, name).isChecked())
+    for name in JOURNAL_FIELDS:
+        journal.record_changed("toggle", name, name=name, value=getattr(window, name).text())
+    registry = getattr(window, "_targets", None)
+    if registry is not None:
+        for name, tracker in registry.trackers.items():
+            journal.record_changed(
+                "tracker", name, name=name, lower=tracker.lower, upper=tracker.upper, damage_done=tracker.damage_done
+            )
+        journal.record_changed("active", "active", name=registry.active)
+
+
+def restore_session(window: MainWindow, state: SessionState):
+    # widgets go through their normal signals so the model follows them
+    for name in JOURNAL_CHECKS:
+        widget = getattr(window, name)
+        if name in state.toggles and widget.isChecked() != state.toggles[name]:
+            widget.click()
+    for name in JOURNAL_FIELDS:
+        if name in state.toggles:
+            getattr(window, name).setText(state.toggles[name])
+    window.log_output.setUpdatesEnabled(False)
+    for text in state.log:
+        append_log(window, text)
+    window.log_output.setUpdatesEnabled(True)
+    for results in state.attacks:
+        window.results_model.append_round(results)
+
+
+def switch_target(window: MainWindow, tavist: "Tavist", attacks: list[int], attack_names: list[str]):
+    def on_switch(name: str):
+        registry = getattr(window, "_targets", None)
+        if registry is None or name not in registry.trackers:
+            return
+        tracker = registry.switch(name)
+        window._ac_tracker = tracker
+        if tracker.upper != 99 or tracker.lower != 0:
+            window.target_ac.blockSignals(True)
+            window.target_ac.setText(str(tracker.estimate()))
+            window.target_ac.blockSignals(False)
+        update_dpr_label(window, tavist, attacks, attack_names)
+
+    return on_switch
 
 
 def apply_external(window: MainWindow, tavist: Tavist, attacks: list[int], attack_names: list[str]):
@@ -699,92 +1397,120 @@ def apply_external(window: MainWindow, tavist: Tavist, attacks: list[int], attac
 
 
 def tracking_dialog(window: MainWindow, tavist: Tavist, tracker: ACTargetTracker, results: list[dict], attacks: list[int], attack_names: list[str]):
-    if tracker.upper != 99 and (tracker.upper - tracker.lower) <= 1:
-        return False
-    candidates = [
-        r
-        for r in results
-        if (tracker.lower < r["attack_total"] < tracker.upper and not r.get("natural_twenty"))
-        or (r.get("confirm_total") and tracker.lower < r["confirm_total"] < tracker.upper)
-    ]
+    # fills the tracking panel and returns at once; the selection is applied when a button is
+    # clicked, and Cancel (or the next attack's prompt) keeps just the certain hits' damage
+    window.tracking_panel.cancel_pending()
+    candidates = CandidateIndex(results).candidates(tracker)
     if not candidates:
+        window.tracking_panel.dismiss()
         return False
 
-    dialog = QDialog(window)
-    dialog.setWindowTitle("Attack Results")
-    layout = QVBoxLayout(dialog)
-    layout.addWidget(QLabel(f"Current AC range: {format_bound(tracker)}"))
-    layout.addWidget(QLabel("Select the lowest-AC attack that HIT, or All Misses."))
-
-    selection = {"total": None, "all_miss": False}
-
-    for r in sorted(candidates, key=lambda x: x["attack_total"]):
-        label = f"{r['label']} (AC {r['attack_total']})"
-        if r.get("threat") and r.get("confirm_total"):
-            label += f" / confirm {r['confirm_total']}"
-        btn = QPushButton(label)
-        btn.setEnabled(True)
-
-        def make_handler(total):
-            def handler():
-                selection["total"] = total
-                dialog.accept()
-
-            return handler
-
-        btn.clicked.connect(make_handler(r["attack_total"]))
-        layout.addWidget(btn)
-
-    miss_btn = QPushButton("All Misses")
-    miss_btn.clicked.connect(lambda: (selection.update({"all_miss": True}), dialog.accept()))
-    layout.addWidget(miss_btn)
-
-    cancel_btn = QPushButton("Cancel")
-    cancel_btn.clicked.connect(dialog.reject)
-    layout.addWidget(cancel_btn)
-
-    if dialog.exec() == QDialog.Accepted:
+    def on_select(selection: dict):
         apply_tracking_selection(tracker, selection, candidates)
         est = tracker.estimate()
-        window.target_ac.blockSignals(True)
-        window.target_ac.setText(str(est))
-        window.target_ac.blockSignals(False)
+        if tracker is getattr(window, "_ac_tracker", tracker):
+            window.target_ac.blockSignals(True)
+            window.target_ac.setText(str(est))
+            window.target_ac.blockSignals(False)
         update_dpr_label(window, tavist, attacks, attack_names)
+        classify_round_stats(window, tracker, results)
         append_log(
             window,
             f"Updated AC bound: {format_bound(tracker)} (est {est})",
         )
-        return True
-    return False
+
+    def on_cancel():
+        accumulate_known_hits(tracker, results)
+        update_dpr_label(window, tavist, attacks, attack_names)
+        classify_round_stats(window, tracker, results)
+
+    with timer("tracking_dialog"):
+        window.tracking_panel.show_candidates(tracker, candidates, on_select, on_cancel)
+    return True
 
 
-def main() -> None:
-    app = QApplication([])
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Tavist attack roller.")
+    parser.add_argument("--journal", default=str(DEFAULT_JOURNAL_PATH), help="session journal file")
+    parser.add_argument("--no-restore", action="store_true", help="start a fresh session")
+    parser.add_argument("--instrument", action="store_true", help="record hot-path timings from startup")
+    parser.add_argument("--timings", metavar="PATH", help="write timing percentiles as JSON on exit")
+    parser.add_argument("--profile", action="store_true", help="capture cProfile and tracemalloc from startup")
+    args, qt_args = parser.parse_known_args(argv)
+
+    app = QApplication(sys.argv[:1] + qt_args)
     app.setStyleSheet(DARK_THEME_QSS)
     window = MainWindow()
 
     tavist = Tavist()
-    tracker = ACTargetTracker()
-    window._ac_tracker = tracker
+    if args.no_restore:
+        journal, state = SessionJournal.fresh(args.journal), SessionState()
+    else:
+        journal, state = SessionJournal.restore(args.journal)
+    app.aboutToQuit.connect(journal.close)
+    targets = state.registry()
+    if not targets.trackers:
+        targets.add()
+    window._targets = targets
+    window._ac_tracker = targets.current
+    window.target_select.addItems(targets.names())
+    library = OpponentLibrary()
+    window._library = library
+    window._library_targets = {}
+    window.opponent_name.setCompleter(QCompleter(library.names(), window))
+    app.aboutToQuit.connect(library.close)
+    window._stats = (CombatStats(), load_history())
+    app.aboutToQuit.connect(lambda: save_history(window._stats[1]))
+    window._recommendations = RecommendationCache()
+    window._prefetcher = Prefetcher(window._recommendations)
+    window._grids = GridCache()
+    app.aboutToQuit.connect(window._grids.close)
 
     attacks = [12, 12, 7, 2]
     attack_names = [f"{name} (+{atk})" for name, atk in zip(["first", "speed", "second", "third"], attacks)]
 
+    bus = event_bus(window)
+    # terminal writes can block, so they happen on the sink's own thread
+    bus.subscribe(terminal_sink(), (AttackResolved,), threaded=True)
+    app.aboutToQuit.connect(bus.close)
+
+    def journal_sink(event):
+        if isinstance(event, FullAttackSummary):
+            journal.record("attack", results=event.results)
+        elif isinstance(event, TrackerUpdated):
+            journal.record_changed(
+                "tracker", event.name, name=event.name, lower=event.lower, upper=event.upper, damage_done=event.damage_done
+            )
+        else:
+            journal.record_changed("recommendation", "recommendation", ac=event.ac, **asdict(event.choice))
+
+    bus.subscribe(journal_sink, (FullAttackSummary, TrackerUpdated, RecommendationChanged))
+    bus.subscribe(
+        lambda event: record_round_stats(
+            window, tavist, event.results, attacks, attack_names, full=event.kind == "full_attack"
+        ),
+        (FullAttackSummary,),
+    )
+
     def do_single():
         results = wrap_single_attack(window, tavist, attacks, attack_names)()
         if window.tracking.isChecked():
+            tracker = window._ac_tracker
             shown = tracking_dialog(window, tavist, tracker, results, attacks, attack_names)
             if not shown:
                 accumulate_known_hits(tracker, results)
                 update_dpr_label(window, tavist, attacks, attack_names)
+                classify_round_stats(window, tracker, results)
     window.attack_button.clicked.connect(do_single)
 
     def do_full():
         results = wrap_full_attack(window, tavist, attack_names, attacks)()
         if window.tracking.isChecked():
+            tracker = window._ac_tracker
             shown = tracking_dialog(window, tavist, tracker, results, attacks, attack_names)
             if not shown:
                 accumulate_known_hits(tracker, results)
+                classify_round_stats(window, tracker, results)
         update_dpr_label(window, tavist, attacks, attack_names)
     window.full_attack.clicked.connect(do_full)
 
@@ -797,6 +1523,7 @@ def main() -> None:
     window.auto_button.clicked.connect(
         wrap_auto_recommend(window, tavist, attacks, attack_names)
     )
+    window.target_select.currentTextChanged.connect(switch_target(window, tavist, attacks, attack_names))
     apply_two_handed(window.two_handed.isChecked())
 
     window.evil.clicked.connect(
@@ -824,6 +1551,10 @@ def main() -> None:
     window.target_ac.textChanged.connect(
         lambda _: update_dpr_label(window, tavist, attacks, attack_names)
     )
+    window.results_filter.textChanged.connect(lambda _: apply_results_filter(window))
+    window.target_defenses.textChanged.connect(
+        lambda _: update_dpr_label(window, tavist, attacks, attack_names)
+    )
     window.ext_hit.textChanged.connect(lambda _: apply_external(window, tavist, attacks, attack_names))
     window.ext_str.textChanged.connect(lambda _: apply_external(window, tavist, attacks, attack_names))
 
@@ -834,10 +1565,38 @@ def main() -> None:
 
     def on_tracking_toggled(checked: bool):
         if checked:
-            tracker.reset()
+            window._ac_tracker.reset()
             window.damage_done.setText("Damage done: 0")
+        else:
+            window.tracking_panel.dismiss()
     window.tracking.toggled.connect(on_tracking_toggled)
 
+    for name in JOURNAL_CHECKS:
+        getattr(window, name).toggled.connect(lambda _: journal_state(window))
+    for name in JOURNAL_FIELDS:
+        getattr(window, name).textChanged.connect(lambda _: journal_state(window))
+    restore_session(window, state)
+    window.target_select.blockSignals(True)
+    window.target_select.setCurrentText(targets.active)
+    window.target_select.blockSignals(False)
+    window._journal = journal
+
+    INSTRUMENTS.enabled = args.instrument or bool(args.timings)
+    window._debug_timer = QTimer(window)
+    window._debug_timer.timeout.connect(lambda: refresh_debug_panel(window))
+    QShortcut(QKeySequence("Ctrl+Shift+D"), window, activated=lambda: toggle_debug_panel(window))
+    if args.timings:
+        app.aboutToQuit.connect(lambda: INSTRUMENTS.dump(args.timings))
+
+    window._profile = ProfileCapture(
+        regions={**default_regions(), "log html": [source_region(append_log)]},
+        gauges=lambda: log_gauges(window),
+    )
+    QShortcut(QKeySequence("Ctrl+Shift+P"), window, activated=lambda: toggle_profiling(window))
+    app.aboutToQuit.connect(lambda: window._profile.active and window._profile.stop())
+    if args.profile:
+        window._profile.start()
+
     update_dpr_label(window, tavist, attacks, attack_names)
     window.show()
     app.exec()
@@ -1,9 +1,33 @@
-from typing import List, Tuple, Dict
-from tavist.model import AttackAction, DamageRoll, DamageType, WeaponDamageDice
+import bisect
+import operator
+import re
+from typing import TYPE_CHECKING, Callable, List, Tuple, Dict
+from tavist.instrument import timed
+from tavist.model import AttackAction, DamageRoll, DamageType, Tavist, WeaponDamageDice, off_hand_bonus
 from tavist.tracking import ACTargetTracker, format_bound, damage_for_hit
 
+if TYPE_CHECKING:
+    from tavist.target import Target
 
-def compute_damage_for_ac(results: List[dict], ac: int) -> Tuple[int, Dict[str, int]]:
+# filterable result fields; any other name is looked up in the normal damage breakdown
+RESULT_FIELDS = {
+    "label": "label",
+    "total": "attack_total",
+    "die": "attack_die",
+    "d20": "attack_die",
+    "threat": "threat",
+    "confirm": "confirm_total",
+    "normal": "damage_normal",
+    "critical": "damage_critical",
+}
+_TEXT_FIELDS = {"label", "threat"}
+_COMPARISONS = {"<=": operator.le, ">=": operator.ge, "!=": operator.ne, "=": operator.eq, "<": operator.lt, ">": operator.gt}
+_FILTER_TERM = re.compile(r"(?P<field>[a-z][a-z0-9_\-]*)\s*(?P<op><=|>=|!=|=|<|>)\s*(?P<value>-?\d+)$")
+
+
+def compute_damage_for_ac(
+    results: List[dict], ac: int, target: "Target | None" = None
+) -> Tuple[int, Dict[str, int]]:
     total = 0
     breakdown: Dict[str, int] = {}
     for r in results:
@@ -13,13 +37,19 @@ def compute_damage_for_ac(results: List[dict], ac: int) -> Tuple[int, Dict[str,
             continue
         use_crit = r["threat"] and r["confirm_total"] is not None and ac <= r["confirm_total"]
         parts = r["breakdown_critical"] if use_crit else r["breakdown_normal"]
+        if target is not None:
+            # DR and resistance come off each hit, not the round's total
+            parts = target.reduce(parts)
         for label, val in parts.items():
             breakdown[label] = breakdown.get(label, 0) + val
     total = sum(breakdown.values())
     return total, breakdown
 
 
-def summarize_damage_ranges(results: List[dict]) -> List[Tuple[int | None, int | None, int, Dict[str, int]]]:
+@timed("summarize_damage_ranges")
+def summarize_damage_ranges(
+    results: List[dict], target: "Target | None" = None
+) -> List[Tuple[int | None, int | None, int, Dict[str, int]]]:
     thresholds = set()
     for r in results:
         thresholds.add(r["attack_total"])
@@ -35,7 +65,7 @@ def summarize_damage_ranges(results: List[dict]) -> List[Tuple[int | None, int |
 
     for idx, upper in enumerate(ordered):
         lower = ordered[idx + 1] if idx + 1 < len(ordered) else None
-        dmg, breakdown = compute_damage_for_ac(results, upper)
+        dmg, breakdown = compute_damage_for_ac(results, upper, target)
         raw_ranges.append((lower, upper, dmg, breakdown))
 
     merged: List[Tuple[int | None, int | None, int, Dict[str, int]]] = []
@@ -104,6 +134,91 @@ def format_attack_line(r: dict, tracker: ACTargetTracker | None) -> str:
     return line
 
 
+class AttackLineIndex:
+    # rendered attack lines for one tracker, keyed by a caller handle; when the bounds
+    # move only lines whose totals lie between the old and new bound are re-rendered
+    def __init__(self, tracker: ACTargetTracker):
+        self.tracker = tracker
+        self.lower, self.upper = tracker.lower, tracker.upper
+        self.lines: Dict[int, Tuple[dict, str]] = {}
+        self._attacks: List[Tuple[int, int]] = []
+        self._confirms: List[Tuple[int, int]] = []
+        self._naturals: List[int] = []
+
+    def add(self, handle: int, result: dict) -> str:
+        text = format_attack_line(result, self.tracker)
+        self.lines[handle] = (result, text)
+        bisect.insort(self._attacks, (result["attack_total"], handle))
+        if result.get("confirm_total"):
+            bisect.insort(self._confirms, (result["confirm_total"], handle))
+        if result.get("natural_twenty"):
+            self._naturals.append(handle)
+        return text
+
+    @staticmethod
+    def _between(totals: List[Tuple[int, int]], lo: float, hi: float) -> List[int]:
+        # handles with lo <= total < hi
+        start = bisect.bisect_left(totals, (lo, -1))
+        stop = bisect.bisect_left(totals, (hi, -1))
+        return [handle for _, handle in totals[start:stop]]
+
+    def refresh(self) -> List[Tuple[int, str]]:
+        tracker = self.tracker
+        affected = set()
+        if tracker.upper != self.upper:
+            lo, hi = sorted((self.upper, tracker.upper))
+            if hi == 99:
+                # an unknown upper bound makes nothing certain, natural 20s included
+                hi = float("inf")
+                affected.update(self._naturals)
+            affected.update(self._between(self._attacks, lo, hi))
+            affected.update(self._between(self._confirms, lo, hi))
+        if tracker.lower != self.lower:
+            lo, hi = sorted((self.lower, tracker.lower))
+            affected.update(self._between(self._confirms, lo + 1, hi + 1))
+        self.lower, self.upper = tracker.lower, tracker.upper
+
+        changed = []
+        for handle in sorted(affected):
+            result, old = self.lines[handle]
+            text = format_attack_line(result, tracker)
+            if text != old:
+                self.lines[handle] = (result, text)
+                changed.append((handle, text))
+        return changed
+
+
+def full_attack_sequence(
+    tavist: Tavist, attacks: List[int], attack_names: List[str]
+) -> List[Tuple[AttackAction, str, int]]:
+    sequence = [(tavist.katana_attack_action, attack_names[idx], bonus) for idx, bonus in enumerate(attacks)]
+    if not tavist.two_handed_mode:
+        sequence.append((tavist.wakasashi_attack_action, "off-hand", off_hand_bonus(attacks)))
+    return sequence
+
+
+class CandidateIndex:
+    # attack and confirm totals kept sorted, so filtering by the bound is two bisects each
+    def __init__(self, results: List[dict]):
+        self.results = results
+        self._attacks = sorted((r["attack_total"], i) for i, r in enumerate(results) if not r.get("natural_twenty"))
+        self._confirms = sorted((r["confirm_total"], i) for i, r in enumerate(results) if r.get("confirm_total"))
+
+    def candidates(self, tracker: ACTargetTracker) -> List[dict]:
+        if tracker.upper != 99 and (tracker.upper - tracker.lower) <= 1:
+            return []
+        picked = set()
+        for totals in (self._attacks, self._confirms):
+            start = bisect.bisect_right(totals, (tracker.lower, len(self.results)))
+            stop = bisect.bisect_left(totals, (tracker.upper, -1))
+            picked.update(i for _, i in totals[start:stop])
+        return [self.results[i] for i in sorted(picked, key=lambda i: (self.results[i]["attack_total"], i))]
+
+
+def tracking_candidates(tracker: ACTargetTracker, results: List[dict]) -> List[dict]:
+    return CandidateIndex(results).candidates(tracker)
+
+
 def apply_tracking_selection(tracker: ACTargetTracker, selection: dict, candidates: list[dict]):
     if selection.get("all_miss"):
         for r in candidates:
@@ -121,3 +236,35 @@ def apply_tracking_selection(tracker: ACTargetTracker, selection: dict, candidat
             tracker.damage_done += damage_for_hit(r, tracker.upper)
         else:
             tracker.record_miss(r["attack_total"])
+
+
+def result_field(r: dict, name: str):
+    if name in RESULT_FIELDS:
+        return r.get(RESULT_FIELDS[name])
+    return r["breakdown_normal"].get(name)
+
+
+def parse_result_filter(text: str) -> Callable[[dict], bool] | None:
+    # space-separated terms that must all hold: "total>=25", "fire>0", "threat", or a
+    # word of the attack's label
+    checks = []
+    for term in re.sub(r"\s*(<=|>=|!=|=|<|>)\s*", r"\1", text.strip().lower()).split():
+        if match := _FILTER_TERM.match(term):
+            name, compare, value = match["field"], _COMPARISONS[match["op"]], int(match["value"])
+            if name in _TEXT_FIELDS:
+                raise ValueError(f"{name} cannot be compared with a number")
+            checks.append(lambda r, name=name, compare=compare, value=value: _compare(r, name, compare, value))
+        elif any(op in term for op in _COMPARISONS):
+            raise ValueError(f"cannot parse filter term {term!r}")
+        elif term == "threat":
+            checks.append(lambda r: bool(r.get("threat")))
+        else:
+            checks.append(lambda r, word=term: word in r["label"].lower())
+    if not checks:
+        return None
+    return lambda r: all(check(r) for check in checks)
+
+
+def _compare(r: dict, name: str, compare, value: int) -> bool:
+    actual = result_field(r, name)
+    return actual is not None and compare(actual, value)
@@ -0,0 +1,167 @@
+import random
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from tavist.model import Bonus, DamageRoll, DamageType, Dice
+
+_TERM = re.compile(
+    r"""\s*(?P<sign>[+-])?\s*
+    (?:(?P<n>\d*)[dD](?P<d>\d+)|(?P<const>\d+))
+    \s*(?:\[(?P<tags>[^\]]*)\])?\s*""",
+    re.VERBOSE,
+)
+
+
+@dataclass(frozen=True)
+class DiceTerm:
+    n: int
+    d: int
+    label: str | None = None
+    crit: bool = False
+    sign: int = 1
+
+
+@dataclass(frozen=True)
+class ConstantTerm:
+    value: int
+    label: str | None = None
+
+
+def die_pmf(sides: int) -> dict[int, float]:
+    return {face: 1 / sides for face in range(1, sides + 1)}
+
+
+def convolve(a: dict[int, float], b: dict[int, float]) -> dict[int, float]:
+    out: dict[int, float] = {}
+    for x, px in a.items():
+        for y, py in b.items():
+            out[x + y] = out.get(x + y, 0.0) + px * py
+    return out
+
+
+def shift(pmf: dict[int, float], offset: int) -> dict[int, float]:
+    return {value + offset: p for value, p in pmf.items()}
+
+
+def dice_sum_pmf(n: int, sides: int) -> dict[int, float]:
+    pmf = {0: 1.0}
+    single = die_pmf(sides)
+    for _ in range(n):
+        pmf = convolve(pmf, single)
+    return pmf
+
+
+def parse_dice(text: str) -> tuple[tuple[DiceTerm, ...], tuple[ConstantTerm, ...]]:
+    dice: list[DiceTerm] = []
+    constants: list[ConstantTerm] = []
+    pos = 0
+    while pos < len(text):
+        match = _TERM.match(text, pos)
+        if not match or match.end() == pos:
+            raise ValueError(f"cannot parse dice expression {text!r} at position {pos}")
+        if match.group("sign") is None and pos != 0:
+            raise ValueError(f"expected '+' or '-' in dice expression {text!r} at position {pos}")
+        sign = -1 if match.group("sign") == "-" else 1
+        tags = [t.strip() for t in (match.group("tags") or "").split(",") if t.strip()]
+        crit = "crit" in tags
+        labels = [t for t in tags if t != "crit"]
+        label = labels[0] if labels else None
+        if match.group("const") is not None:
+            if crit:
+                raise ValueError(f"'crit' only applies to dice, not {match.group('const')!r}")
+            constants.append(ConstantTerm(sign * int(match.group("const")), label))
+        else:
+            n = int(match.group("n") or 1)
+            d = int(match.group("d"))
+            if n == 0 or d == 0:
+                raise ValueError(f"empty dice term in {text!r}")
+            dice.append(DiceTerm(n, d, label, crit, sign))
+        pos = match.end()
+    if not dice and not constants:
+        raise ValueError("empty dice expression")
+    return tuple(dice), tuple(constants)
+
+
+class CompiledDice:
+    def __init__(self, text: str, dice: tuple[DiceTerm, ...], constants: tuple[ConstantTerm, ...]):
+        self.text = text
+        self.dice = dice
+        self.constants = constants
+        self.constant = sum(c.value for c in constants)
+        # (count, sides, sign) groups for normal and critical hits; crit doubles the
+        # "crit" dice and every constant, as DamageRoll does
+        self._plans = {
+            False: tuple((t.n, t.d, t.sign) for t in dice),
+            True: tuple((t.n * (2 if t.crit else 1), t.d, t.sign) for t in dice),
+        }
+        self._pmfs: dict[bool, dict[int, float]] = {}
+
+    def __repr__(self) -> str:
+        return f"CompiledDice({self.text!r})"
+
+    def _constant(self, critical: bool) -> int:
+        return self.constant * 2 if critical else self.constant
+
+    def roll(self, critical: bool = False, rng: random.Random | None = None) -> int:
+        randint = (rng or random).randint
+        total = self._constant(critical)
+        for count, sides, sign in self._plans[critical]:
+            for _ in range(count):
+                total += sign * randint(1, sides)
+        return total
+
+    def roll_batch(self, count: int, critical: bool = False, rng: random.Random | None = None) -> list[int]:
+        choices = (rng or random).choices
+        totals = [self._constant(critical)] * count
+        for n, sides, sign in self._plans[critical]:
+            faces = choices(range(1, sides + 1), k=n * count)
+            for idx in range(count):
+                totals[idx] += sign * sum(faces[idx * n:(idx + 1) * n])
+        return totals
+
+    def mean(self, critical: bool = False) -> float:
+        return self._constant(critical) + sum(
+            sign * count * (sides + 1) / 2 for count, sides, sign in self._plans[critical]
+        )
+
+    def pmf(self, critical: bool = False) -> dict[int, float]:
+        if critical not in self._pmfs:
+            pmf = {self._constant(critical): 1.0}
+            for count, sides, sign in self._plans[critical]:
+                group = dice_sum_pmf(count, sides)
+                if sign < 0:
+                    group = {-value: p for value, p in group.items()}
+                pmf = convolve(pmf, group)
+            self._pmfs[critical] = dict(sorted(pmf.items()))
+        return dict(self._pmfs[critical])
+
+    # the model defines its weapons with compile_dice, so its classes are looked up on use
+    def damage_dice(self) -> "list[Dice]":
+        from tavist.model import DamageDice, WeaponDamageDice
+
+        if any(t.sign < 0 for t in self.dice):
+            raise ValueError(f"negative dice cannot be used as damage in {self.text!r}")
+        return [
+            (WeaponDamageDice if t.crit else DamageDice)(n=t.n, d=t.d, label=t.label) for t in self.dice
+        ]
+
+    def bonuses(self) -> "list[Bonus]":
+        from tavist.model import Bonus, BonusType
+
+        types = {t.value: t for t in BonusType}
+        return [
+            Bonus(c.value, types.get(c.label, BonusType.UNNAMED), c.label) for c in self.constants
+        ]
+
+    def to_damage_roll(self, type: "DamageType", label: str | None = None) -> "DamageRoll":
+        from tavist.model import DamageRoll
+
+        return DamageRoll(type=type, label=label, dice=self.damage_dice(), bonuses=self.bonuses())
+
+
+@lru_cache(maxsize=256)
+def compile_dice(text: str) -> CompiledDice:
+    return CompiledDice(text, *parse_dice(text))
@@ -0,0 +1,154 @@
+import queue
+import sys
+import threading
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, TextIO
+
+if TYPE_CHECKING:
+    from tavist.model import AttackAction, RolledDice
+    from tavist.recommend import SetupChoice
+
+_STOP = object()
+
+
+@dataclass(frozen=True)
+class AttackResolved:
+    # the rolled dice are snapshots, so the report can be formatted later on any thread
+    action: "AttackAction"
+    result: dict
+    attack_roll: "RolledDice"
+    damage_roll: "RolledDice"
+    crit_damage_roll: "RolledDice | None" = None
+
+    def report(self) -> str:
+        return self.action.report(self.result, self.attack_roll, self.damage_roll, self.crit_damage_roll)
+
+
+@dataclass(frozen=True)
+class FullAttackSummary:
+    # kind is "attack" for a single swing, "full_attack" for the whole sequence; lines are
+    # the per-attack summaries as judged against the bounds when the round was rolled
+    kind: str
+    results: list[dict]
+    damage_by_ac: list[tuple] = field(default_factory=list)
+    lines: list[str] = field(default_factory=list)
+
+
+@dataclass(frozen=True)
+class TrackerUpdated:
+    name: str
+    lower: int
+    upper: int
+    damage_done: int
+
+
+@dataclass(frozen=True)
+class RecommendationChanged:
+    ac: int
+    dpr: float
+    choice: "SetupChoice"
+
+
+class Subscription:
+    def __init__(self, handler: Callable, types: tuple[type, ...] | None, maxsize: int, threaded: bool):
+        self.handler = handler
+        self.types = types
+        self.dropped = 0
+        self._queue: queue.Queue | None = None
+        self._worker: threading.Thread | None = None
+        if threaded:
+            self._queue = queue.Queue(maxsize)
+            self._worker = threading.Thread(target=self._run, name="tavist-event-sink", daemon=True)
+            self._worker.start()
+
+    def wants(self, event) -> bool:
+        return self.types is None or isinstance(event, self.types)
+
+    def deliver(self, event):
+        if self._queue is None:
+            self.handler(event)
+            return
+        while True:
+            try:
+                self._queue.put_nowait(event)
+                return
+            except queue.Full:
+                # a slow sink loses its oldest event rather than stalling the publisher
+                try:
+                    self._queue.get_nowait()
+                    self._queue.task_done()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def flush(self):
+        if self._queue is not None:
+            self._queue.join()
+
+    def close(self):
+        if self._worker is None:
+            return
+        # the sentinel must get in even when the queue is full
+        self.deliver(_STOP)
+        self._worker.join()
+        self._worker = None
+
+    def _run(self):
+        while True:
+            event = self._queue.get()
+            try:
+                if event is _STOP:
+                    return
+                self.handler(event)
+            except Exception as exc:
+                print(f"event sink failed: {exc!r}", file=sys.__stderr__)
+            finally:
+                self._queue.task_done()
+
+
+class EventBus:
+    # inline subscribers run during publish, on the publisher's thread; threaded ones each
+    # get a bounded queue and a worker, so slow sinks stay off the publisher's path
+    def __init__(self):
+        self.subscriptions: list[Subscription] = []
+
+    def subscribe(
+        self,
+        handler: Callable,
+        types: tuple[type, ...] | None = None,
+        maxsize: int = 256,
+        threaded: bool = False,
+    ) -> Subscription:
+        subscription = Subscription(handler, types, maxsize, threaded)
+        self.subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        if subscription in self.subscriptions:
+            self.subscriptions.remove(subscription)
+        subscription.close()
+
+    def publish(self, event):
+        for subscription in list(self.subscriptions):
+            if subscription.wants(event):
+                subscription.deliver(event)
+
+    def flush(self):
+        for subscription in self.subscriptions:
+            subscription.flush()
+
+    def close(self):
+        for subscription in self.subscriptions:
+            subscription.close()
+        self.subscriptions.clear()
+
+
+def terminal_sink(stream: TextIO | None = None) -> Callable:
+    # what the GUI used to echo to the terminal, now written from a sink thread
+    def write(event: AttackResolved):
+        out = stream or sys.__stdout__
+        out.write(event.report() + "\n\n")
+        out.flush()
+
+    return write
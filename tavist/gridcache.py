@@ -0,0 +1,163 @@
+import hashlib
+import mmap
+import os
+from array import array
+from collections import OrderedDict
+from collections.abc import Callable, Iterator
+from pathlib import Path
+
+from tavist.model import expected_profiles_by_ac
+from tavist.recommend import MAX_POWER_ATTACK, ModeProfiles, SetupChoice, power_attack_limit
+
+DEFAULT_GRID_DIR = Path.home() / ".tavist" / "grids"
+# bump whenever the evaluation math changes, so stale grids stop matching
+ENGINE_VERSION = 1
+GRID_ACS = tuple(range(0, 61))
+GRID_MAX_EXPERTISE = 5
+
+
+def content_key(kind: str, *parts) -> str:
+    # the reprs of the frozen profile dataclasses are stable across runs
+    return hashlib.sha256(repr((ENGINE_VERSION, kind, parts)).encode()).hexdigest()
+
+
+class GridCache:
+    # flat float64 arrays, one file each, read back through a read-only mmap; each map
+    # holds a file descriptor, so only the max_maps most recently used stay open
+    def __init__(self, directory: str | Path = DEFAULT_GRID_DIR, max_bytes: int = 64 << 20, max_maps: int = 8):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_maps = max_maps
+        self._maps: OrderedDict[str, mmap.mmap] = OrderedDict()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.f64"
+
+    def get(self, key: str) -> memoryview | None:
+        if key in self._maps:
+            self._maps.move_to_end(key)
+            return memoryview(self._maps[key]).cast("d")
+        path = self._path(key)
+        try:
+            with open(path, "rb") as fh:
+                if os.fstat(fh.fileno()).st_size == 0:
+                    return None
+                mapped = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+            # the mtime is the recency the eviction goes by
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        self._maps[key] = mapped
+        while len(self._maps) > self.max_maps:
+            self._drop(next(iter(self._maps)))
+        return memoryview(mapped).cast("d")
+
+    def _drop(self, key: str):
+        mapped = self._maps.pop(key, None)
+        if mapped is None:
+            return
+        try:
+            mapped.close()
+        except BufferError:
+            # a view is still exported; the mapping goes when that view does
+            pass
+
+    def put(self, key: str, values: array) -> memoryview:
+        tmp = self._path(key).with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "wb") as fh:
+            values.tofile(fh)
+        os.replace(tmp, self._path(key))
+        self.evict()
+        return self.get(key)
+
+    def get_or_build(self, key: str, build: Callable[[], array]) -> memoryview:
+        view = self.get(key)
+        return view if view is not None else self.put(key, build())
+
+    def evict(self):
+        entries = []
+        for path in self.directory.glob("*.f64"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            # a mapped file stays readable after unlink; only the directory entry goes
+            path.unlink(missing_ok=True)
+            self._drop(path.stem)
+            total -= size
+
+    def close(self):
+        for key in list(self._maps):
+            self._drop(key)
+
+
+class DprGrid:
+    # DPR over (mode, expertise, PA, AC) for one stripped configuration
+    def __init__(self, values: memoryview, pa_count: int, acs: tuple[int, ...] = GRID_ACS):
+        self.values = values
+        self.pa_count = pa_count
+        self.acs = acs
+
+    def _index(self, two_handed: bool, expertise: int, pa: int) -> int:
+        return ((int(two_handed) * (GRID_MAX_EXPERTISE + 1) + expertise) * self.pa_count + pa) * len(self.acs)
+
+    def covers(self, ac: int, pa: int = 0, expertise: int = 0) -> bool:
+        return self.acs[0] <= ac <= self.acs[-1] and 0 <= pa < self.pa_count and 0 <= expertise <= GRID_MAX_EXPERTISE
+
+    def dpr(self, two_handed: bool, pa: int, expertise: int, ac: int) -> float:
+        return self.values[self._index(two_handed, expertise, pa) + ac - self.acs[0]]
+
+    def curve(self, two_handed: bool, pa: int, expertise: int, acs: list[int]) -> list[float]:
+        start = self._index(two_handed, expertise, pa) - self.acs[0]
+        return [self.values[start + ac] for ac in acs]
+
+    def best(self, ac: int, min_defense: int = 0) -> SetupChoice:
+        # same winner as search_modes: most DPR, ties to the cheapest setup, dual-wield first
+        min_defense = max(0, min(min_defense, GRID_MAX_EXPERTISE))
+        best = None
+        for expertise in range(min_defense, GRID_MAX_EXPERTISE + 1):
+            for pa in range(self.pa_count):
+                for two_handed in (False, True):
+                    dpr = self.dpr(two_handed, pa, expertise, ac)
+                    if best is None or dpr > best.dpr:
+                        best = SetupChoice(pa, expertise, two_handed, dpr)
+        return best
+
+
+def grid_key(modes: tuple[ModeProfiles, ...]) -> str:
+    # the stripped profiles capture every toggle, buff and target defense
+    return content_key("dpr", modes, GRID_ACS)
+
+
+def grid_pa_count(modes: tuple[ModeProfiles, ...]) -> int:
+    return power_attack_limit(modes, MAX_POWER_ATTACK) + 1
+
+
+def iter_dpr_grid(modes: tuple[ModeProfiles, ...], out: array) -> Iterator[None]:
+    # fills `out` one (mode, expertise, PA) row of ACs at a time so a caller can slice the work
+    acs = list(GRID_ACS)
+    for mode in modes:
+        for expertise in range(GRID_MAX_EXPERTISE + 1):
+            for pa in range(grid_pa_count(modes)):
+                out.extend(expected_profiles_by_ac(mode.profiles_at(pa, expertise), acs))
+                yield
+
+
+def build_dpr_grid(modes: tuple[ModeProfiles, ...]) -> array:
+    out = array("d")
+    for _ in iter_dpr_grid(modes, out):
+        pass
+    return out
+
+
+def load_dpr_grid(cache: GridCache, modes: tuple[ModeProfiles, ...], build: bool = True) -> DprGrid | None:
+    key = grid_key(modes)
+    view = cache.get_or_build(key, lambda: build_dpr_grid(modes)) if build else cache.get(key)
+    return None if view is None else DprGrid(view, grid_pa_count(modes))
+
@@ -0,0 +1,117 @@
+import bisect
+import functools
+import json
+import time
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+
+# upper bucket edges in milliseconds; the last bucket catches everything slower
+BUCKET_EDGES_MS = (0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 16, 33, 66, 125, 250, 500, 1000, float("inf"))
+
+
+class Histogram:
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKET_EDGES_MS)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float):
+        ms = seconds * 1000
+        self.counts[bisect.bisect_left(BUCKET_EDGES_MS, ms)] += 1
+        self.count += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+
+    def percentile(self, fraction: float) -> float:
+        # resolution is the bucket edge; the slowest bucket reports the observed max
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for edge, n in zip(BUCKET_EDGES_MS, self.counts):
+            seen += n
+            if seen >= rank and n:
+                return min(edge, self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count if self.count else 0.0,
+            "p50_ms": self.percentile(0.50),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+            "max_ms": self.max,
+            "buckets": {str(edge): n for edge, n in zip(BUCKET_EDGES_MS, self.counts) if n},
+        }
+
+
+class Instruments:
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.histograms: dict[str, Histogram] = {}
+
+    def histogram(self, name: str) -> Histogram:
+        hist = self.histograms.get(name)
+        if hist is None:
+            hist = self.histograms[name] = Histogram()
+        return hist
+
+    def record(self, name: str, seconds: float):
+        self.histogram(name).record(seconds)
+
+    def reset(self):
+        self.histograms.clear()
+
+    def summary(self) -> dict[str, dict]:
+        return {name: hist.summary() for name, hist in sorted(self.histograms.items())}
+
+    def format(self) -> str:
+        lines = [f"{'timer':<26}{'n':>7}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}"]
+        for name, s in self.summary().items():
+            lines.append(
+                f"{name:<26}{s['count']:>7}{s['p50_ms']:>9.2f}{s['p95_ms']:>9.2f}{s['p99_ms']:>9.2f}{s['max_ms']:>9.2f}"
+            )
+        return "\n".join(lines)
+
+    def dump(self, path: str | Path):
+        Path(path).write_text(json.dumps(self.summary(), indent=2))
+
+
+INSTRUMENTS = Instruments()
+_DISABLED = nullcontext()
+
+
+@contextmanager
+def _timing(name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        INSTRUMENTS.record(name, time.perf_counter() - start)
+
+
+def timer(name: str):
+    # disabled timers hand back one shared no-op context
+    return _timing(name) if INSTRUMENTS.enabled else _DISABLED
+
+
+def timed(name: str):
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not INSTRUMENTS.enabled:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                INSTRUMENTS.record(name, time.perf_counter() - start)
+
+        return wrapper
+
+    return decorate
@@ -0,0 +1,166 @@
+import json
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from tavist.tracking import ACTargetTracker, TrackerRegistry
+
+DEFAULT_JOURNAL_PATH = Path.home() / ".tavist" / "session.jsonl"
+_STOP = object()
+# a snapshot carries at most this much history forward, so restores do not grow the file
+SNAPSHOT_LOG_LINES = 2000
+SNAPSHOT_ATTACK_ROUNDS = 200
+
+
+@dataclass
+class SessionState:
+    trackers: dict[str, dict] = field(default_factory=dict)
+    active: str | None = None
+    toggles: dict[str, object] = field(default_factory=dict)
+    log: list[str] = field(default_factory=list)
+    attacks: list[list[dict]] = field(default_factory=list)
+
+    def apply(self, entry: dict):
+        kind = entry.get("kind")
+        if kind == "snapshot":
+            self.trackers = dict(entry["trackers"])
+            self.active = entry["active"]
+            self.toggles = dict(entry["toggles"])
+            self.log = list(entry["log"])
+            self.attacks = list(entry["attacks"])
+        elif kind == "tracker":
+            self.trackers[entry["name"]] = {
+                "lower": entry["lower"],
+                "upper": entry["upper"],
+                "damage_done": entry["damage_done"],
+            }
+        elif kind == "active":
+            self.active = entry["name"]
+        elif kind == "toggle":
+            self.toggles[entry["name"]] = entry["value"]
+        elif kind == "log":
+            self.log.append(entry["text"])
+        elif kind == "log_edit":
+            if 0 <= entry["index"] < len(self.log):
+                self.log[entry["index"]] = entry["text"]
+        elif kind == "attack":
+            self.attacks.append(entry["results"])
+
+    def registry(self) -> TrackerRegistry:
+        registry = TrackerRegistry()
+        for name, bounds in self.trackers.items():
+            registry.add(name, ACTargetTracker(**bounds))
+        if self.active in registry.trackers:
+            registry.switch(self.active)
+        return registry
+
+    def compact(self):
+        self.log = self.log[-SNAPSHOT_LOG_LINES:]
+        self.attacks = self.attacks[-SNAPSHOT_ATTACK_ROUNDS:]
+
+    def snapshot(self) -> dict:
+        return {
+            "kind": "snapshot",
+            "trackers": self.trackers,
+            "active": self.active,
+            "toggles": self.toggles,
+            "log": self.log[-SNAPSHOT_LOG_LINES:],
+            "attacks": self.attacks[-SNAPSHOT_ATTACK_ROUNDS:],
+        }
+
+
+def replay(path: str | Path) -> SessionState:
+    state = SessionState()
+    try:
+        with open(path, "rb") as fh:
+            for line in fh:
+                try:
+                    state.apply(json.loads(line))
+                except ValueError:
+                    # a crash can leave a torn final line; everything before it is good
+                    break
+    except FileNotFoundError:
+        pass
+    return state
+
+
+class SessionJournal:
+    def __init__(self, path: str | Path = DEFAULT_JOURNAL_PATH, fsync_interval: float = 0.5, batch_size: int = 256):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.fsync_interval = fsync_interval
+        self.batch_size = batch_size
+        self._queue: queue.Queue = queue.Queue()
+        self._last: dict[tuple, object] = {}
+        self._file = open(self.path, "ab")
+        self._writer = threading.Thread(target=self._write_loop, name="tavist-journal-writer", daemon=True)
+        self._writer.start()
+
+    @classmethod
+    def restore(cls, path: str | Path = DEFAULT_JOURNAL_PATH, **kwargs) -> tuple["SessionJournal", SessionState]:
+        # replay, then start a compacted journal that begins with the replayed snapshot
+        path = Path(path)
+        state = replay(path)
+        state.compact()
+        journal = cls.fresh(path, **kwargs)
+        journal._queue.put(state.snapshot())
+        return journal, state
+
+    @classmethod
+    def fresh(cls, path: str | Path = DEFAULT_JOURNAL_PATH, **kwargs) -> "SessionJournal":
+        # the old journal is kept as .prev; appending to it would put the new session
+        # behind any torn line it ends with
+        path = Path(path)
+        if path.exists():
+            os.replace(path, path.with_suffix(path.suffix + ".prev"))
+        return cls(path, **kwargs)
+
+    def record(self, kind: str, **data):
+        # only the enqueue happens on the caller's thread
+        self._queue.put({"t": time.time(), "kind": kind, **data})
+
+    def record_changed(self, kind: str, key: str, **data):
+        if self._last.get((kind, key)) == data:
+            return
+        self._last[(kind, key)] = data
+        self.record(kind, **data)
+
+    def flush(self):
+        self._queue.join()
+
+    def close(self):
+        self._queue.put(_STOP)
+        self._writer.join()
+        self._file.close()
+
+    def _write_loop(self):
+        last_sync = time.monotonic()
+        dirty = False
+        while True:
+            try:
+                # once something is unsynced, wake up in time to fsync it
+                batch = [self._queue.get(timeout=self.fsync_interval if dirty else None)]
+            except queue.Empty:
+                batch = []
+            while batch and len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = any(entry is _STOP for entry in batch)
+            entries = [entry for entry in batch if entry is not _STOP]
+            if entries:
+                self._file.write(b"".join(json.dumps(entry, default=str).encode() + b"\n" for entry in entries))
+                self._file.flush()
+                dirty = True
+            if dirty and (stop or not batch or time.monotonic() - last_sync >= self.fsync_interval):
+                os.fsync(self._file.fileno())
+                last_sync = time.monotonic()
+                dirty = False
+            for _ in batch:
+                self._queue.task_done()
+            if stop:
+                break
@@ -0,0 +1,177 @@
+import difflib
+import queue
+import sqlite3
+import threading
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+
+from tavist.tracking import ACTargetTracker
+
+DEFAULT_LIBRARY_PATH = Path.home() / ".tavist" / "opponents.sqlite3"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS opponents (
+    name TEXT PRIMARY KEY COLLATE NOCASE,
+    cr REAL,
+    type TEXT,
+    ac_lower INTEGER NOT NULL DEFAULT 0,
+    ac_upper INTEGER NOT NULL DEFAULT 99,
+    hp INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_opponents_name ON opponents(name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_opponents_cr ON opponents(cr);
+"""
+
+COLUMNS = "name, cr, type, ac_lower, ac_upper, hp"
+
+
+@dataclass
+class Opponent:
+    name: str
+    cr: float | None = None
+    type: str | None = None
+    ac_lower: int = 0
+    ac_upper: int = 99
+    hp: int | None = None
+
+    @classmethod
+    def with_known_ac(cls, name: str, ac: int, **kwargs) -> "Opponent":
+        # tracker bounds read "lower < AC <= upper"
+        return cls(name, ac_lower=ac - 1, ac_upper=ac, **kwargs)
+
+    def tracker(self) -> ACTargetTracker:
+        return ACTargetTracker(lower=self.ac_lower, upper=self.ac_upper)
+
+
+def merge_bounds(stored: tuple[int, int], learned: tuple[int, int]) -> tuple[int, int]:
+    lower, upper = max(stored[0], learned[0]), min(stored[1], learned[1])
+    if lower < upper:
+        return lower, upper
+    # this individual contradicts the prior (a variant or a buffed foe); trust what we saw
+    return learned
+
+
+class OpponentLibrary:
+    def __init__(self, path: str | Path = DEFAULT_LIBRARY_PATH):
+        if str(path) == ":memory:":
+            # a named shared-cache database so the writer thread sees the same data
+            self._uri = f"file:tavist-{uuid.uuid4().hex}?mode=memory&cache=shared"
+        else:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._uri = Path(path).absolute().as_uri()
+        self._conn = sqlite3.connect(self._uri, uri=True, check_same_thread=False)
+        if str(path) != ":memory:":
+            # readers on the GUI thread keep going while the writer commits
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+        self._names: list[str] | None = None
+        self._recorded: dict[str, tuple[int, int]] = {}
+        self._writes: queue.Queue = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name="tavist-library-writer", daemon=True)
+        self._writer.start()
+
+    def _row(self, row: tuple | None) -> Opponent | None:
+        return Opponent(*row) if row else None
+
+    def upsert(self, opponent: Opponent):
+        self._conn.execute(
+            f"INSERT INTO opponents ({COLUMNS}) VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET cr=excluded.cr, type=excluded.type, "
+            "ac_lower=excluded.ac_lower, ac_upper=excluded.ac_upper, hp=excluded.hp",
+            (opponent.name, opponent.cr, opponent.type, opponent.ac_lower, opponent.ac_upper, opponent.hp),
+        )
+        self._conn.commit()
+        self._names = None
+
+    def get(self, name: str) -> Opponent | None:
+        return self._row(self._conn.execute(f"SELECT {COLUMNS} FROM opponents WHERE name = ?", (name,)).fetchone())
+
+    def by_cr(self, low: float, high: float) -> list[Opponent]:
+        rows = self._conn.execute(
+            f"SELECT {COLUMNS} FROM opponents WHERE cr BETWEEN ? AND ? ORDER BY cr, name", (low, high)
+        )
+        return [self._row(row) for row in rows]
+
+    def names(self) -> list[str]:
+        if self._names is None:
+            self._names = [row[0] for row in self._conn.execute("SELECT name FROM opponents ORDER BY name")]
+        return self._names
+
+    def search(self, text: str, limit: int = 5) -> list[Opponent]:
+        text = text.strip()
+        if not text:
+            return []
+        exact = self.get(text)
+        # prefix matches come off the name index as a range scan
+        rows = self._conn.execute(
+            f"SELECT {COLUMNS} FROM opponents WHERE name >= ? AND name < ? ORDER BY name LIMIT ?",
+            (text, text + "\uffff", limit),
+        ).fetchall()
+        found = [exact] if exact else []
+        found += [o for o in map(self._row, rows) if o.name.lower() != text.lower()]
+        if len(found) < limit:
+            seen = {o.name for o in found}
+            lowered = {name.lower(): name for name in self.names()}
+            for match in difflib.get_close_matches(text.lower(), list(lowered), n=limit, cutoff=0.6):
+                if lowered[match] not in seen:
+                    found.append(self.get(lowered[match]))
+                    seen.add(lowered[match])
+        return found[:limit]
+
+    def seed_tracker(self, name: str) -> ACTargetTracker | None:
+        matches = self.search(name, limit=1)
+        return matches[0].tracker() if matches else None
+
+    def record_bounds(self, name: str, tracker: ACTargetTracker):
+        bounds = (tracker.lower, tracker.upper)
+        if bounds == (0, 99) or self._recorded.get(name) == bounds:
+            return
+        self._recorded[name] = bounds
+        # the GUI never waits on disk; the writer thread merges and commits
+        self._writes.put((name, *bounds))
+
+    def flush(self):
+        self._writes.join()
+
+    def close(self):
+        self._writes.put(None)
+        self._writer.join()
+        self._conn.close()
+
+    def _write_loop(self):
+        conn = sqlite3.connect(self._uri, uri=True)
+        while True:
+            item = self._writes.get()
+            if item is None:
+                self._writes.task_done()
+                break
+            batch = [item]
+            # coalesce everything already queued into one transaction
+            while True:
+                try:
+                    pending = self._writes.get_nowait()
+                except queue.Empty:
+                    break
+                if pending is None:
+                    self._writes.put(None)
+                    self._writes.task_done()
+                    break
+                batch.append(pending)
+            with conn:
+                for name, lower, upper in batch:
+                    row = conn.execute("SELECT ac_lower, ac_upper FROM opponents WHERE name = ?", (name,)).fetchone()
+                    if row is None:
+                        conn.execute(
+                            "INSERT INTO opponents (name, ac_lower, ac_upper) VALUES (?, ?, ?)", (name, lower, upper)
+                        )
+                        self._names = None
+                    else:
+                        merged = merge_bounds(row, (lower, upper))
+                        conn.execute(
+                            "UPDATE opponents SET ac_lower = ?, ac_upper = ? WHERE name = ?", (*merged, name)
+                        )
+            for _ in batch:
+                self._writes.task_done()
+        conn.close()
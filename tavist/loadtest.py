@@ -0,0 +1,161 @@
+import argparse
+import asyncio
+import json
+import os
+import time
+from base64 import b64encode
+
+from tavist.server import WS_CLOSE, WS_TEXT, RollService, encode_frame, read_frame, start_server
+
+
+class StandInClient:
+    # Keep-alive HTTP/1.1 client speaking just enough of the protocol for the service.
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.reader: asyncio.StreamReader | None = None
+        self.writer: asyncio.StreamWriter | None = None
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    async def request(self, method: str, path: str, payload: dict | None = None) -> tuple[int, dict]:
+        body = json.dumps(payload).encode() if payload is not None else b""
+        self.writer.write(
+            f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body
+        )
+        await self.writer.drain()
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            key, _, value = line.decode("latin-1").partition(":")
+            if key.strip().lower() == "content-length":
+                length = int(value)
+        return status, json.loads(await self.reader.readexactly(length))
+
+    async def close(self):
+        if self.writer:
+            self.writer.close()
+            await self.writer.wait_closed()
+
+
+class StandInSubscriber:
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.events: list[dict] = []
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        key = b64encode(os.urandom(16)).decode()
+        self.writer.write(
+            (
+                f"GET /events HTTP/1.1\r\nHost: {self.host}\r\n"
+                "Upgrade: websocket\r\nConnection: Upgrade\r\n"
+                f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n"
+            ).encode()
+        )
+        await self.writer.drain()
+        while (await self.reader.readline()) not in (b"\r\n", b""):
+            pass
+
+    async def listen(self):
+        try:
+            while True:
+                # events come from the service itself, so allow more than it accepts
+                opcode, payload = await read_frame(self.reader, max_size=1 << 24)
+                if opcode == WS_TEXT:
+                    self.events.append(json.loads(payload))
+                elif opcode == WS_CLOSE:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+
+    async def close(self):
+        self.writer.write(encode_frame(b"\x03\xe8", WS_CLOSE, mask=os.urandom(4)))
+        await self.writer.drain()
+        self.writer.close()
+
+
+def percentile(samples: list[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def run_load(
+    host: str = "127.0.0.1",
+    port: int | None = None,
+    clients: int = 40,
+    requests: int = 50,
+    subscribers: int = 10,
+) -> dict:
+    server = None
+    if port is None:
+        server = await start_server(RollService(), host, 0)
+        port = server.sockets[0].getsockname()[1]
+
+    listeners = [StandInSubscriber(host, port) for _ in range(subscribers)]
+    for listener in listeners:
+        await listener.connect()
+    listen_tasks = [asyncio.create_task(listener.listen()) for listener in listeners]
+
+    latencies: list[float] = []
+    errors: dict[str, int] = {}
+    routes = [("POST", "/attack"), ("POST", "/full-attack"), ("GET", "/dpr?acs=15-35"), ("GET", "/state")]
+
+    async def client_session(idx: int):
+        client = StandInClient(host, port)
+        await client.connect()
+        for n in range(requests):
+            method, path = routes[(idx + n) % len(routes)]
+            start = time.perf_counter()
+            status, _ = await client.request(method, path)
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                key = f"{method} {path} -> {status}"
+                errors[key] = errors.get(key, 0) + 1
+        await client.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client_session(idx) for idx in range(clients)))
+    elapsed = time.perf_counter() - start
+
+    await asyncio.sleep(0.05)
+    for listener in listeners:
+        await listener.close()
+    await asyncio.gather(*listen_tasks)
+    if server:
+        server.close()
+        await server.wait_closed()
+
+    return {
+        "requests": len(latencies),
+        "errors": sum(errors.values()),
+        "errors_by_route": errors,
+        "seconds": elapsed,
+        "throughput": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "events_per_subscriber": min((len(listener.events) for listener in listeners), default=0),
+    }
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="Load-test the Tavist roll service with stand-in clients.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=None, help="target a running service instead of an in-process one")
+    parser.add_argument("--clients", type=int, default=40)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--subscribers", type=int, default=10)
+    args = parser.parse_args(argv)
+    stats = asyncio.run(run_load(args.host, args.port, args.clients, args.requests, args.subscribers))
+    for key, value in stats.items():
+        print(f"{key}: {value:.2f}" if isinstance(value, float) else f"{key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
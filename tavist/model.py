@@ -1,6 +1,16 @@
-from dataclasses import dataclass, field
+from array import array
+from dataclasses import dataclass, field, replace
 from enum import Enum
 from random import randint
+from typing import TYPE_CHECKING, NamedTuple
+
+from tavist.dice import compile_dice
+from tavist.events import AttackResolved
+from tavist.instrument import timed
+
+if TYPE_CHECKING:
+    from tavist.events import EventBus
+    from tavist.target import Target
 
 
 class BonusType(Enum):
@@ -11,6 +21,34 @@ class BonusType(Enum):
     TWO_WEAPONS = "two-weapons"
     WEAPON_FOCUS = "weapon-focus"
     POWER_ATTACK = "power-attack"
+    DODGE = "dodge"
+    MORALE = "morale"
+    LUCK = "luck"
+    INSIGHT = "insight"
+    SACRED = "sacred"
+    COMPETENCE = "competence"
+
+
+# these add up; every other type keeps only its best bonus and its worst penalty
+STACKING_TYPES = frozenset(
+    {
+        BonusType.UNNAMED,
+        BonusType.DODGE,
+        BonusType.BAB,
+        BonusType.ABILITY,
+        BonusType.TWO_WEAPONS,
+        BonusType.POWER_ATTACK,
+    }
+)
+
+# bumped by every change to a bonus or a bonus list; resolved totals are cached against it
+_generation = 0
+_UNSET = object()
+
+
+def _bump_generation():
+    global _generation
+    _generation += 1
 
 
 class DamageType(Enum):
@@ -18,12 +56,77 @@ class DamageType(Enum):
     PIERCING = "piercing"
 
 
+class CritDamageMode(Enum):
+    INDEPENDENT = "independent"  # crit damage rolled separately on every attack
+    LAZY = "lazy"  # crit damage rolled separately, only on a threat
+    DERIVED = "derived"  # on a threat, the normal roll plus the extra crit dice
+
+
 @dataclass()
 class Bonus:
     bonus: int = 0
     type: BonusType = BonusType.UNNAMED
     label: str | None = None
 
+    def __setattr__(self, name, value):
+        if self.__dict__.get(name, _UNSET) != value:
+            object.__setattr__(self, name, value)
+            _bump_generation()
+
+
+class BonusList(list):
+    def _changed(method):
+        def wrapper(self, *args):
+            result = method(self, *args)
+            _bump_generation()
+            return result
+
+        return wrapper
+
+    append = _changed(list.append)
+    extend = _changed(list.extend)
+    insert = _changed(list.insert)
+    remove = _changed(list.remove)
+    pop = _changed(list.pop)
+    clear = _changed(list.clear)
+    sort = _changed(list.sort)
+    reverse = _changed(list.reverse)
+    __setitem__ = _changed(list.__setitem__)
+    __delitem__ = _changed(list.__delitem__)
+    __iadd__ = _changed(list.__iadd__)
+    del _changed
+
+
+class AppliedBonus(NamedTuple):
+    # what a bonus was worth when it was rolled; the live Bonus keeps changing
+    bonus: int
+    type: BonusType
+    label: str | None
+
+
+@dataclass(frozen=True)
+class ResolvedBonuses:
+    total: int
+    applied: tuple[Bonus, ...]
+    frozen: tuple[AppliedBonus, ...] = ()
+
+
+def resolve_bonuses(bonuses: list[Bonus]) -> ResolvedBonuses:
+    best: dict[BonusType, Bonus] = {}
+    worst: dict[BonusType, Bonus] = {}
+    for b in bonuses:
+        if b.type in STACKING_TYPES:
+            continue
+        if b.bonus >= 0:
+            if b.type not in best or b.bonus > best[b.type].bonus:
+                best[b.type] = b
+        elif b.type not in worst or b.bonus < worst[b.type].bonus:
+            worst[b.type] = b
+    kept = {id(b) for b in (*best.values(), *worst.values())}
+    applied = tuple(b for b in bonuses if b.type in STACKING_TYPES or id(b) in kept)
+    frozen = tuple(AppliedBonus(b.bonus, b.type, b.label) for b in applied)
+    return ResolvedBonuses(sum(b.bonus for b in applied), applied, frozen)
+
 
 @dataclass(kw_only=True)
 class Dice:
@@ -42,13 +145,40 @@ class WeaponDamageDice(Dice):
     pass
 
 
-@dataclass
 class RolledDice:
-    label: str | None
-    rolls: list[list[int]] = field(default_factory=list)
-    bonuses: list[Bonus] = field(default_factory=list)
-    total: int = 0
-    dice: list[Dice] = field(default_factory=list)
+    # faces of every die group packed in one array; offsets[i]:offsets[i + 1] is group i
+    __slots__ = ("label", "faces", "offsets", "bonuses", "total", "dice")
+
+    def __init__(
+        self,
+        label: str | None,
+        faces: array | None = None,
+        offsets: tuple[int, ...] = (0,),
+        bonuses: tuple[AppliedBonus, ...] = (),
+        total: int = 0,
+        dice: tuple[Dice, ...] = (),
+    ):
+        self.label = label
+        self.faces = faces if faces is not None else array("B")
+        self.offsets = offsets
+        self.bonuses = bonuses
+        self.total = total
+        self.dice = dice
+
+    def __repr__(self) -> str:
+        return f"RolledDice({self.label!r}, rolls={self.rolls!r}, total={self.total})"
+
+    def group(self, idx: int) -> array:
+        return self.faces[self.offsets[idx]:self.offsets[idx + 1]]
+
+    @property
+    def rolls(self) -> list[list[int]]:
+        # list-of-lists view for callers that want one, built on demand
+        return [self.faces[a:b].tolist() for a, b in zip(self.offsets, self.offsets[1:])]
+
+
+def _faces_array(dice) -> array:
+    return array("B" if all(die.d < 256 for die in dice) else "H")
 
 
 @dataclass(kw_only=True)
@@ -57,23 +187,44 @@ class Roll:
     dice: list[Dice] = field(default_factory=list)
     bonuses: list[Bonus] = field(default_factory=list)
 
-    def roll(self) -> RolledDice:
-        rolled_dice = RolledDice(self.label)
-        rolled_dice.dice = self.dice
-        rolled_dice.rolls = []
-        for roll in self.dice:
-            rolls = []
-            for n in range(roll.n):
-                rolled_die = randint(1, roll.d)
-                rolls.append(rolled_die)
-                rolled_dice.total += rolled_die
-            rolled_dice.rolls.append(rolls)
+    def __setattr__(self, name, value):
+        if name == "bonuses":
+            value = value if isinstance(value, BonusList) else BonusList(value)
+            _bump_generation()
+        object.__setattr__(self, name, value)
+
+    def resolved_bonuses(self) -> ResolvedBonuses:
+        # stacking is resolved once per configuration, not on every roll or evaluation
+        cached = self.__dict__.get("_resolved")
+        if cached is None or cached[0] != _generation:
+            cached = (_generation, resolve_bonuses(self.bonuses))
+            self.__dict__["_resolved"] = cached
+        return cached[1]
+
+    def layout(self, critical: bool = False) -> tuple[tuple[Dice, ...], tuple[int, ...], tuple[int, ...]]:
+        # dice snapshot, per-die roll counts and group offsets, shared by every roll until
+        # the dice list changes; toggles swap Dice in and out rather than editing them
+        layouts = self.__dict__.setdefault("_layouts", {})
+        cached = layouts.get(critical)
+        if cached is None or len(cached[0]) != len(self.dice) or any(a is not b for a, b in zip(cached[0], self.dice)):
+            dice = tuple(self.dice)
+            counts = tuple(die.n * (2 if critical and isinstance(die, WeaponDamageDice) else 1) for die in dice)
+            offsets = [0]
+            for count in counts:
+                offsets.append(offsets[-1] + count)
+            cached = layouts[critical] = (dice, counts, tuple(offsets))
+        return cached
 
-        rolled_dice.bonuses = self.bonuses
-        for bonus in self.bonuses:
-            rolled_dice.total += bonus.bonus
+    def roll(self) -> RolledDice:
+        # the dice and bonuses are snapshotted, so later toggles leave the result alone
+        dice, counts, offsets = self.layout()
+        faces = _faces_array(dice)
+        for die, count in zip(dice, counts):
+            for _ in range(count):
+                faces.append(randint(1, die.d))
 
-        return rolled_dice
+        resolved = self.resolved_bonuses()
+        return RolledDice(self.label, faces, offsets, resolved.frozen, sum(faces) + resolved.total, dice)
 
 
 @dataclass(kw_only=True)
@@ -89,23 +240,37 @@ class DamageRoll(Roll):
     type: DamageType
 
     def roll(self, critical: bool = False) -> RolledDice:
-        rolled_dice = RolledDice(self.label)
-        rolled_dice.dice = self.dice
-        rolled_dice.rolls = []
-        for die in self.dice:
-            rolls = []
-            repeat = die.n * (2 if critical and isinstance(die, WeaponDamageDice) else 1)
-            for _ in range(repeat):
-                rolled_die = randint(1, die.d)
-                rolls.append(rolled_die)
-                rolled_dice.total += rolled_die
-            rolled_dice.rolls.append(rolls)
-
-        rolled_dice.bonuses = self.bonuses
-        for bonus in self.bonuses:
-            rolled_dice.total += bonus.bonus * 2 if critical else bonus.bonus
-
-        return rolled_dice
+        dice, counts, offsets = self.layout(critical)
+        faces = _faces_array(dice)
+        for die, count in zip(dice, counts):
+            for _ in range(count):
+                faces.append(randint(1, die.d))
+
+        resolved = self.resolved_bonuses()
+        total = sum(faces) + (resolved.total * 2 if critical else resolved.total)
+        return RolledDice(self.label, faces, offsets, resolved.frozen, total, dice)
+
+    def roll_critical_from(self, normal: RolledDice) -> RolledDice:
+        faces = _faces_array(normal.dice)
+        offsets = [0]
+        for idx, die in enumerate(normal.dice):
+            faces.extend(normal.group(idx))
+            if isinstance(die, WeaponDamageDice):
+                for _ in range(die.n):
+                    faces.append(randint(1, die.d))
+            offsets.append(len(faces))
+
+        total = sum(faces) + sum(bonus.bonus * 2 for bonus in normal.bonuses)
+        return RolledDice(self.label, faces, tuple(offsets), normal.bonuses, total, normal.dice)
+
+
+def damage_label(bonus: "Bonus | AppliedBonus", weapon_label: str) -> str:
+    # ability, enhancement and power attack damage is weapon damage of the weapon's type
+    if bonus.type in (BonusType.ABILITY, BonusType.ENHANCEMENT, BonusType.POWER_ATTACK):
+        return weapon_label
+    if bonus.type != BonusType.UNNAMED:
+        return bonus.type.value
+    return bonus.label or "unnamed"
 
 
 @dataclass(kw_only=True)
@@ -113,17 +278,73 @@ class AttackAction:
     label: str
     attack: AttackRoll
     damage: DamageRoll
+    crit_damage: CritDamageMode = CritDamageMode.INDEPENDENT
 
-    def do_attack(self):
+    @timed("do_attack")
+    def do_attack(self, quiet: bool = False, bus: "EventBus | None" = None):
+        # with a bus the report is left to its subscribers; quiet skips it entirely
         attack_roll = self.attack.roll()
-        attack_die = attack_roll.rolls[0][0]
+        attack_die = attack_roll.faces[0]
         threat = attack_die >= self.attack.critical_threshold
         confirm_roll = self.attack.roll() if threat else None
         nat_one = attack_die == 1
         nat_twenty = attack_die == 20
 
         damage_roll = self.damage.roll(critical=False)
-        crit_damage_roll = self.damage.roll(critical=True)
+        if self.crit_damage is CritDamageMode.INDEPENDENT:
+            crit_damage_roll = self.damage.roll(critical=True)
+        elif not threat:
+            crit_damage_roll = None
+        elif self.crit_damage is CritDamageMode.LAZY:
+            crit_damage_roll = self.damage.roll(critical=True)
+        else:
+            crit_damage_roll = self.damage.roll_critical_from(damage_roll)
+        weapon_label = self.damage.type.value
+
+        def build_breakdown(rolled: RolledDice, critical: bool) -> dict[str, int]:
+            breakdown: dict[str, int] = {}
+            for idx, die in enumerate(rolled.dice):
+                label = weapon_label if isinstance(die, WeaponDamageDice) else die.label or "damage"
+                total = sum(rolled.group(idx))
+                breakdown[label] = breakdown.get(label, 0) + total
+            for bonus in rolled.bonuses:
+                name = damage_label(bonus, weapon_label)
+                bonus_total = bonus.bonus * 2 if critical else bonus.bonus
+                breakdown[name] = breakdown.get(name, 0) + bonus_total
+            return breakdown
+
+        breakdown_normal = {label: val for label, val in build_breakdown(damage_roll, critical=False).items() if val != 0}
+        breakdown_critical = {}
+        if crit_damage_roll is not None:
+            breakdown_critical = {
+                label: val for label, val in build_breakdown(crit_damage_roll, critical=True).items() if val != 0
+            }
+
+        damage_base = sum(breakdown_normal.values())
+        damage_crit = sum(breakdown_critical.values()) if crit_damage_roll is not None else None
+        result = {
+            "label": self.label,
+            "attack_total": attack_roll.total,
+            "attack_die": attack_die,
+            "threat": threat,
+            "confirm_total": confirm_roll.total if confirm_roll else None,
+            "damage_normal": damage_base,
+            "damage_critical": damage_crit,
+            "breakdown_normal": breakdown_normal,
+            "breakdown_critical": breakdown_critical,
+            "natural_one": nat_one,
+            "natural_twenty": nat_twenty,
+        }
+        if bus is not None:
+            bus.publish(AttackResolved(self, result, attack_roll, damage_roll, crit_damage_roll))
+        elif not quiet:
+            print(self.report(result, attack_roll, damage_roll, crit_damage_roll))
+            print()
+        return result
+
+    def report(
+        self, result: dict, attack_roll: RolledDice, damage_roll: RolledDice, crit_damage_roll: RolledDice | None
+    ) -> str:
         weapon_label = self.damage.type.value
         attack_mods = []
         for bonus in attack_roll.bonuses:
@@ -131,15 +352,15 @@ class AttackAction:
             attack_mods.append(f"{name}[{bonus.bonus:+}]")
         attack_mods_text = " + ".join(attack_mods) if attack_mods else "no modifiers"
 
-        def format_rolls(die: Dice, rolls: list[int]) -> str:
+        def format_rolls(die: Dice, rolls: array) -> str:
             joined = ",".join(str(r) for r in rolls)
             return f"d{die.d}({joined})"
 
         damage_dice_parts = []
         for idx, die in enumerate(damage_roll.dice):
             label = die.label or "damage"
-            normal_rolls = format_rolls(die, damage_roll.rolls[idx])
-            crit_rolls = format_rolls(die, crit_damage_roll.rolls[idx])
+            normal_rolls = format_rolls(die, damage_roll.group(idx))
+            crit_rolls = format_rolls(die, crit_damage_roll.group(idx)) if crit_damage_roll else normal_rolls
             crit_tag = " *2 on crit" if isinstance(die, WeaponDamageDice) else ""
             if crit_rolls != normal_rolls:
                 damage_dice_parts.append(f"{label}: {normal_rolls}{crit_tag}; crit: {crit_rolls}")
@@ -149,97 +370,42 @@ class AttackAction:
 
         damage_bonus_parts = []
         for bonus in damage_roll.bonuses:
-            name = (
-                weapon_label
-                if bonus.type
-                in (
-                    BonusType.ABILITY,
-                    BonusType.ENHANCEMENT,
-                    BonusType.POWER_ATTACK,
-                )
-                else bonus.type.value
-                if bonus.type != BonusType.UNNAMED
-                else bonus.label
-                or "unnamed"
-            )
+            name = damage_label(bonus, weapon_label)
             damage_bonus_parts.append(f"{name}[{bonus.bonus:+}] *2 on crit")
         damage_bonus_text = " + ".join(damage_bonus_parts) if damage_bonus_parts else "none"
 
-        def build_breakdown(rolled: RolledDice, critical: bool) -> dict[str, int]:
-            breakdown: dict[str, int] = {}
-            for idx, die in enumerate(rolled.dice):
-                label = weapon_label if isinstance(die, WeaponDamageDice) else die.label or "damage"
-                total = sum(rolled.rolls[idx])
-                breakdown[label] = breakdown.get(label, 0) + total
-            for bonus in rolled.bonuses:
-                name = (
-                    weapon_label
-                    if bonus.type
-                    in (
-                        BonusType.ABILITY,
-                        BonusType.ENHANCEMENT,
-                        BonusType.POWER_ATTACK,
-                    )
-                    else bonus.type.value
-                    if bonus.type != BonusType.UNNAMED
-                    else bonus.label
-                    or "unnamed"
-                )
-                bonus_total = bonus.bonus * 2 if critical else bonus.bonus
-                breakdown[name] = breakdown.get(name, 0) + bonus_total
-            return breakdown
-
-        breakdown_normal = {label: val for label, val in build_breakdown(damage_roll, critical=False).items() if val != 0}
-        breakdown_critical = {
-            label: val for label, val in build_breakdown(crit_damage_roll, critical=True).items() if val != 0
-        }
-
-        damage_base = sum(breakdown_normal.values())
-        damage_crit = sum(breakdown_critical.values())
-
         def format_breakdown_map(mapping: dict[str, int]) -> str:
             if not mapping:
                 return "none"
             parts = [f"{k} {v}" for k, v in sorted(mapping.items())]
             return ", ".join(parts)
 
+        threat = result["threat"]
         lines = [
-            f"=== Attack: {self.label} ===",
-            f"Attack total: {attack_roll.total} (d20={attack_die}{' CRIT THREAT' if threat else ''})",
+            f"=== Attack: {result['label']} ===",
+            f"Attack total: {attack_roll.total} (d20={result['attack_die']}{' CRIT THREAT' if threat else ''})",
             f"Attack mods: {attack_mods_text}",
         ]
-        if nat_one:
+        if result["natural_one"]:
             lines.append("Natural 1: automatic miss")
-        elif threat and confirm_roll is not None:
+        elif threat and result["confirm_total"] is not None:
             lines.append(
-                f"Confirm roll: {confirm_roll.total} (crit confirms on AC {confirm_roll.total})"
+                f"Confirm roll: {result['confirm_total']} (crit confirms on AC {result['confirm_total']})"
             )
         else:
             lines.append("No critical threat")
 
+        lines.append(f"Damage (normal): {result['damage_normal']}")
+        if crit_damage_roll is not None:
+            lines.append(f"Damage (critical): {result['damage_critical']} (if confirmed)")
+        lines.append(f"Breakdown normal: {format_breakdown_map(result['breakdown_normal'])}")
+        if crit_damage_roll is not None:
+            lines.append(f"Breakdown critical: {format_breakdown_map(result['breakdown_critical'])}")
         lines += [
-            f"Damage (normal): {damage_base}",
-            f"Damage (critical): {damage_crit} (if confirmed)",
-            f"Breakdown normal: {format_breakdown_map(breakdown_normal)}",
-            f"Breakdown critical: {format_breakdown_map(breakdown_critical)}",
             f"Damage dice: {damage_dice_text}",
             f"Damage mods: {damage_bonus_text}",
         ]
-        print("\n".join(lines))
-        print()
-        return {
-            "label": self.label,
-            "attack_total": attack_roll.total,
-            "attack_die": attack_die,
-            "threat": threat,
-            "confirm_total": confirm_roll.total if confirm_roll else None,
-            "damage_normal": damage_base,
-            "damage_critical": damage_crit,
-            "breakdown_normal": breakdown_normal,
-            "breakdown_critical": breakdown_critical,
-            "natural_one": nat_one,
-            "natural_twenty": nat_twenty,
-        }
+        return "\n".join(lines)
 
 
 class Tavist:
@@ -253,7 +419,7 @@ class Tavist:
         self.bab = Bonus(12, BonusType.BAB)
         self.combat_expertise = Bonus(0, label="expertise")
 
-        self.holy_dice: DamageDice = DamageDice(n=2, d=6, label="holy")
+        (self.holy_dice,) = compile_dice("2d6[holy]").damage_dice()
         self.surge_bonus_main: Bonus = Bonus(bonus=4, type=BonusType.ABILITY, label="power-surge")
         self.surge_bonus_off: Bonus = Bonus(bonus=2, type=BonusType.ABILITY, label="power-surge")
         self.surge_bonus_attack_main: Bonus = Bonus(bonus=4, type=BonusType.ABILITY, label="power-surge")
@@ -305,10 +471,7 @@ class Tavist:
 
         self.katana_damage = DamageRoll(
             type=DamageType.SLASHING,
-            dice=[
-                WeaponDamageDice(d=10, label="weapon"),
-                DamageDice(d=6, label="merciful"),
-            ],
+            dice=compile_dice("1d10[weapon,crit]+1d6[merciful]").damage_dice(),
             bonuses=[
                 Bonus(2, BonusType.ENHANCEMENT),
                 self.ability_main,
@@ -321,7 +484,7 @@ class Tavist:
 
         self.wakasashi_damage = DamageRoll(
             type=DamageType.PIERCING,
-            dice=[WeaponDamageDice(d=6, label="weapon"), Dice(d=6, label="merciful")],
+            dice=compile_dice("1d6[weapon,crit]+1d6[merciful]").damage_dice(),
             bonuses=[
                 Bonus(1, BonusType.ENHANCEMENT),
                 self.ability_off,
@@ -347,6 +510,10 @@ class Tavist:
         self.set_power_attack(0)
         self._update_surge()
 
+    def set_crit_damage_mode(self, mode: CritDamageMode):
+        self.katana_attack_action.crit_damage = mode
+        self.wakasashi_attack_action.crit_damage = mode
+
     def set_external_hit(self, bonus: int):
         self.external_hit.bonus = bonus
 
@@ -403,72 +570,123 @@ class Tavist:
             self.ability_fatigue_off.bonus = 0
 
 
-def expected_attack_damage(action: AttackAction, ac: int) -> float:
-    atk_bonus = sum(b.bonus for b in action.attack.bonuses)
-    threshold = action.attack.critical_threshold
-
-    mean_normal = sum(d.n * (d.d + 1) / 2 for d in action.damage.dice) + sum(
-        b.bonus for b in action.damage.bonuses
+@dataclass(frozen=True)
+class AttackProfile:
+    attack_bonus: int
+    critical_threshold: int
+    mean_normal: float
+    mean_crit: float
+
+
+def attack_profile(action: AttackAction, target: "Target | None" = None) -> AttackProfile:
+    if target is not None and target.affects_damage:
+        mean_normal, mean_crit = target.hit_means(action.damage)
+    else:
+        damage_bonus = action.damage.resolved_bonuses().total
+        mean_normal = sum(d.n * (d.d + 1) / 2 for d in action.damage.dice) + damage_bonus
+        mean_crit = sum(
+            d.n * (d.d + 1) / 2 * (2 if isinstance(d, WeaponDamageDice) else 1)
+            for d in action.damage.dice
+        ) + damage_bonus * 2
+    return AttackProfile(
+        attack_bonus=action.attack.resolved_bonuses().total,
+        critical_threshold=action.attack.critical_threshold,
+        mean_normal=mean_normal,
+        mean_crit=mean_crit,
     )
-    mean_crit = sum(
-        d.n * (d.d + 1) / 2 * (2 if isinstance(d, WeaponDamageDice) else 1)
-        for d in action.damage.dice
-    ) + sum(b.bonus * 2 for b in action.damage.bonuses)
-
-    def hit_for_roll(r: int) -> bool:
-        if r == 1:
-            return False
-        if r == 20:
-            return True
-        return r + atk_bonus >= ac
-
-    hit_count = 0
-    threat_count = 0
-    for r in range(1, 21):
-        if hit_for_roll(r):
-            hit_count += 1
-            if r >= threshold:
-                threat_count += 1
-    hit_prob = hit_count / 20
-    threat_prob = threat_count / 20
-
-    confirm_count = 0
-    for r in range(1, 21):
-        if hit_for_roll(r):
-            confirm_count += 1
-    confirm_prob = confirm_count / 20
-
-    extra_on_crit = mean_crit - mean_normal
-    expected = hit_prob * mean_normal + threat_prob * confirm_prob * extra_on_crit
-    return expected
 
 
-def expected_full_attack(
-    tavist: Tavist, ac: int, two_handed: bool, attacks: list[int], attack_names: list[str]
-) -> float:
+def hit_faces(attack_bonus: int, ac: int) -> int:
+    # d20 faces that hit: natural 1 always misses, natural 20 always hits, and the
+    # hitting faces are always the top ones, so the count is a clamped line.
+    return min(19, max(1, 21 - ac + attack_bonus))
+
+
+def threat_faces(attack_bonus: int, critical_threshold: int, ac: int) -> int:
+    return min(hit_faces(attack_bonus, ac), 21 - critical_threshold)
+
+
+def expected_profile_damage(profile: AttackProfile, ac: int) -> float:
+    hit_prob = hit_faces(profile.attack_bonus, ac) / 20
+    threat_prob = threat_faces(profile.attack_bonus, profile.critical_threshold, ac) / 20
+    # the confirmation roll uses the same bonus, so it confirms exactly when a hit would
+    confirm_prob = hit_prob
+    extra_on_crit = profile.mean_crit - profile.mean_normal
+    return hit_prob * profile.mean_normal + threat_prob * confirm_prob * extra_on_crit
+
+
+def expected_attack_damage(action: AttackAction, ac: int, target: "Target | None" = None) -> float:
+    return expected_profile_damage(attack_profile(action, target), ac)
+
+
+def off_hand_bonus(attacks: list[int]) -> int:
+    # the off-hand attacks once, at the full base attack bonus. The baseline GUI hard-coded
+    # Tavist's 12; taking the top iterative gives the same for [12, 12, 7, 2] and follows
+    # a customised list or a sweep level instead of staying at 12
+    return max(attacks)
+
+
+def full_attack_profiles(
+    tavist: Tavist, two_handed: bool, attacks: list[int], target: "Target | None" = None
+) -> list[AttackProfile]:
     prev_two = tavist.two_handed_mode
     prev_pa = tavist.power_attack_value
     prev_bab = tavist.bab.bonus
 
     tavist.set_two_handed(two_handed)
-    total = 0.0
-
-    for idx, bonus in enumerate(attacks):
-        tavist.bab.bonus = bonus
-        total += expected_attack_damage(tavist.katana_attack_action, ac)
+    # BAB always stacks, so the iteratives differ from one profile only by attack bonus
+    main = attack_profile(tavist.katana_attack_action, target)
+    profiles = [
+        replace(main, attack_bonus=main.attack_bonus + bonus - tavist.bab.bonus) for bonus in attacks
+    ]
 
     if not two_handed:
-        tavist.bab.bonus = 12
-        total += expected_attack_damage(tavist.wakasashi_attack_action, ac)
+        tavist.bab.bonus = off_hand_bonus(attacks)
+        profiles.append(attack_profile(tavist.wakasashi_attack_action, target))
 
     tavist.set_two_handed(prev_two)
     tavist.set_power_attack(prev_pa)
     tavist.bab.bonus = prev_bab
-    return total
+    return profiles
+
+
+def expected_profiles_by_ac(profiles: list[AttackProfile], acs: list[int]) -> list[float]:
+    # (iterative x AC) table of hit/threat face counts, contracted against the
+    # per-iterative mean damage; the d20 axis collapses into the face counts.
+    hits = [[hit_faces(p.attack_bonus, ac) for ac in acs] for p in profiles]
+    threats = [
+        [min(h, 21 - p.critical_threshold) for h in row] for p, row in zip(profiles, hits)
+    ]
+    totals = [0.0] * len(acs)
+    for p, hit_row, threat_row in zip(profiles, hits, threats):
+        extra_on_crit = p.mean_crit - p.mean_normal
+        for idx, (h, t) in enumerate(zip(hit_row, threat_row)):
+            hit_prob = h / 20
+            totals[idx] += hit_prob * p.mean_normal + t / 20 * hit_prob * extra_on_crit
+    return totals
+
+
+def expected_full_attack_by_ac(
+    tavist: Tavist, acs: list[int], two_handed: bool, attacks: list[int], target: "Target | None" = None
+) -> list[float]:
+    return expected_profiles_by_ac(full_attack_profiles(tavist, two_handed, attacks, target), list(acs))
+
+
+@timed("expected_full_attack")
+def expected_full_attack(
+    tavist: Tavist,
+    ac: int,
+    two_handed: bool,
+    attacks: list[int],
+    attack_names: list[str],
+    target: "Target | None" = None,
+) -> float:
+    return expected_full_attack_by_ac(tavist, [ac], two_handed, attacks, target)[0]
 
 
+@timed("recommend_setup")
 def recommend_setup(
-    tavist: Tavist, ac: int, attacks: list[int], attack_names: list[str]
+    tavist: Tavist, ac: int, attacks: list[int], attack_names: list[str], target: "Target | None" = None
 ) -> tuple[int, bool]:
     orig_pa = tavist.power_attack_value
     orig_two = tavist.two_handed_mode
@@ -477,7 +695,7 @@ def recommend_setup(
         pa_max = 12 if not two_handed else 12
         for pa in range(0, pa_max + 1):
             tavist.set_power_attack(pa)
-            dpr = expected_full_attack(tavist, ac, two_handed, attacks, attack_names)
+            dpr = expected_full_attack(tavist, ac, two_handed, attacks, attack_names, target)
             if dpr > best[0]:
                 best = (dpr, pa, two_handed)
     tavist.set_two_handed(orig_two)
@@ -0,0 +1,73 @@
+from functools import lru_cache, reduce
+
+from tavist.dice import convolve
+from tavist.model import Tavist, full_attack_profiles, hit_faces
+from tavist.target import Target, group_pmf, damage_plan
+
+NO_DEFENSES = Target()
+
+
+def full_attack_outcomes(tavist: Tavist, two_handed: bool, attacks: list[int]) -> tuple[tuple, ...]:
+    # (attack bonus, threat threshold, damage plan) per attack in the full attack
+    prev_two = tavist.two_handed_mode
+    tavist.set_two_handed(two_handed)
+    main = damage_plan(tavist.katana_attack_action.damage)
+    off = damage_plan(tavist.wakasashi_attack_action.damage)
+    tavist.set_two_handed(prev_two)
+    profiles = full_attack_profiles(tavist, two_handed, attacks)
+    plans = [main] * len(attacks) + [off] * (len(profiles) - len(attacks))
+    return tuple((p.attack_bonus, p.critical_threshold, plan) for p, plan in zip(profiles, plans))
+
+
+@lru_cache(maxsize=256)
+def hit_pmf(plan: tuple, target: Target, critical: bool) -> dict[int, float]:
+    # damage of one hit; labels the target reduces together are clipped as a group
+    by_label = {label: (dice, constant) for label, dice, constant in plan}
+    parts = []
+    for labels, amount in target.reductions(sorted(by_label)):
+        groups = [by_label.pop(label) for label in labels]
+        dice = tuple(die for group, _ in groups for die in group)
+        constant = sum(c for _, c in groups)
+        clipped: dict[int, float] = {}
+        for value, p in group_pmf(dice, constant, critical).items():
+            clipped[max(0, value - amount)] = clipped.get(max(0, value - amount), 0.0) + p
+        parts.append(clipped)
+    parts += [group_pmf(dice, constant, critical) for dice, constant in by_label.values()]
+    return reduce(convolve, parts, {0: 1.0})
+
+
+@lru_cache(maxsize=4096)
+def attack_pmf(attack_bonus: int, critical_threshold: int, plan: tuple, target: Target, ac: int) -> dict[int, float]:
+    # miss / hit / confirmed crit mixture of one attack; cached per (bonus, AC), so
+    # iteratives that share a bonus and repeated ACs are only built once
+    h = hit_faces(attack_bonus, ac)
+    t = min(h, 21 - critical_threshold)
+    crit = t / 20 * h / 20 * target.hit_chance
+    normal = h / 20 * target.hit_chance - crit
+    pmf = {0: 1 - normal - crit}
+    for weight, damage in ((normal, hit_pmf(plan, target, False)), (crit, hit_pmf(plan, target, True))):
+        for value, p in damage.items():
+            pmf[value] = pmf.get(value, 0.0) + weight * p
+    return pmf
+
+
+@lru_cache(maxsize=256)
+def _full_pmf(outcomes: tuple, target: Target, ac: int) -> dict[int, float]:
+    pmfs = [attack_pmf(bonus, threshold, plan, target, ac) for bonus, threshold, plan in outcomes]
+    return dict(sorted(reduce(convolve, pmfs, {0: 1.0}).items()))
+
+
+def full_attack_pmf(
+    tavist: Tavist, ac: int, two_handed: bool, attacks: list[int], target: Target | None = None
+) -> dict[int, float]:
+    # the iteratives roll independently, so the round's PMF is their convolution; the
+    # returned dict is shared with the cache and must not be modified
+    return _full_pmf(full_attack_outcomes(tavist, two_handed, attacks), target or NO_DEFENSES, ac)
+
+
+def pmf_mean(pmf: dict[int, float]) -> float:
+    return sum(value * p for value, p in pmf.items())
+
+
+def prob_at_least(pmf: dict[int, float], damage: int) -> float:
+    return sum(p for value, p in pmf.items() if value >= damage)
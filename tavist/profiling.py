@@ -0,0 +1,140 @@
+import argparse
+import cProfile
+import inspect
+import json
+import time
+import tracemalloc
+from collections.abc import Callable
+from pathlib import Path
+
+from tavist.model import AttackAction, DamageRoll, Roll
+
+DEFAULT_PROFILE_DIR = Path.home() / ".tavist" / "profiles"
+
+_NOISE = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, cProfile.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+]
+
+
+def source_region(fn: Callable) -> list:
+    fn = inspect.unwrap(fn)
+    lines, first = inspect.getsourcelines(fn)
+    return [fn.__code__.co_filename, first, first + len(lines) - 1]
+
+
+def default_regions() -> dict[str, list[list]]:
+    return {
+        "rolled dice": [source_region(f) for f in (Roll.roll, DamageRoll.roll, DamageRoll.roll_critical_from)],
+        "result dicts": [source_region(AttackAction.do_attack)],
+    }
+
+
+class ProfileCapture:
+    def __init__(
+        self,
+        directory: str | Path = DEFAULT_PROFILE_DIR,
+        regions: dict[str, list[list]] | None = None,
+        gauges: Callable[[], dict] | None = None,
+        frames: int = 1,
+    ):
+        self.directory = Path(directory)
+        self.regions = regions if regions is not None else default_regions()
+        self.gauges = gauges
+        self.frames = frames
+        self._profiler: cProfile.Profile | None = None
+        self._owns_tracing = False
+        self._stamp = ""
+
+    @property
+    def active(self) -> bool:
+        return self._profiler is not None
+
+    def start(self) -> Path:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._stamp = time.strftime("%Y%m%d-%H%M%S")
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._owns_tracing = True
+        baseline = self._snapshot("start")
+        self._profiler = cProfile.Profile()
+        self._profiler.enable()
+        return baseline
+
+    def stop(self) -> dict[str, Path]:
+        self._profiler.disable()
+        stats_path = self.directory / f"{self._stamp}.pstats"
+        self._profiler.dump_stats(stats_path)
+        self._profiler = None
+        end = self._snapshot("stop")
+        if self._owns_tracing:
+            tracemalloc.stop()
+            self._owns_tracing = False
+        growth = self.directory / f"{self._stamp}-growth.txt"
+        growth.write_text(diff_snapshots(self.directory / f"{self._stamp}-start.tmsnap", end))
+        return {"pstats": stats_path, "snapshot": end, "growth": growth}
+
+    def toggle(self) -> dict[str, Path] | Path:
+        return self.stop() if self.active else self.start()
+
+    def _snapshot(self, tag: str) -> Path:
+        path = self.directory / f"{self._stamp}-{tag}.tmsnap"
+        tracemalloc.take_snapshot().filter_traces(_NOISE).dump(str(path))
+        meta = {"gauges": self.gauges() if self.gauges else {}, "regions": self.regions}
+        path.with_suffix(".json").write_text(json.dumps(meta))
+        return path
+
+
+def load_snapshot(path: str | Path) -> tuple[tracemalloc.Snapshot, dict]:
+    path = Path(path)
+    meta_path = path.with_suffix(".json")
+    meta = json.loads(meta_path.read_text()) if meta_path.exists() else {"gauges": {}, "regions": {}}
+    return tracemalloc.Snapshot.load(str(path)), meta
+
+
+def region_of(regions: dict[str, list[list]], filename: str, lineno: int) -> str | None:
+    for label, spans in regions.items():
+        for span_file, first, last in spans:
+            if span_file == filename and first <= lineno <= last:
+                return label
+    return None
+
+
+def diff_snapshots(old_path: str | Path, new_path: str | Path, limit: int = 10) -> str:
+    old, old_meta = load_snapshot(old_path)
+    new, new_meta = load_snapshot(new_path)
+    stats = new.compare_to(old, "lineno")
+    regions = new_meta["regions"] or old_meta["regions"]
+
+    by_region: dict[str, list[int]] = {label: [0, 0] for label in regions}
+    for stat in stats:
+        frame = stat.traceback[0]
+        label = region_of(regions, frame.filename, frame.lineno)
+        if label is not None:
+            by_region[label][0] += stat.size_diff
+            by_region[label][1] += stat.count_diff
+
+    lines = ["Growth by source:"]
+    for label, (size, count) in by_region.items():
+        lines.append(f"  {label}: {size / 1024:+.1f} KiB in {count:+d} blocks")
+    lines.append("Gauges:")
+    for key, value in new_meta["gauges"].items():
+        lines.append(f"  {key}: {value} ({value - old_meta['gauges'].get(key, 0):+})")
+    lines.append(f"Top {limit} lines by growth:")
+    lines += [f"  {stat}" for stat in stats[:limit] if stat.size_diff > 0]
+    return "\n".join(lines) + "\n"
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="Compare two tracemalloc snapshots written by Tavist.")
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args(argv)
+    print(diff_snapshots(args.old, args.new, args.limit), end="")
+
+
+if __name__ == "__main__":
+    main()
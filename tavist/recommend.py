@@ -0,0 +1,366 @@
+import heapq
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, replace
+from typing import TYPE_CHECKING
+
+from tavist.instrument import timed
+from tavist.model import (
+    AttackProfile,
+    Tavist,
+    expected_profile_damage,
+    expected_profiles_by_ac,
+    full_attack_profiles,
+    hit_faces,
+)
+from tavist.tracking import TrackerRegistry
+
+if TYPE_CHECKING:
+    from tavist.target import Target
+
+MAX_POWER_ATTACK = 12
+
+
+@dataclass(frozen=True)
+class ModeProfiles:
+    two_handed: bool
+    profiles: tuple[AttackProfile, ...]
+    pa_scales: tuple[float, ...]
+    # per PA, (mean_normal, mean_crit) of every attack; only set when a target's DR or
+    # resistance makes damage stop being linear in PA
+    pa_means: tuple[tuple[tuple[float, float], ...], ...] = ()
+
+    def means(self, idx: int, pa: int) -> tuple[float, float]:
+        if self.pa_means:
+            return self.pa_means[pa][idx]
+        p, pa_damage = self.profiles[idx], int(pa * self.pa_scales[idx])
+        return p.mean_normal + pa_damage, p.mean_crit + 2 * pa_damage
+
+    def profiles_at(self, pa: int, expertise: int) -> list[AttackProfile]:
+        return [_shifted(self, idx, pa, expertise) for idx in range(len(self.profiles))]
+
+
+@dataclass(frozen=True)
+class SetupChoice:
+    power_attack: int
+    expertise: int
+    two_handed: bool
+    dpr: float
+
+
+@dataclass(frozen=True)
+class TargetRecommendation:
+    name: str
+    ac: int
+    current_dpr: float
+    best: SetupChoice
+
+
+def mode_profiles(
+    tavist: Tavist, two_handed: bool, attacks: list[int], target: "Target | None" = None
+) -> ModeProfiles:
+    # Profiles with power attack and expertise stripped out, so any (PA, expertise)
+    # point can be evaluated by shifting the attack bonus and damage means.
+    prev_two = tavist.two_handed_mode
+    prev_pa = tavist.power_attack_value
+    prev_expertise = tavist.combat_expertise.bonus
+
+    tavist.combat_expertise.bonus = 0
+    tavist.set_power_attack(0)
+    profiles = full_attack_profiles(tavist, two_handed, attacks, target)
+    pa_means = []
+    if target is not None and target.affects_damage:
+        for pa in range(MAX_POWER_ATTACK + 1):
+            tavist.set_power_attack(pa)
+            pa_means.append(
+                tuple((p.mean_normal, p.mean_crit) for p in full_attack_profiles(tavist, two_handed, attacks, target))
+            )
+    tavist.set_two_handed(two_handed)
+    main_scale, off_scale = tavist.poweratt_scale_main, tavist.poweratt_scale_off
+
+    tavist.set_two_handed(prev_two)
+    tavist.set_power_attack(prev_pa)
+    tavist.combat_expertise.bonus = prev_expertise
+
+    scales = [main_scale] * len(attacks)
+    if not two_handed:
+        scales.append(off_scale)
+    return ModeProfiles(two_handed, tuple(profiles), tuple(scales), tuple(pa_means))
+
+
+def _shifted(mode: ModeProfiles, idx: int, pa: int, expertise: int) -> AttackProfile:
+    profile = mode.profiles[idx]
+    mean_normal, mean_crit = mode.means(idx, pa)
+    return replace(
+        profile,
+        attack_bonus=profile.attack_bonus - pa - expertise,
+        mean_normal=mean_normal,
+        mean_crit=mean_crit,
+    )
+
+
+def evaluate_setup(mode: ModeProfiles, ac: int, pa: int, expertise: int) -> float:
+    return sum(expected_profile_damage(p, ac) for p in mode.profiles_at(pa, expertise))
+
+
+def _upper_bound(mode: ModeProfiles, ac: int, pa_lo: int, pa_hi: int, exp_lo: int, exp_hi: int) -> float:
+    # DPR only depends on PA and expertise through the attack bonus (face counts fall
+    # as the penalty grows) and the PA damage (rises with PA). Pairing the most faces
+    # in the box with the most damage in the box bounds every point inside it. Under DR
+    # both means and their difference still never fall as PA rises.
+    bound = 0.0
+    low_penalty, high_penalty = pa_lo + exp_lo, pa_hi + exp_hi
+    for idx, p in enumerate(mode.profiles):
+        normal, crit = mode.means(idx, pa_hi)
+        extra = crit - normal
+        crit_faces = 21 - p.critical_threshold
+        h = hit_faces(p.attack_bonus - low_penalty, ac)
+        t = h if h < crit_faces else crit_faces
+        hit_term, crit_term = h / 20 * normal, t / 20 * h / 20 * extra
+        if normal < 0 or extra < 0:
+            # negative damage means fewer hits are better, so the other corner may win
+            h = hit_faces(p.attack_bonus - high_penalty, ac)
+            t = h if h < crit_faces else crit_faces
+            hit_term = max(hit_term, h / 20 * normal)
+            crit_term = max(crit_term, t / 20 * h / 20 * extra)
+        bound += hit_term + crit_term
+    return bound
+
+
+def setup_modes(
+    tavist: Tavist, attacks: list[int], target: "Target | None" = None
+) -> tuple[ModeProfiles, ...]:
+    return tuple(mode_profiles(tavist, two, attacks, target) for two in (False, True))
+
+
+@timed("recommend_joint_setup")
+def recommend_joint_setup(
+    tavist: Tavist,
+    ac: int,
+    attacks: list[int],
+    attack_names: list[str],
+    max_power_attack: int = MAX_POWER_ATTACK,
+    max_expertise: int = 5,
+    min_defense: int = 0,
+    stats: dict | None = None,
+    target: "Target | None" = None,
+) -> SetupChoice:
+    return search_modes(
+        setup_modes(tavist, attacks, target), ac, max_power_attack, max_expertise, min_defense, stats
+    )
+
+
+def search_modes(
+    modes: tuple[ModeProfiles, ...],
+    ac: int,
+    max_power_attack: int = MAX_POWER_ATTACK,
+    max_expertise: int = 5,
+    min_defense: int = 0,
+    stats: dict | None = None,
+) -> SetupChoice:
+    # Best-first branch and bound over (PA x expertise) boxes per mode; min_defense is
+    # the dodge AC the player insists on keeping from Combat Expertise.
+    min_defense = max(0, min(min_defense, max_expertise))
+    max_power_attack = power_attack_limit(modes, max_power_attack)
+
+    def better(candidate: SetupChoice, incumbent: SetupChoice | None) -> bool:
+        if incumbent is None or candidate.dpr > incumbent.dpr:
+            return True
+        if candidate.dpr < incumbent.dpr:
+            return False
+        # ties go to the cheapest setup, dual-wield first like recommend_setup
+        key = (candidate.expertise, candidate.power_attack, candidate.two_handed)
+        return key < (incumbent.expertise, incumbent.power_attack, incumbent.two_handed)
+
+    best: SetupChoice | None = None
+    evaluations = 0
+    heap: list[tuple[float, int, int, int, int, int]] = []
+    for idx, mode in enumerate(modes):
+        box = (0, max_power_attack, min_defense, max_expertise)
+        heapq.heappush(heap, (-_upper_bound(mode, ac, *box), idx, *box))
+
+    while heap:
+        neg_bound, idx, pa_lo, pa_hi, exp_lo, exp_hi = heapq.heappop(heap)
+        if best is not None and -neg_bound < best.dpr:
+            break
+        mode = modes[idx]
+        if pa_lo == pa_hi and exp_lo == exp_hi:
+            evaluations += 1
+            candidate = SetupChoice(pa_lo, exp_lo, mode.two_handed, evaluate_setup(mode, ac, pa_lo, exp_lo))
+            if better(candidate, best):
+                best = candidate
+            continue
+        if pa_hi - pa_lo >= exp_hi - exp_lo:
+            mid = (pa_lo + pa_hi) // 2
+            halves = [(pa_lo, mid, exp_lo, exp_hi), (mid + 1, pa_hi, exp_lo, exp_hi)]
+        else:
+            mid = (exp_lo + exp_hi) // 2
+            halves = [(pa_lo, pa_hi, exp_lo, mid), (pa_lo, pa_hi, mid + 1, exp_hi)]
+        for box in halves:
+            bound = _upper_bound(mode, ac, *box)
+            if best is None or bound >= best.dpr:
+                heapq.heappush(heap, (-bound, idx, *box))
+
+    if stats is not None:
+        stats["evaluations"] = evaluations
+    return best
+
+
+def power_attack_limit(modes: tuple[ModeProfiles, ...], max_power_attack: int) -> int:
+    return min([max_power_attack] + [len(mode.pa_means) - 1 for mode in modes if mode.pa_means])
+
+
+def coarse_to_fine(lo: int, hi: int) -> list[int]:
+    order: list[int] = []
+    seen: set[int] = set()
+    step = 1
+    while step * 2 <= hi - lo:
+        step *= 2
+    while step >= 1:
+        for value in [*range(lo, hi + 1, step), hi]:
+            if value not in seen:
+                seen.add(value)
+                order.append(value)
+        step //= 2
+    return order
+
+
+class AnytimeRecommender:
+    def __init__(
+        self,
+        tavist: Tavist,
+        ac: int,
+        attacks: list[int],
+        attack_names: list[str],
+        max_power_attack: int = MAX_POWER_ATTACK,
+        max_expertise: int = 5,
+        min_defense: int = 0,
+        modes: tuple[ModeProfiles, ...] | None = None,
+        target: "Target | None" = None,
+    ):
+        self.ac = ac
+        min_defense = max(0, min(min_defense, max_expertise))
+        self.modes = modes if modes is not None else setup_modes(tavist, attacks, target)
+        pa_order = coarse_to_fine(0, power_attack_limit(self.modes, max_power_attack))
+        exp_order = coarse_to_fine(min_defense, max_expertise)
+        # visit every PA at the cheapest expertise first, then widen expertise;
+        # the two modes are interleaved so both get coarse coverage early
+        self._pending = iter(
+            (mode, pa, expertise)
+            for expertise in exp_order
+            for pa in pa_order
+            for mode in self.modes
+        )
+        self.best: SetupChoice | None = None
+        self.evaluations = 0
+        self.done = False
+
+    def run(self, budget: float | None = None) -> SetupChoice:
+        deadline = None if budget is None else time.perf_counter() + budget
+        for mode, pa, expertise in self._pending:
+            self.evaluations += 1
+            dpr = evaluate_setup(mode, self.ac, pa, expertise)
+            if self.best is None or dpr > self.best.dpr:
+                self.best = SetupChoice(pa, expertise, mode.two_handed, dpr)
+            if deadline is not None and time.perf_counter() >= deadline:
+                return self.best
+        self.done = True
+        return self.best
+
+
+class RecommendationCache:
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple, SetupChoice] = OrderedDict()
+
+    @staticmethod
+    def key(modes: tuple[ModeProfiles, ...], ac: int, min_defense: int) -> tuple:
+        # the stripped profiles capture every toggle and buff, so they are the config key
+        return modes, ac, min_defense
+
+    def get(self, modes: tuple[ModeProfiles, ...], ac: int, min_defense: int) -> SetupChoice | None:
+        key = self.key(modes, ac, min_defense)
+        choice = self._entries.get(key)
+        if choice is not None:
+            self._entries.move_to_end(key)
+        return choice
+
+    def put(self, modes: tuple[ModeProfiles, ...], ac: int, min_defense: int, choice: SetupChoice):
+        key = self.key(modes, ac, min_defense)
+        self._entries[key] = choice
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class Prefetcher:
+    def __init__(self, cache: RecommendationCache, radius: int = 3):
+        self.cache = cache
+        self.radius = radius
+        self._queue: deque[tuple[tuple[ModeProfiles, ...], int, int]] = deque()
+
+    def schedule(
+        self,
+        modes: tuple[ModeProfiles, ...],
+        ac: int,
+        min_defense: int = 0,
+        extra_acs: list[int] | None = None,
+    ):
+        # a new focus AC makes the old speculation stale; nearest neighbours go first
+        self._queue.clear()
+        acs = [ac]
+        for offset in range(1, self.radius + 1):
+            acs += [ac - offset, ac + offset]
+        acs += extra_acs or []
+        seen: set[int] = set()
+        for candidate in acs:
+            if candidate < 0 or candidate in seen:
+                continue
+            seen.add(candidate)
+            if self.cache.get(modes, candidate, min_defense) is None:
+                self._queue.append((modes, candidate, min_defense))
+
+    def step(self, budget: float) -> bool:
+        deadline = time.perf_counter() + budget
+        while self._queue:
+            modes, ac, min_defense = self._queue.popleft()
+            if self.cache.get(modes, ac, min_defense) is None:
+                self.cache.put(modes, ac, min_defense, search_modes(modes, ac, min_defense=min_defense))
+            if time.perf_counter() >= deadline:
+                break
+        return bool(self._queue)
+
+    @property
+    def pending(self) -> int:
+        return len(self._queue)
+
+
+def recommend_for_targets(
+    registry: TrackerRegistry,
+    tavist: Tavist,
+    attacks: list[int],
+    attack_names: list[str],
+    cache: RecommendationCache | None = None,
+    target: "Target | None" = None,
+) -> list[TargetRecommendation]:
+    # one profile build and one DPR curve over every target's estimate; the per-AC
+    # searches share the profiles (and the cache, when given)
+    names = registry.names()
+    acs = [registry.trackers[name].estimate() for name in names]
+    modes = setup_modes(tavist, attacks, target)
+    min_defense = -tavist.combat_expertise.bonus
+    current = expected_profiles_by_ac(
+        list(full_attack_profiles(tavist, tavist.two_handed_mode, attacks, target)), acs
+    )
+    out = []
+    for name, ac, dpr in zip(names, acs, current):
+        choice = cache.get(modes, ac, min_defense) if cache is not None else None
+        if choice is None:
+            choice = search_modes(modes, ac, min_defense=min_defense)
+            if cache is not None:
+                cache.put(modes, ac, min_defense, choice)
+        out.append(TargetRecommendation(name, ac, dpr, choice))
+    return out
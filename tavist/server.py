@@ -0,0 +1,380 @@
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import struct
+from urllib.parse import parse_qs, urlsplit
+
+from tavist.controller import (
+    apply_tracking_selection,
+    format_attack_line,
+    full_attack_sequence,
+    summarize_damage_ranges,
+    tracking_candidates,
+)
+from tavist.events import AttackResolved, EventBus, FullAttackSummary, TrackerUpdated
+from tavist.gridcache import GRID_ACS
+from tavist.model import AttackAction, Tavist, expected_full_attack_by_ac
+from tavist.recommend import RecommendationCache, search_modes, setup_modes
+from tavist.tracking import ACTargetTracker, accumulate_known_hits, format_bound
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+WS_TEXT = 0x1
+WS_CLOSE = 0x8
+WS_PING = 0x9
+WS_PONG = 0xA
+WS_TOO_BIG = 1009
+# clients only send control frames, so anything bigger is refused before it is buffered
+MAX_FRAME_SIZE = 64 * 1024
+
+REASONS = {
+    101: "Switching Protocols",
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+}
+
+
+class FrameTooLarge(ValueError):
+    pass
+
+
+def apply_mask(payload: bytes, mask: bytes) -> bytes:
+    # one big-integer XOR instead of a Python loop over every byte
+    size = len(payload)
+    key = (mask * (size // 4 + 1))[:size]
+    return (int.from_bytes(payload, "big") ^ int.from_bytes(key, "big")).to_bytes(size, "big")
+
+
+def encode_frame(payload: bytes, opcode: int = WS_TEXT, mask: bytes | None = None) -> bytes:
+    header = bytearray([0x80 | opcode])
+    mask_bit = 0x80 if mask else 0
+    length = len(payload)
+    if length < 126:
+        header.append(mask_bit | length)
+    elif length < 1 << 16:
+        header.append(mask_bit | 126)
+        header += struct.pack("!H", length)
+    else:
+        header.append(mask_bit | 127)
+        header += struct.pack("!Q", length)
+    if mask:
+        header += mask
+        payload = apply_mask(payload, mask)
+    return bytes(header) + payload
+
+
+async def read_frame(reader: asyncio.StreamReader, max_size: int = MAX_FRAME_SIZE) -> tuple[int, bytes]:
+    first, second = await reader.readexactly(2)
+    opcode = first & 0x0F
+    length = second & 0x7F
+    if length == 126:
+        (length,) = struct.unpack("!H", await reader.readexactly(2))
+    elif length == 127:
+        (length,) = struct.unpack("!Q", await reader.readexactly(8))
+    if length > max_size:
+        raise FrameTooLarge(f"frame of {length} bytes exceeds {max_size}")
+    mask = await reader.readexactly(4) if second & 0x80 else None
+    payload = await reader.readexactly(length)
+    if mask:
+        payload = apply_mask(payload, mask)
+    return opcode, payload
+
+
+def websocket_accept(key: str) -> str:
+    return base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+
+
+def parse_acs(query: dict[str, list[str]]) -> list[int]:
+    if "ac" in query:
+        acs = [int(v) for v in query["ac"]]
+        if len(set(acs)) != len(acs):
+            raise ValueError("ac values must not repeat")
+    else:
+        lo, _, hi = query.get("acs", ["10-40"])[0].partition("-")
+        acs = range(int(lo), int(hi or lo) + 1)
+    # every table is computed on the event loop, so keep a request to the grid's span
+    if len(acs) > len(GRID_ACS):
+        raise ValueError(f"{len(acs)} ACs requested, at most {len(GRID_ACS)} allowed")
+    return list(acs)
+
+
+def parse_selection(selection) -> dict:
+    # the same shape the GUI's panel hands to apply_tracking_selection
+    if not isinstance(selection, dict):
+        raise ValueError("selection must be a JSON object")
+    unknown = set(selection) - {"total", "all_miss"}
+    if unknown:
+        raise ValueError(f"unknown selection keys: {', '.join(sorted(unknown))}")
+    total = selection.get("total")
+    if total is not None and (isinstance(total, bool) or not isinstance(total, int)):
+        raise ValueError("selection total must be an integer")
+    if not isinstance(selection.get("all_miss", False), bool):
+        raise ValueError("selection all_miss must be true or false")
+    return selection
+
+
+class RollService:
+    def __init__(
+        self,
+        tavist: Tavist | None = None,
+        attacks: list[int] | None = None,
+        attack_names: list[str] | None = None,
+        queue_size: int = 256,
+        bus: EventBus | None = None,
+    ):
+        self.tavist = tavist or Tavist()
+        self.tracker = ACTargetTracker()
+        self.attacks = attacks or [12, 12, 7, 2]
+        self.attack_names = attack_names or [
+            f"{name} (+{atk})" for name, atk in zip(["first", "speed", "second", "third"], self.attacks)
+        ]
+        self.queue_size = queue_size
+        self.subscribers: set[asyncio.Queue] = set()
+        self.pending_candidates: list[dict] = []
+        self.pending_results: list[dict] = []
+        self.recommendations = RecommendationCache()
+        self.bus = bus or EventBus()
+        self._details: list[str] = []
+        self.bus.subscribe(self._forward, (AttackResolved, FullAttackSummary, TrackerUpdated))
+
+    def subscribe(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(self.queue_size)
+        self.subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self.subscribers.discard(queue)
+
+    def publish(self, event: dict):
+        for queue in self.subscribers:
+            if queue.full():
+                # a slow subscriber loses its oldest event rather than stalling everyone
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    def _forward(self, event):
+        # the WebSocket sink: reports are only formatted while someone is listening
+        if isinstance(event, AttackResolved):
+            if self.subscribers:
+                self._details.append(event.report())
+        elif isinstance(event, FullAttackSummary):
+            details, self._details = self._details, []
+            self.publish({"type": event.kind, "details": details, **self._payload(event)})
+        else:
+            self.publish({"type": "tracker", "tracker": self.tracker_state()})
+
+    def _payload(self, summary: FullAttackSummary) -> dict:
+        return {
+            "results": summary.results,
+            "lines": summary.lines,
+            "damage_by_ac": [
+                {"lower": lower, "upper": upper, "damage": damage, "breakdown": breakdown}
+                for lower, upper, damage, breakdown in summary.damage_by_ac
+            ],
+            "candidates": [r["attack_total"] for r in self.pending_candidates],
+            "tracker": self.tracker_state(),
+        }
+
+    def _attack(self, action: AttackAction, name: str, bonus: int) -> dict:
+        action.label = name
+        self.tavist.bab.bonus = bonus
+        return action.do_attack(bus=self.bus)
+
+    def _resolve(self, kind: str, results: list[dict]) -> dict:
+        lines = [format_attack_line(r, self.tracker) for r in results]
+        ranges = summarize_damage_ranges(results) if kind == "full_attack" else []
+        if self.pending_candidates:
+            # the unanswered round keeps its certain hits, as a cancelled prompt does in the GUI
+            accumulate_known_hits(self.tracker, self.pending_results)
+        self.pending_candidates = tracking_candidates(self.tracker, results)
+        self.pending_results = results
+        if not self.pending_candidates:
+            accumulate_known_hits(self.tracker, results)
+        summary = FullAttackSummary(kind, results, ranges, lines)
+        self.bus.publish(summary)
+        return self._payload(summary)
+
+    def attack(self) -> dict:
+        action, name, bonus = full_attack_sequence(self.tavist, self.attacks, self.attack_names)[0]
+        return self._resolve("attack", [self._attack(action, name, bonus)])
+
+    def full_attack(self) -> dict:
+        sequence = full_attack_sequence(self.tavist, self.attacks, self.attack_names)
+        return self._resolve("full_attack", [self._attack(action, name, bonus) for action, name, bonus in sequence])
+
+    def dpr_table(self, acs: list[int]) -> dict:
+        curve = expected_full_attack_by_ac(self.tavist, acs, self.tavist.two_handed_mode, self.attacks)
+        modes = setup_modes(self.tavist, self.attacks)
+        min_defense = -self.tavist.combat_expertise.bonus
+        best = []
+        for ac in acs:
+            choice = self.recommendations.get(modes, ac, min_defense)
+            if choice is None:
+                choice = search_modes(modes, ac, min_defense=min_defense)
+                self.recommendations.put(modes, ac, min_defense, choice)
+            best.append(choice)
+        return {
+            "rows": [
+                {
+                    "ac": ac,
+                    "dpr": dpr,
+                    "best_power_attack": choice.power_attack,
+                    "best_two_handed": choice.two_handed,
+                    "best_dpr": choice.dpr,
+                }
+                for ac, dpr, choice in zip(acs, curve, best)
+            ]
+        }
+
+    def tracker_state(self) -> dict:
+        return {
+            "lower": self.tracker.lower,
+            "upper": self.tracker.upper,
+            "estimate": self.tracker.estimate(),
+            "bound": format_bound(self.tracker),
+            "damage_done": self.tracker.damage_done,
+        }
+
+    def update_tracker(self, payload: dict) -> dict:
+        if not isinstance(payload, dict):
+            raise ValueError("tracker update must be a JSON object")
+        selection = parse_selection(payload["selection"]) if "selection" in payload else None
+        if payload.get("reset"):
+            self.tracker.reset()
+            self.pending_candidates, self.pending_results = [], []
+        if "hit" in payload:
+            self.tracker.record_hit(int(payload["hit"]))
+        if "miss" in payload:
+            self.tracker.record_miss(int(payload["miss"]))
+        if selection is not None:
+            apply_tracking_selection(self.tracker, selection, self.pending_candidates)
+            self.pending_candidates, self.pending_results = [], []
+        self.bus.publish(TrackerUpdated("service", self.tracker.lower, self.tracker.upper, self.tracker.damage_done))
+        return self.tracker_state()
+
+    def state(self) -> dict:
+        return {
+            "power_attack": self.tavist.power_attack_value,
+            "two_handed": self.tavist.two_handed_mode,
+            "attacks": self.attacks,
+            "tracker": self.tracker_state(),
+            "subscribers": len(self.subscribers),
+        }
+
+    def dispatch(self, method: str, path: str, query: dict[str, list[str]], body: bytes) -> tuple[int, dict]:
+        routes = {
+            "/state": ("GET", lambda: self.state()),
+            "/attack": ("POST", lambda: self.attack()),
+            "/full-attack": ("POST", lambda: self.full_attack()),
+            "/dpr": ("GET", lambda: self.dpr_table(parse_acs(query))),
+            "/tracker": ("POST", lambda: self.update_tracker(json.loads(body or b"{}"))),
+        }
+        if path not in routes:
+            return 404, {"error": f"no route for {path}"}
+        allowed, handler = routes[path]
+        if method != allowed:
+            return 405, {"error": f"{path} expects {allowed}"}
+        try:
+            return 200, handler()
+        except (ValueError, KeyError, TypeError) as exc:
+            return 400, {"error": str(exc)}
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                headers: dict[str, str] = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    key, _, value = line.decode("latin-1").partition(":")
+                    headers[key.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length") or 0))
+                url = urlsplit(target)
+                if url.path == "/events" and headers.get("upgrade", "").lower() == "websocket":
+                    await self._stream_events(reader, writer, headers)
+                    return
+                status, payload = self.dispatch(method, url.path, parse_qs(url.query), body)
+                data = json.dumps(payload).encode()
+                writer.write(
+                    f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n\r\n".encode()
+                    + data
+                )
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _stream_events(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, headers: dict):
+        accept = websocket_accept(headers.get("sec-websocket-key", ""))
+        writer.write(
+            (
+                f"HTTP/1.1 101 {REASONS[101]}\r\n"
+                "Upgrade: websocket\r\nConnection: Upgrade\r\n"
+                f"Sec-WebSocket-Accept: {accept}\r\n\r\n"
+            ).encode()
+        )
+        await writer.drain()
+        queue = self.subscribe()
+
+        async def push():
+            while True:
+                event = await queue.get()
+                writer.write(encode_frame(json.dumps(event).encode()))
+                await writer.drain()
+
+        sender = asyncio.create_task(push())
+        try:
+            while True:
+                opcode, payload = await read_frame(reader)
+                if opcode == WS_CLOSE:
+                    writer.write(encode_frame(payload[:2], WS_CLOSE))
+                    break
+                if opcode == WS_PING:
+                    writer.write(encode_frame(payload, WS_PONG))
+        except FrameTooLarge:
+            writer.write(encode_frame(struct.pack("!H", WS_TOO_BIG), WS_CLOSE))
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            sender.cancel()
+            self.unsubscribe(queue)
+
+
+async def start_server(service: RollService, host: str = "127.0.0.1", port: int = 8765) -> asyncio.Server:
+    return await asyncio.start_server(service.handle, host, port)
+
+
+async def serve(host: str, port: int):
+    server = await start_server(RollService(), host, port)
+    for sock in server.sockets:
+        print(f"Tavist roll service on http://{sock.getsockname()[0]}:{sock.getsockname()[1]}")
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="Serve Tavist's rolls over HTTP and WebSocket.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,352 @@
+import argparse
+import json
+import random
+import time
+from collections.abc import Hashable, Iterable, Iterator
+from dataclasses import dataclass
+from itertools import count, islice
+from statistics import NormalDist
+from typing import TypeVar
+
+from tavist.controller import compute_damage_for_ac, full_attack_sequence
+from tavist.model import AttackAction, CritDamageMode, Tavist, attack_profile, expected_full_attack, hit_faces
+from tavist.outcomes import full_attack_outcomes
+from tavist.stats import CombatStats, Welford
+from tavist.target import Target, damage_plan, parse_target_spec
+from tavist.tracking import ACTargetTracker
+
+T = TypeVar("T")
+
+ATTACKS = [12, 12, 7, 2]
+ATTACK_NAMES = [f"{name} (+{atk})" for name, atk in zip(["first", "speed", "second", "third"], ATTACKS)]
+
+
+def batched(items: Iterable[T], size: int) -> Iterator[list[T]]:
+    # at most `size` items are held at once, whatever the length of the stream
+    if size < 1:
+        raise ValueError("batch size must be at least 1")
+    it = iter(items)
+    while batch := list(islice(it, size)):
+        yield batch
+
+
+def quiet_attack(action: AttackAction, crit_mode: CritDamageMode) -> dict:
+    # nothing reads crit damage off a non-threat, so streams need not roll it (LAZY) and
+    # may build it from the normal roll (DERIVED); the GUI keeps its own mode
+    prev_mode, action.crit_damage = action.crit_damage, crit_mode
+    try:
+        return action.do_attack(quiet=True)
+    finally:
+        action.crit_damage = prev_mode
+
+
+def attack_stream(
+    action: AttackAction, attacks: int | None = None, crit_mode: CritDamageMode = CritDamageMode.LAZY
+) -> Iterator[dict]:
+    # None streams forever; the consumer decides when to stop
+    for _ in range(attacks) if attacks is not None else count():
+        yield quiet_attack(action, crit_mode)
+
+
+def full_attack_stream(
+    tavist: Tavist,
+    attacks: list[int],
+    attack_names: list[str],
+    rounds: int | None = None,
+    crit_mode: CritDamageMode = CritDamageMode.LAZY,
+) -> Iterator[list[dict]]:
+    # one list of attack results per round, with the same labels and BAB swaps the GUI makes
+    for _ in range(rounds) if rounds is not None else count():
+        prev_bab = tavist.bab.bonus
+        results = []
+        try:
+            for action, name, bonus in full_attack_sequence(tavist, attacks, attack_names):
+                action.label = name
+                tavist.bab.bonus = bonus
+                results.append(quiet_attack(action, crit_mode))
+        finally:
+            tavist.bab.bonus = prev_bab
+        yield results
+
+
+def encounter_rounds(
+    tavist: Tavist,
+    ac: int,
+    attacks: list[int],
+    attack_names: list[str],
+    rounds: int | None = None,
+    target: Target | None = None,
+    rng: random.Random | None = None,
+    crit_mode: CritDamageMode = CritDamageMode.LAZY,
+) -> Iterator[dict]:
+    # full attacks resolved against a known AC and the target's defenses
+    target = target or Target()
+    rng = rng or random.Random()
+    expected = expected_full_attack(tavist, ac, tavist.two_handed_mode, attacks, attack_names, target)
+    for idx, results in enumerate(full_attack_stream(tavist, attacks, attack_names, rounds, crit_mode)):
+        # each attack that would hit still has to get past the concealment roll
+        landed = [r for r in results if rng.randrange(100) >= target.concealment]
+        damage, breakdown = compute_damage_for_ac(landed, ac, target)
+        yield {"round": idx, "results": results, "damage": damage, "breakdown": breakdown, "expected": expected}
+
+
+def soak(
+    rounds: Iterable[dict], ac: int, batch_size: int = 1000, out=None, stats: CombatStats | None = None
+) -> CombatStats:
+    # folds the stream into running statistics, writing each batch of rounds as JSON lines
+    stats = stats if stats is not None else CombatStats()
+    tracker = ACTargetTracker(lower=ac - 1, upper=ac)
+    for batch in batched(rounds, batch_size):
+        for entry in batch:
+            for result in entry["results"]:
+                stats.record_attack(result, tracker)
+            stats.record_round(entry["damage"], entry["expected"])
+        if out is not None:
+            out.writelines(json.dumps(entry) + "\n" for entry in batch)
+    return stats
+
+
+@dataclass(frozen=True)
+class Estimate:
+    mean: float
+    half_width: float
+    trials: int
+
+    @property
+    def interval(self) -> tuple[float, float]:
+        return self.mean - self.half_width, self.mean + self.half_width
+
+
+@dataclass(frozen=True)
+class AdaptiveResult:
+    # per candidate: "dpr", "kill" when a kill threshold was given, and "dpr_delta"
+    # (against the first candidate) for the rest
+    estimates: dict[Hashable, dict[str, Estimate]]
+    trials: int
+    elapsed: float
+    converged: bool
+
+
+def action_outcomes(action: AttackAction) -> tuple[tuple, ...]:
+    # the same (attack bonus, threat threshold, damage plan) form full_attack_outcomes uses
+    return ((attack_profile(action).attack_bonus, action.attack.critical_threshold, damage_plan(action.damage)),)
+
+
+class _Draws:
+    # one trial's dice, shared by every candidate so their differences carry no dice noise
+    __slots__ = ("rng", "values", "weight")
+
+    def __init__(self, rng: random.Random, lows: list[int], tilt: float):
+        self.rng = rng
+        self.values: dict[tuple, int] = {}
+        self.weight = 1.0
+        for slot, low in enumerate(lows):
+            self.values["d20", slot] = self._tilted(low, tilt)
+            self.values["confirm", slot] = self._tilted(low, tilt)
+
+    def _tilted(self, low: int, tilt: float) -> int:
+        # with probability `tilt` the face comes from low..20 instead; the likelihood
+        # ratio goes into the trial's weight so the estimates stay unbiased
+        if not tilt:
+            return self.rng.randint(1, 20)
+        face = self.rng.randint(low, 20) if self.rng.random() < tilt else self.rng.randint(1, 20)
+        proposal = (1 - tilt) / 20 + (tilt / (21 - low) if face >= low else 0.0)
+        self.weight *= 1 / 20 / proposal
+        return face
+
+    def die(self, key: tuple, sides: int) -> int:
+        value = self.values.get(key)
+        if value is None:
+            value = self.values[key] = self.rng.randint(1, sides)
+        return value
+
+
+def _attack_damage(draws: _Draws, slot: int, outcome: tuple, ac: int, target: Target) -> int:
+    bonus, threshold, plan = outcome
+    first_hit = 21 - hit_faces(bonus, ac)
+    face = draws.values["d20", slot]
+    if face < first_hit:
+        return 0
+    if target.concealment and draws.die(("miss", slot), 100) <= target.concealment:
+        return 0
+    critical = face >= threshold and draws.values["confirm", slot] >= first_hit
+    breakdown = {}
+    for label, dice, constant in plan:
+        total = constant * 2 if critical else constant
+        for j, (n, sides, weapon) in enumerate(dice):
+            for k in range(n * 2 if critical and weapon else n):
+                total += draws.die(("die", slot, label, j, k), sides)
+        breakdown[label] = total
+    return target.apply(breakdown)
+
+
+def adaptive_estimate(
+    candidates: dict[Hashable, tuple[tuple, ...]],
+    ac: int,
+    target: Target | None = None,
+    kill_hp: int | None = None,
+    dpr_width: float = 0.5,
+    kill_width: float = 0.1,
+    confidence: float = 0.95,
+    time_budget: float = 1.0,
+    batch_size: int = 256,
+    max_trials: int = 10_000_000,
+    tilt: float = 0.2,
+    rng: random.Random | None = None,
+) -> AdaptiveResult:
+    # runs batches of rounds until every confidence interval is narrow enough or the budget
+    # runs out. candidates are outcome tuples (see action_outcomes and full_attack_outcomes)
+    # and each round rolls the same dice for all of them. DPR half-widths are absolute; the
+    # kill chance's is relative to the rarer of kill and no kill.
+    target = target or Target()
+    rng = rng or random.Random()
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    keys = list(candidates)
+    slots = max(len(outcomes) for outcomes in candidates.values())
+    plain = [1] * slots
+    # the kill rounds favour the faces that hit for at least one candidate
+    lows = [
+        min(21 - hit_faces(outcomes[slot][0], ac) for outcomes in candidates.values() if slot < len(outcomes))
+        for slot in range(slots)
+    ]
+    dpr = {key: Welford() for key in keys}
+    delta = {key: Welford() for key in keys[1:]}
+    kill = {key: Welford() for key in keys} if kill_hp is not None else {}
+
+    def estimate(w: Welford) -> Estimate:
+        return Estimate(w.mean, z * w.stdev / w.n**0.5 if w.n else float("inf"), w.n)
+
+    def settled(metrics: dict[Hashable, Welford], width) -> bool:
+        return all(w.n >= 2 * batch_size and estimate(w).half_width <= width(w.mean) for w in metrics.values())
+
+    def damages(draws: _Draws):
+        for key in keys:
+            yield key, sum(_attack_damage(draws, slot, outcome, ac, target) for slot, outcome in enumerate(candidates[key]))
+
+    start = time.perf_counter()
+    trials = 0
+    while True:
+        need_dpr = not (settled(dpr, lambda _: dpr_width) and settled(delta, lambda _: dpr_width))
+        # a kill chance with no kills (or no survivals) seen yet has no width to go by
+        need_kill = not settled(kill, lambda p: kill_width * min(p, 1 - p) if 0 < p < 1 else -1)
+        if not (need_dpr or need_kill):
+            converged = True
+            break
+        if time.perf_counter() - start >= time_budget or trials >= max_trials:
+            converged = False
+            break
+        for _ in range(batch_size):
+            # plain rounds for the means and the differences, which common dice keep small
+            if need_dpr:
+                base = None
+                for key, damage in damages(_Draws(rng, plain, 0.0)):
+                    dpr[key].add(damage)
+                    if base is None:
+                        base = damage
+                    else:
+                        delta[key].add(damage - base)
+            # the kill chance sits in the natural 20 and crit tail, so its rounds are tilted
+            # towards hits and reweighted
+            if need_kill:
+                draws = _Draws(rng, lows, tilt)
+                for key, damage in damages(draws):
+                    kill[key].add(draws.weight * (damage >= kill_hp))
+        trials += batch_size * (need_dpr + need_kill)
+
+    estimates = {}
+    for key in keys:
+        metrics = {"dpr": estimate(dpr[key])}
+        if key in kill:
+            metrics["kill"] = estimate(kill[key])
+        if key in delta:
+            metrics["dpr_delta"] = estimate(delta[key])
+        estimates[key] = metrics
+    return AdaptiveResult(estimates, trials, time.perf_counter() - start, converged)
+
+
+def power_attack_candidates(tavist: Tavist, attacks: list[int], pas: Iterable[int]) -> dict[int, tuple]:
+    prev = tavist.power_attack_value
+    candidates = {}
+    for pa in pas:
+        tavist.set_power_attack(pa)
+        candidates[pa] = full_attack_outcomes(tavist, tavist.two_handed_mode, attacks)
+    tavist.set_power_attack(prev)
+    return candidates
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="Stream simulated full attacks against a fixed AC.")
+    parser.add_argument("--ac", type=int, required=True)
+    parser.add_argument("--rounds", type=int, default=None, help="defaults to running until interrupted")
+    parser.add_argument("--defenses", default="", help='target defenses like "DR 10/slashing, fire 5, 20%%"')
+    parser.add_argument("--two-handed", action="store_true")
+    parser.add_argument("--power-attack", type=int, default=0)
+    parser.add_argument("--batch", type=int, default=1000)
+    parser.add_argument("--jsonl", help="also write every round to this file")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument(
+        "--crit-mode",
+        choices=[mode.value for mode in CritDamageMode],
+        default=CritDamageMode.LAZY.value,
+        help="how crit damage is rolled: lazy rolls it only on a threat, derived adds the extra dice to the normal roll",
+    )
+    parser.add_argument("--estimate", metavar="PA", help="estimate DPR for Power Attack values like 0-12 instead")
+    parser.add_argument("--width", type=float, default=0.5, help="DPR confidence half-width to stop at")
+    parser.add_argument("--kill-hp", type=int, default=None, help="also estimate the chance of dealing this much")
+    parser.add_argument("--kill-width", type=float, default=0.1, help="relative confidence half-width for --kill-hp")
+    parser.add_argument("--budget", type=float, default=5.0, help="seconds before stopping short of the width")
+    args = parser.parse_args(argv)
+
+    try:
+        target = parse_target_spec(args.defenses)
+    except ValueError as exc:
+        parser.error(str(exc))
+    if args.seed is not None:
+        # the dice roll through the module-level generator
+        random.seed(args.seed)
+    tavist = Tavist()
+    tavist.set_two_handed(args.two_handed)
+    tavist.set_power_attack(args.power_attack)
+    if args.estimate:
+        low, _, high = args.estimate.partition("-")
+        candidates = power_attack_candidates(tavist, ATTACKS, range(int(low), int(high or low) + 1))
+        result = adaptive_estimate(
+            candidates,
+            args.ac,
+            target,
+            args.kill_hp,
+            args.width,
+            args.kill_width,
+            time_budget=args.budget,
+            rng=random.Random(args.seed),
+        )
+        state = "converged" if result.converged else "budget spent"
+        print(f"AC {args.ac}: {result.trials} rounds in {result.elapsed:.1f}s ({state})")
+        for pa, metrics in result.estimates.items():
+            print(f"PA {pa}: " + " | ".join(f"{name} {e.mean:.3f} ± {e.half_width:.3f}" for name, e in metrics.items()))
+        return
+    rounds = encounter_rounds(
+        tavist,
+        args.ac,
+        ATTACKS,
+        ATTACK_NAMES,
+        args.rounds,
+        target,
+        random.Random(args.seed),
+        CritDamageMode(args.crit_mode),
+    )
+    stats = CombatStats()
+    out = open(args.jsonl, "w") if args.jsonl else None
+    try:
+        soak(rounds, args.ac, args.batch, out, stats)
+    except KeyboardInterrupt:
+        # an open-ended run stops here; rounds of the unfinished batch are not counted
+        pass
+    finally:
+        if out is not None:
+            out.close()
+    print(stats.summary(f"AC {args.ac}"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+import json
+import math
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from tavist.tracking import ACTargetTracker
+
+DEFAULT_STATS_PATH = Path.home() / ".tavist" / "stats.json"
+# chi-square with 19 degrees of freedom at p = 0.05
+D20_CHI_SQUARE_CRITICAL = 30.144
+
+
+@dataclass
+class Welford:
+    n: int = 0
+    mean: float = 0.0
+    m2: float = 0.0
+
+    def add(self, x: float):
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / (self.n - 1) if self.n > 1 else 0.0
+
+    @property
+    def stdev(self) -> float:
+        return math.sqrt(self.variance)
+
+
+@dataclass
+class D20Tally:
+    counts: list[int] = field(default_factory=lambda: [0] * 20)
+    n: int = 0
+    face_sum: int = 0
+    sum_sq: int = 0
+
+    def add(self, face: int):
+        # sum of squared counts is all the chi-square needs: sum((o - e)^2 / e) = 20 * sum(o^2) / n - n
+        self.sum_sq += 2 * self.counts[face - 1] + 1
+        self.counts[face - 1] += 1
+        self.face_sum += face
+        self.n += 1
+
+    @property
+    def chi_square(self) -> float:
+        return 20 * self.sum_sq / self.n - self.n if self.n else 0.0
+
+    @property
+    def mean(self) -> float:
+        return self.face_sum / self.n if self.n else 0.0
+
+
+@dataclass
+class CombatStats:
+    attacks: int = 0
+    hits: int = 0
+    misses: int = 0
+    threats: int = 0
+    confirmed: int = 0
+    unconfirmed: int = 0
+    d20: D20Tally = field(default_factory=D20Tally)
+    damage: Welford = field(default_factory=Welford)
+    expected: Welford = field(default_factory=Welford)
+    luck: Welford = field(default_factory=Welford)
+
+    def record_attack(self, result: dict, tracker: ACTargetTracker | None):
+        # without a tracker only the roll is counted; classify_attack can follow once the
+        # player has told the tracker what hit
+        self.attacks += 1
+        self.d20.add(result["attack_die"])
+        if tracker is not None:
+            self.classify_attack(result, tracker)
+
+    def classify_attack(self, result: dict, tracker: ACTargetTracker):
+        # hits and confirmations only count once the bounds settle them
+        total = result["attack_total"]
+        known_upper = tracker.upper != 99
+        if result.get("natural_twenty") or (known_upper and total >= tracker.upper and not result.get("natural_one")):
+            self.hits += 1
+        elif result.get("natural_one") or total <= tracker.lower:
+            self.misses += 1
+        confirm = result.get("confirm_total")
+        if result.get("threat") and confirm is not None:
+            self.threats += 1
+            if known_upper and confirm >= tracker.upper:
+                self.confirmed += 1
+            elif confirm <= tracker.lower:
+                self.unconfirmed += 1
+
+    def record_round(self, actual: float, expected: float):
+        self.damage.add(actual)
+        self.expected.add(expected)
+        self.luck.add(actual - expected)
+
+    @property
+    def hit_rate(self) -> float | None:
+        known = self.hits + self.misses
+        return self.hits / known if known else None
+
+    @property
+    def confirm_rate(self) -> float | None:
+        known = self.confirmed + self.unconfirmed
+        return self.confirmed / known if known else None
+
+    def summary(self, label: str) -> str:
+        rate = lambda r: "—" if r is None else f"{r:.0%}"
+        chi = self.d20.chi_square
+        fair = "ok" if chi <= D20_CHI_SQUARE_CRITICAL else "skewed"
+        return (
+            f"{label}: {self.damage.n} rounds | dmg {self.damage.mean:.1f} vs exp {self.expected.mean:.1f} "
+            f"(luck {self.luck.mean:+.1f} ± {self.luck.stdev:.1f}) | hit {rate(self.hit_rate)} "
+            f"| crit confirm {rate(self.confirm_rate)} | d20 mean {self.d20.mean:.2f}, χ² {chi:.1f} {fair}"
+        )
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "CombatStats":
+        return cls(
+            **{k: v for k, v in data.items() if k not in ("d20", "damage", "expected", "luck")},
+            d20=D20Tally(**data["d20"]),
+            damage=Welford(**data["damage"]),
+            expected=Welford(**data["expected"]),
+            luck=Welford(**data["luck"]),
+        )
+
+
+def load_history(path: str | Path = DEFAULT_STATS_PATH) -> CombatStats:
+    try:
+        return CombatStats.from_dict(json.loads(Path(path).read_text()))
+    except (FileNotFoundError, ValueError, KeyError, TypeError):
+        return CombatStats()
+
+
+def save_history(stats: CombatStats, path: str | Path = DEFAULT_STATS_PATH):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(stats.to_dict()))
+    tmp.replace(path)
@@ -0,0 +1,218 @@
+import argparse
+import csv
+import io
+import json
+import os
+import struct
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from tavist.model import Tavist, expected_profiles_by_ac, full_attack_profiles
+
+BUFFS = ("evil", "surge", "fatigued")
+PROGRESSIONS = {"full": 1.0, "three-quarter": 0.75, "half": 0.5}
+CSV_HEADER = ["character", "level", "buffs", "mode", "power_attack", "ac", "dpr"]
+# character index, level, buff mask, two-handed, power attack, AC, DPR
+RECORD = struct.Struct("<HBBBBhf")
+
+
+@dataclass(frozen=True)
+class Character:
+    name: str
+    ext_hit: int = 0
+    ext_str: int = 0
+
+
+@dataclass(frozen=True)
+class SweepSpec:
+    characters: tuple[Character, ...] = (Character("tavist"),)
+    levels: tuple[int, ...] = tuple(range(1, 21))
+    acs: tuple[int, ...] = tuple(range(10, 46))
+    buffs: tuple[str, ...] = BUFFS
+    progression: str = "full"
+    extra_attacks: int = 1
+    format: str = "csv"
+
+    def header(self) -> dict:
+        # as it reads back from the manifest, tuples and all
+        return json.loads(json.dumps(asdict(self)))
+
+    def units(self) -> list[tuple[int, int, int]]:
+        # one work unit per (character, level, buff combination); masks index into BUFFS
+        masks = [
+            mask
+            for mask in range(1 << len(BUFFS))
+            if all(name in self.buffs for bit, name in enumerate(BUFFS) if mask & (1 << bit))
+        ]
+        return [(c, level, mask) for c in range(len(self.characters)) for level in self.levels for mask in masks]
+
+
+def base_attack_bonus(level: int, progression: str) -> int:
+    return int(level * PROGRESSIONS[progression])
+
+
+def iterative_attacks(bab: int, extra_attacks: int = 1) -> list[int]:
+    # Tavist's [12, 12, 7, 2] is BAB 12 with one extra attack (speed) at the top bonus
+    attacks = [bab] * (1 + extra_attacks)
+    attacks += list(range(bab - 5, 0, -5))
+    return attacks
+
+
+def build_character(character: Character, bab: int, buffs: set[str]) -> Tavist:
+    # the same toggles the GUI applies
+    tavist = Tavist()
+    tavist.bab.bonus = bab
+    tavist.set_external_hit(character.ext_hit)
+    tavist.set_external_str(character.ext_str)
+    if "evil" in buffs:
+        tavist.katana_damage.dice.append(tavist.holy_dice)
+    if "surge" not in buffs:
+        tavist.katana_damage.bonuses.remove(tavist.surge_bonus_main)
+        tavist.wakasashi_damage.bonuses.remove(tavist.surge_bonus_off)
+        tavist.katana_attack.bonuses.remove(tavist.surge_bonus_attack_main)
+    tavist.set_fatigued("fatigued" in buffs)
+    return tavist
+
+
+def run_unit(spec: SweepSpec, unit: tuple[int, int, int]) -> list[tuple]:
+    char_idx, level, mask = unit
+    bab = base_attack_bonus(level, spec.progression)
+    buffs = {name for bit, name in enumerate(BUFFS) if mask & (1 << bit)}
+    tavist = build_character(spec.characters[char_idx], bab, buffs)
+    attacks = iterative_attacks(bab, spec.extra_attacks)
+    acs = list(spec.acs)
+    rows = []
+    for two_handed in (False, True):
+        # Power Attack trades at most the base attack bonus
+        for pa in range(bab + 1):
+            tavist.set_power_attack(pa)
+            curve = expected_profiles_by_ac(full_attack_profiles(tavist, two_handed, attacks), acs)
+            rows += [(char_idx, level, mask, int(two_handed), pa, ac, dpr) for ac, dpr in zip(acs, curve)]
+    return rows
+
+
+def encode_rows(spec: SweepSpec, rows: list[tuple]) -> bytes:
+    if spec.format == "bin":
+        return b"".join(RECORD.pack(*row) for row in rows)
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator="\n")
+    for char_idx, level, mask, two_handed, pa, ac, dpr in rows:
+        buffs = "+".join(name for bit, name in enumerate(BUFFS) if mask & (1 << bit)) or "none"
+        mode = "2H" if two_handed else "TWF"
+        writer.writerow([spec.characters[char_idx].name, level, buffs, mode, pa, ac, f"{dpr:.3f}"])
+    return out.getvalue().encode()
+
+
+def read_binary(path: str | Path):
+    with open(path, "rb") as fh:
+        while chunk := fh.read(RECORD.size * 4096):
+            yield from RECORD.iter_unpack(chunk)
+
+
+def manifest_path(output: str | Path) -> Path:
+    return Path(f"{output}.manifest.jsonl")
+
+
+def load_manifest(path: Path) -> tuple[dict | None, dict[tuple, int]]:
+    header, done = None, {}
+    try:
+        with open(path, "rb") as fh:
+            for line in fh:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # interrupted mid-write; the unit will simply be redone
+                    break
+                if header is None:
+                    header = entry
+                else:
+                    done[tuple(entry["unit"])] = entry["offset"]
+    except FileNotFoundError:
+        pass
+    return header, done
+
+
+def sweep(spec: SweepSpec, output: str | Path, workers: int | None = None, chunksize: int = 4) -> int:
+    output, manifest = Path(output), manifest_path(output)
+    header, done = load_manifest(manifest)
+    if header is not None and header != spec.header():
+        raise ValueError(f"{manifest} belongs to a different sweep; delete it or pick another output")
+    # anything written after the last recorded unit is a partial chunk from the interrupted run
+    offset = max(done.values(), default=0)
+    with open(output, "ab") as fh:
+        fh.truncate(offset)
+    # rewrite rather than append: new entries would otherwise land on a torn last line
+    entries = [spec.header()] + [{"unit": unit, "offset": unit_offset} for unit, unit_offset in done.items()]
+    partial = manifest.with_name(manifest.name + ".tmp")
+    partial.write_text("".join(json.dumps(entry) + "\n" for entry in entries))
+    os.replace(partial, manifest)
+    pending = [unit for unit in spec.units() if unit not in done]
+
+    with open(output, "ab") as out, open(manifest, "a") as log:
+        if offset == 0 and spec.format == "csv":
+            out.write((",".join(CSV_HEADER) + "\n").encode())
+
+        def commit(unit, rows):
+            out.write(encode_rows(spec, rows))
+            out.flush()
+            os.fsync(out.fileno())
+            log.write(json.dumps({"unit": unit, "offset": out.tell()}) + "\n")
+            log.flush()
+
+        if workers == 1:
+            for unit in pending:
+                commit(unit, run_unit(spec, unit))
+        else:
+            with ProcessPoolExecutor(workers) as pool:
+                # results stream back in unit order, so the file layout is the same on every run
+                for unit, rows in zip(pending, pool.map(run_unit, [spec] * len(pending), pending, chunksize=chunksize)):
+                    commit(unit, rows)
+    return len(pending)
+
+
+def load_characters(path: str | None) -> tuple[Character, ...]:
+    if path is None:
+        return (Character("tavist"),)
+    return tuple(Character(**entry) for entry in json.loads(Path(path).read_text()))
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="Tabulate expected DPR over levels, ACs, Power Attack and modes.")
+    parser.add_argument("output")
+    parser.add_argument("--format", choices=["csv", "bin"], default=None, help="defaults to the output's extension")
+    parser.add_argument("--characters", help='JSON list like [{"name": "tavist", "ext_str": 2}]')
+    parser.add_argument("--levels", default="1-20", help="range like 1-20")
+    parser.add_argument("--acs", default="10-45", help="range like 10-45")
+    parser.add_argument("--buffs", default=",".join(BUFFS), help="toggles to sweep on and off")
+    parser.add_argument("--progression", choices=sorted(PROGRESSIONS), default="full")
+    parser.add_argument("--extra-attacks", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunksize", type=int, default=4)
+    args = parser.parse_args(argv)
+
+    def span(text: str) -> tuple[int, ...]:
+        low, _, high = text.partition("-")
+        return tuple(range(int(low), int(high or low) + 1))
+
+    buffs = tuple(name.strip() for name in args.buffs.split(",") if name.strip())
+    if set(buffs) - set(BUFFS):
+        parser.error(f"unknown buffs: {', '.join(sorted(set(buffs) - set(BUFFS)))}")
+    spec = SweepSpec(
+        characters=load_characters(args.characters),
+        levels=span(args.levels),
+        acs=span(args.acs),
+        buffs=buffs,
+        progression=args.progression,
+        extra_attacks=args.extra_attacks,
+        format=args.format or ("bin" if args.output.endswith(".bin") else "csv"),
+    )
+    try:
+        computed = sweep(spec, args.output, args.workers, args.chunksize)
+    except ValueError as exc:
+        parser.error(str(exc))
+    print(f"{computed} of {len(spec.units())} units computed; table in {args.output}")
+
+
+if __name__ == "__main__":
+    main()
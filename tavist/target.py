@@ -0,0 +1,158 @@
+import random
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+
+from tavist.dice import convolve, dice_sum_pmf
+from tavist.model import AttackAction, DamageRoll, WeaponDamageDice, damage_label
+
+# energy damage ignores damage reduction; resistance is what stops it
+ENERGY = frozenset({"acid", "cold", "electricity", "fire", "sonic"})
+
+_DR = re.compile(r"dr\s*(?P<amount>\d+)\s*/\s*(?P<bypass>[a-z\- ]+)$")
+_RESISTANCE = re.compile(r"(?:resist\s+)?(?P<type>[a-z]+)\s+(?P<amount>\d+)$")
+_CONCEALMENT = re.compile(r"(?P<percent>\d+)\s*%(?:\s*concealment)?$")
+
+
+@dataclass(frozen=True)
+class Target:
+    dr: int = 0
+    # damage labels that get through the DR; "-" style DR leaves this empty
+    dr_bypass: frozenset[str] = frozenset()
+    resistances: tuple[tuple[str, int], ...] = ()
+    concealment: int = 0  # miss chance in percent
+
+    @property
+    def hit_chance(self) -> float:
+        return 1 - self.concealment / 100
+
+    @property
+    def affects_damage(self) -> bool:
+        return bool(self.dr or self.resistances or self.concealment)
+
+    def reductions(self, labels) -> list[tuple[tuple[str, ...], int]]:
+        # (labels reduced together, amount): DR comes off the hit's non-energy damage as a whole
+        groups = []
+        physical = tuple(label for label in labels if label not in ENERGY)
+        if self.dr and physical and not self.dr_bypass.intersection(labels):
+            groups.append((physical, self.dr))
+        resist = dict(self.resistances)
+        groups += [((label,), resist[label]) for label in labels if label in resist]
+        return groups
+
+    def reduce(self, breakdown: dict[str, int]) -> dict[str, int]:
+        # concealment is a roll at the table, so recorded hits only lose DR and resistance
+        out = dict(breakdown)
+        for labels, amount in self.reductions(sorted(breakdown)):
+            if sum(out[label] for label in labels) <= amount:
+                out.update(dict.fromkeys(labels, 0))
+                continue
+            for label in labels:
+                taken = min(amount, max(0, out[label]))
+                out[label] -= taken
+                amount -= taken
+        return out
+
+    def apply(self, breakdown: dict[str, int]) -> int:
+        return sum(self.reduce(breakdown).values())
+
+    def hit_means(self, damage: DamageRoll) -> tuple[float, float]:
+        # expected (normal, critical) damage per attack that would hit, concealment included
+        plan = damage_plan(damage)
+        return (
+            self.hit_chance * _reduced_mean(self, plan, False),
+            self.hit_chance * _reduced_mean(self, plan, True),
+        )
+
+
+def damage_plan(damage: DamageRoll) -> tuple[tuple[str, tuple[tuple[int, int, bool], ...], int], ...]:
+    # per breakdown label: dice as (count, sides, doubles on crit) and the flat bonus
+    weapon_label = damage.type.value
+    dice: dict[str, list] = {}
+    flat: dict[str, int] = {}
+    for die in damage.dice:
+        weapon = isinstance(die, WeaponDamageDice)
+        label = weapon_label if weapon else die.label or "damage"
+        dice.setdefault(label, []).append((die.n, die.d, weapon))
+        flat.setdefault(label, 0)
+    for bonus in damage.resolved_bonuses().applied:
+        label = damage_label(bonus, weapon_label)
+        dice.setdefault(label, [])
+        flat[label] = flat.get(label, 0) + bonus.bonus
+    return tuple((label, tuple(dice[label]), flat[label]) for label in sorted(dice))
+
+
+@lru_cache(maxsize=1024)
+def group_pmf(dice: tuple[tuple[int, int, bool], ...], constant: int, critical: bool) -> dict[int, float]:
+    pmf = {constant * 2 if critical else constant: 1.0}
+    for n, sides, weapon in dice:
+        pmf = convolve(pmf, dice_sum_pmf(n * 2 if critical and weapon else n, sides))
+    return pmf
+
+
+@lru_cache(maxsize=1024)
+def _reduced_mean(target: Target, plan: tuple, critical: bool) -> float:
+    # DR and resistance clip at zero per hit, so the mean needs the whole distribution
+    by_label = {label: (dice, constant) for label, dice, constant in plan}
+    reduced: set[str] = set()
+    mean = 0.0
+    for labels, amount in target.reductions(sorted(by_label)):
+        dice = tuple(die for label in labels for die in by_label[label][0])
+        constant = sum(by_label[label][1] for label in labels)
+        pmf = group_pmf(dice, constant, critical)
+        mean += sum(p * max(0, value - amount) for value, p in pmf.items())
+        reduced.update(labels)
+    for label, (dice, constant) in by_label.items():
+        if label not in reduced:
+            mean += (constant * 2 if critical else constant) + sum(
+                (n * 2 if critical and weapon else n) * (sides + 1) / 2 for n, sides, weapon in dice
+            )
+    return mean
+
+
+def sample_hit_damage(
+    action: AttackAction,
+    target: Target,
+    count: int,
+    critical: bool = False,
+    rng: random.Random | None = None,
+) -> list[int]:
+    # damage of `count` hits against the target, concealment misses counting as 0
+    choices = (rng or random).choices
+    plan = damage_plan(action.damage)
+    totals: dict[str, list[int]] = {}
+    for label, dice, constant in plan:
+        column = [constant * 2 if critical else constant] * count
+        for n, sides, weapon in dice:
+            n = n * 2 if critical and weapon else n
+            faces = choices(range(1, sides + 1), k=n * count)
+            for idx in range(count):
+                column[idx] += sum(faces[idx * n:(idx + 1) * n])
+        totals[label] = column
+    labels = list(totals)
+    out = [target.apply(dict(zip(labels, hit))) for hit in zip(*totals.values())]
+    if target.concealment:
+        misses = choices(range(100), k=count)
+        out = [0 if roll < target.concealment else damage for roll, damage in zip(misses, out)]
+    return out
+
+
+def parse_target_spec(text: str) -> Target:
+    # comma-separated: "DR 5/slashing", "DR 10/-", "fire 10", "20%"
+    dr, bypass, resistances, concealment = 0, frozenset(), {}, 0
+    for part in (p.strip().lower() for p in text.split(",")):
+        if not part:
+            continue
+        if match := _DR.match(part):
+            dr = int(match.group("amount"))
+            names = {name.strip() for name in match.group("bypass").split(" or ")}
+            bypass = frozenset(names - {"-"})
+        elif match := _CONCEALMENT.match(part):
+            concealment = int(match.group("percent"))
+            if concealment > 100:
+                raise ValueError(f"concealment above 100% in {text!r}")
+        elif match := _RESISTANCE.match(part):
+            resistances[match.group("type")] = int(match.group("amount"))
+        else:
+            raise ValueError(f"cannot parse target defense {part!r}")
+    return Target(dr, bypass, tuple(sorted(resistances.items())), concealment)
@@ -49,3 +49,41 @@ def accumulate_known_hits(tracker: ACTargetTracker, results: list[dict]):
         bound = tracker.upper
         if r["attack_total"] >= bound or (r.get("confirm_total") and r["confirm_total"] >= bound):
             tracker.damage_done += damage_for_hit(r, bound)
+
+
+class TrackerRegistry:
+    def __init__(self):
+        self.trackers: dict[str, ACTargetTracker] = {}
+        self.active: str | None = None
+
+    def add(self, name: str | None = None, tracker: ACTargetTracker | None = None) -> str:
+        if name is None or name in self.trackers:
+            base = name or "Opponent"
+            n = 2 if name else len(self.trackers) + 1
+            while f"{base} {n}" in self.trackers:
+                n += 1
+            name = f"{base} {n}"
+        self.trackers[name] = tracker or ACTargetTracker()
+        if self.active is None:
+            self.active = name
+        return name
+
+    def switch(self, name: str) -> ACTargetTracker:
+        tracker = self.trackers[name]
+        self.active = name
+        return tracker
+
+    def remove(self, name: str):
+        del self.trackers[name]
+        if self.active == name:
+            self.active = next(iter(self.trackers), None)
+
+    @property
+    def current(self) -> ACTargetTracker | None:
+        return self.trackers.get(self.active) if self.active is not None else None
+
+    def names(self) -> list[str]:
+        return list(self.trackers)
+
+    def total_damage(self) -> int:
+        return sum(t.damage_done for t in self.trackers.values())
@@ -0,0 +1,62 @@
+import random
+
+import pytest
+
+from tavist import model
+from tavist.dice import compile_dice, parse_dice
+
+
+def test_parse_tags_and_constants():
+    dice, constants = parse_dice("1d10[weapon,crit]+1d6[merciful] + 2d6[holy]+4")
+    assert [(t.n, t.d, t.label, t.crit) for t in dice] == [
+        (1, 10, "weapon", True),
+        (1, 6, "merciful", False),
+        (2, 6, "holy", False),
+    ]
+    assert [c.value for c in constants] == [4]
+
+
+@pytest.mark.parametrize("text", ["", "2d6 3", "1d6+", "4[crit]", "d0"])
+def test_parse_rejects_malformed_expressions(text):
+    with pytest.raises(ValueError):
+        parse_dice(text)
+
+
+def test_compiled_mean_and_pmf_agree():
+    compiled = compile_dice("1d10[weapon,crit]+1d6[merciful]+2d6[holy]+4")
+    for critical in (False, True):
+        pmf = compiled.pmf(critical)
+        assert sum(pmf.values()) == pytest.approx(1.0)
+        assert sum(v * p for v, p in pmf.items()) == pytest.approx(compiled.mean(critical))
+    assert compiled.mean() == 20.0
+    assert compiled.mean(critical=True) == 29.5  # weapon die and the +4 doubled
+    assert min(compiled.pmf()) == 8 and max(compiled.pmf()) == 32
+
+
+def test_rolls_stay_within_pmf_support():
+    compiled = compile_dice("2d6[holy]-1d4+1")
+    support = compiled.pmf()
+    rng = random.Random(7)
+    assert all(compiled.roll(rng=rng) in support for _ in range(200))
+    assert all(total in support for total in compiled.roll_batch(200, rng=rng))
+
+
+def test_compiled_forms_are_cached_by_text():
+    assert compile_dice("1d8+2") is compile_dice("1d8+2")
+
+
+def test_to_damage_roll_builds_model_objects():
+    roll = compile_dice("1d10[weapon,crit]+1d6[merciful]+2[enhancement]").to_damage_roll(model.DamageType.SLASHING)
+    assert isinstance(roll.dice[0], model.WeaponDamageDice)
+    assert not isinstance(roll.dice[1], model.WeaponDamageDice)
+    assert roll.bonuses[0].type is model.BonusType.ENHANCEMENT
+    action = model.AttackAction(label="custom", attack=model.AttackRoll(), damage=roll)
+    assert model.attack_profile(action).mean_normal == compile_dice("1d10+1d6+2").mean()
+
+
+def test_tavist_weapons_are_built_from_dice_expressions():
+    tavist = model.Tavist()
+    assert tavist.katana_damage.dice == compile_dice("1d10[weapon,crit]+1d6[merciful]").damage_dice()
+    assert tavist.wakasashi_damage.dice == compile_dice("1d6[weapon,crit]+1d6[merciful]").damage_dice()
+    # every Tavist gets its own dice, so toggling holy on one leaves the others alone
+    assert tavist.holy_dice is not model.Tavist().holy_dice
@@ -0,0 +1,43 @@
+import io
+import threading
+
+from tavist import model
+from tavist.events import AttackResolved, EventBus, TrackerUpdated, terminal_sink
+
+
+def test_attack_report_is_left_to_subscribers(capsys):
+    bus = EventBus()
+    seen = []
+    bus.subscribe(seen.append, (AttackResolved,))
+    out = io.StringIO()
+    terminal = bus.subscribe(terminal_sink(out), (AttackResolved,), threaded=True)
+    result = model.Tavist().katana_attack_action.do_attack(bus=bus)
+    bus.publish(TrackerUpdated("a", 0, 99, 0))
+    terminal.close()
+    assert capsys.readouterr().out == ""
+    assert [event.result for event in seen] == [result]
+    assert out.getvalue() == seen[0].report() + "\n\n"
+    assert out.getvalue().startswith("=== Attack:")
+
+
+def test_slow_sink_drops_oldest_without_blocking_the_publisher():
+    bus = EventBus()
+    busy, release = threading.Event(), threading.Event()
+    handled = []
+
+    def slow(event):
+        busy.set()
+        release.wait()
+        handled.append(event.lower)
+
+    sink = bus.subscribe(slow, maxsize=2, threaded=True)
+    bus.publish(TrackerUpdated("a", 0, 99, 0))
+    busy.wait()
+    for lower in range(1, 6):
+        bus.publish(TrackerUpdated("a", lower, 99, 0))
+    release.set()
+    sink.flush()
+    bus.close()
+    # the worker was stuck on the first event; of the rest only the newest two fit
+    assert handled == [0, 4, 5]
+    assert sink.dropped == 3
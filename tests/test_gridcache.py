@@ -0,0 +1,52 @@
+import os
+from array import array
+
+import pytest
+
+from tavist import model
+from tavist.gridcache import GridCache, grid_key, load_dpr_grid
+from tavist.recommend import search_modes, setup_modes
+from tavist.target import Target
+
+
+def test_grid_is_read_back_from_disk_and_agrees_with_the_search(tmp_path):
+    tavist = model.Tavist()
+    attacks = [12, 12, 7, 2]
+    modes = setup_modes(tavist, attacks, Target(dr=5))
+    grid = load_dpr_grid(GridCache(tmp_path), modes)
+
+    # a fresh cache, as after a restart: the grid is mapped, not rebuilt
+    reopened = GridCache(tmp_path)
+    assert reopened.get_or_build(grid_key(modes), lambda: pytest.fail("rebuilt")) is not None
+    grid = load_dpr_grid(reopened, modes, build=False)
+    for ac in (12, 24, 36):
+        for min_defense in (0, 2):
+            assert grid.best(ac, min_defense) == search_modes(modes, ac, min_defense=min_defense)
+    tavist.set_power_attack(6)
+    assert grid.dpr(True, 6, 0, 24) == pytest.approx(
+        model.expected_full_attack(tavist, 24, True, attacks, [], Target(dr=5))
+    )
+
+
+def test_old_entries_are_evicted_and_open_maps_stay_bounded(tmp_path):
+    cache = GridCache(tmp_path, max_bytes=3500, max_maps=2)
+    written = []
+    for n in range(3):
+        view = cache.put(f"k{n}", array("d", [float(n)] * 200))
+        assert view[0] == n
+        del view
+        path = tmp_path / f"k{n}.f64"
+        # one second apart, oldest first
+        os.utime(path, (1e9 + n, 1e9 + n))
+        written.append(path)
+        cache.evict()
+
+    assert sum(path.stat().st_size for path in tmp_path.glob("*.f64")) <= 3500
+    assert sorted(tmp_path.glob("*.f64")) == sorted(written[1:])
+    # the evicted file's map went with it, and never more than max_maps are held
+    assert list(cache._maps) == ["k1", "k2"]
+    for n in range(100):
+        cache.put(f"more{n}", array("d", [1.0]))
+    assert len(cache._maps) == 2
+    cache.close()
+    assert not cache._maps
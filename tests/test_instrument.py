@@ -0,0 +1,34 @@
+from tavist.instrument import INSTRUMENTS, Histogram, timed, timer
+
+
+def test_histogram_percentiles_come_from_bucket_edges():
+    hist = Histogram()
+    for _ in range(90):
+        hist.record(0.0003)
+    for _ in range(10):
+        hist.record(0.020)
+    assert hist.percentile(0.5) == 0.5
+    assert hist.percentile(0.95) == 20.0
+    assert hist.summary()["count"] == 100
+
+
+def test_timers_only_record_when_enabled():
+    @timed("double")
+    def double(x):
+        return 2 * x
+
+    INSTRUMENTS.reset()
+    assert double(2) == 4
+    with timer("block"):
+        pass
+    assert INSTRUMENTS.histograms == {}
+
+    INSTRUMENTS.enabled = True
+    try:
+        double(3)
+        with timer("block"):
+            pass
+    finally:
+        INSTRUMENTS.enabled = False
+    assert {name: h.count for name, h in INSTRUMENTS.histograms.items()} == {"double": 1, "block": 1}
+    INSTRUMENTS.reset()
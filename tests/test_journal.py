@@ -0,0 +1,66 @@
+from tavist.journal import SNAPSHOT_ATTACK_ROUNDS, SNAPSHOT_LOG_LINES, SessionJournal, replay
+
+
+def test_replay_survives_a_torn_last_line(tmp_path):
+    path = tmp_path / "session.jsonl"
+    journal = SessionJournal(path)
+    journal.record("log", text="=== Full Attack ===")
+    journal.record("tracker", name="Ogre", lower=15, upper=20, damage_done=31)
+    journal.record("active", name="Ogre")
+    journal.record_changed("toggle", "evil", name="evil", value=True)
+    journal.record_changed("toggle", "evil", name="evil", value=True)
+    journal.close()
+    with open(path, "ab") as fh:
+        fh.write(b'{"kind": "log", "te')
+
+    state = replay(path)
+    assert state.log == ["=== Full Attack ==="]
+    assert state.toggles == {"evil": True}
+    assert path.read_text().count('"toggle"') == 1
+    tracker = state.registry().current
+    assert (tracker.lower, tracker.upper, tracker.damage_done) == (15, 20, 31)
+
+
+def test_restore_compacts_into_a_snapshot(tmp_path):
+    path = tmp_path / "session.jsonl"
+    journal = SessionJournal(path)
+    for n in range(100):
+        journal.record("log", text=f"line {n}")
+    journal.record("attack", results=[{"attack_total": 30, "damage_normal": 12}])
+    journal.close()
+
+    journal, state = SessionJournal.restore(path)
+    journal.record("log", text="after restore")
+    journal.close()
+    assert len(state.log) == 100 and state.attacks[0][0]["damage_normal"] == 12
+    assert (tmp_path / "session.jsonl.prev").exists()
+    assert len(path.read_text().splitlines()) == 2
+    assert replay(path).log[-2:] == ["line 99", "after restore"]
+
+
+def test_repeated_restores_keep_the_snapshot_bounded(tmp_path):
+    path = tmp_path / "session.jsonl"
+    for _ in range(3):
+        journal, _ = SessionJournal.restore(path)
+        for n in range(SNAPSHOT_LOG_LINES):
+            journal.record("log", text=f"line {n}")
+        for _ in range(SNAPSHOT_ATTACK_ROUNDS):
+            journal.record("attack", results=[{"attack_total": 30}])
+        journal.close()
+
+    journal, state = SessionJournal.restore(path)
+    journal.close()
+    assert len(state.log) == SNAPSHOT_LOG_LINES
+    assert len(state.attacks) == SNAPSHOT_ATTACK_ROUNDS
+    assert replay(path).log == state.log
+
+
+def test_fresh_journal_sets_a_torn_session_aside(tmp_path):
+    path = tmp_path / "session.jsonl"
+    path.write_bytes(b'{"kind": "log", "text": "old"}\n{"kind": "log", "te')
+
+    journal = SessionJournal.fresh(path)
+    journal.record("log", text="new session")
+    journal.close()
+    assert replay(path).log == ["new session"]
+    assert (tmp_path / "session.jsonl.prev").read_bytes().endswith(b'"te')
@@ -0,0 +1,40 @@
+from tavist.library import Opponent, OpponentLibrary, merge_bounds
+from tavist.tracking import ACTargetTracker
+
+
+def make_library(path):
+    library = OpponentLibrary(path)
+    library.upsert(Opponent.with_known_ac("Ogre", 17, cr=3, type="giant", hp=30))
+    library.upsert(Opponent("Ogre Mage", cr=8, type="giant", ac_lower=14, ac_upper=22))
+    library.upsert(Opponent("Goblin", cr=0.33, type="humanoid", ac_lower=10, ac_upper=16))
+    return library
+
+
+def test_lookup_by_prefix_fuzzy_and_cr(tmp_path):
+    library = make_library(tmp_path / "opponents.sqlite3")
+    assert [o.name for o in library.search("ogre")] == ["Ogre", "Ogre Mage"]
+    assert [o.name for o in library.search("gobiln")] == ["Goblin"]
+    assert [o.name for o in library.by_cr(1, 10)] == ["Ogre", "Ogre Mage"]
+    tracker = library.seed_tracker("OGRE")
+    assert (tracker.lower, tracker.upper, tracker.estimate()) == (16, 17, 17)
+    library.close()
+
+
+def test_learned_bounds_are_written_back(tmp_path):
+    path = tmp_path / "opponents.sqlite3"
+    library = make_library(path)
+    library.record_bounds("Ogre Mage", ACTargetTracker(lower=18, upper=30))
+    library.record_bounds("Troll", ACTargetTracker(lower=15, upper=16))
+    library.record_bounds("Nobody", ACTargetTracker())
+    library.close()
+
+    reopened = OpponentLibrary(path)
+    assert (reopened.get("Ogre Mage").ac_lower, reopened.get("Ogre Mage").ac_upper) == (18, 22)
+    assert reopened.get("troll").ac_upper == 16
+    assert reopened.get("Nobody") is None
+    reopened.close()
+
+
+def test_contradicting_bounds_replace_the_prior():
+    assert merge_bounds((16, 17), (18, 20)) == (18, 20)
+    assert merge_bounds((10, 30), (12, 40)) == (12, 30)
@@ -0,0 +1,40 @@
+import itertools
+
+import pytest
+
+from tavist import model
+from tavist.outcomes import attack_pmf, full_attack_outcomes, full_attack_pmf, pmf_mean, prob_at_least
+from tavist.target import Target
+
+
+def test_attack_pmf_matches_enumerating_every_roll():
+    # +10 to hit, threat on 19-20, 1d6 weapon + 2 against AC 20, DR 4
+    plan = (("slashing", ((1, 6, True),), 2),)
+    target = Target(dr=4)
+    brute: dict[int, float] = {}
+    for attack, confirm, a, b in itertools.product(range(1, 21), range(1, 21), range(1, 7), range(1, 7)):
+        hit = attack == 20 or (attack != 1 and attack + 10 >= 20)
+        crit = hit and attack >= 19 and (confirm == 20 or (confirm != 1 and confirm + 10 >= 20))
+        damage = max(0, (a + b + 4 if crit else a + 2) - 4) if hit else 0
+        brute[damage] = brute.get(damage, 0.0) + 1 / (400 * 36)
+
+    pmf = attack_pmf(10, 19, plan, target, 20)
+    assert set(pmf) == set(brute)
+    for value, p in brute.items():
+        assert pmf[value] == pytest.approx(p)
+
+
+@pytest.mark.parametrize("two_handed", [False, True])
+def test_full_attack_pmf_agrees_with_expected_damage(two_handed):
+    tavist = model.Tavist()
+    attacks = [12, 12, 7, 2]
+    target = Target(dr=5, concealment=20)
+    pmf = full_attack_pmf(tavist, 24, two_handed, attacks, target)
+
+    assert sum(pmf.values()) == pytest.approx(1)
+    assert prob_at_least(pmf, 0) == pytest.approx(1)
+    assert pmf_mean(pmf) == pytest.approx(model.expected_full_attack(tavist, 24, two_handed, attacks, [], target))
+    # the two +12 iteratives share one cached attack PMF
+    outcomes = full_attack_outcomes(tavist, two_handed, attacks)
+    assert outcomes[0] == outcomes[1]
+    assert len(outcomes) == (4 if two_handed else 5)
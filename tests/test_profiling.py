@@ -0,0 +1,24 @@
+import contextlib
+import io
+import pstats
+
+from tavist.model import Tavist
+from tavist.profiling import ProfileCapture, diff_snapshots
+
+
+def test_capture_writes_stats_and_attributes_growth(tmp_path):
+    tavist = Tavist()
+    retained = []
+    capture = ProfileCapture(tmp_path, gauges=lambda: {"results": len(retained)})
+    baseline = capture.start()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(200):
+            retained.append(tavist.katana_attack_action.do_attack())
+    written = capture.stop()
+
+    assert pstats.Stats(str(written["pstats"])).total_calls > 0
+    report = diff_snapshots(baseline, written["snapshot"])
+    assert "results: 200 (+200)" in report
+    growth = dict(line.strip().split(": ", 1) for line in report.splitlines()[1:3])
+    assert not growth["result dicts"].startswith("+0.0 KiB")
+    assert written["growth"].read_text() == report
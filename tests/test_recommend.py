@@ -0,0 +1,130 @@
+import pytest
+
+from tavist import model
+from tavist.recommend import (
+    AnytimeRecommender,
+    Prefetcher,
+    RecommendationCache,
+    coarse_to_fine,
+    recommend_joint_setup,
+    setup_modes,
+)
+
+
+def brute_force(tavist, ac, attacks, min_defense):
+    best = None
+    for two_handed in (False, True):
+        for expertise in range(min_defense, 6):
+            for pa in range(0, 13):
+                tavist.set_power_attack(pa)
+                tavist.combat_expertise.bonus = -expertise
+                dpr = model.expected_full_attack(tavist, ac, two_handed, attacks, [])
+                if best is None or dpr > best:
+                    best = dpr
+    tavist.set_power_attack(0)
+    tavist.combat_expertise.bonus = 0
+    return best
+
+
+@pytest.mark.parametrize("ac", [10, 22, 30, 40])
+@pytest.mark.parametrize("min_defense", [0, 3])
+def test_joint_setup_matches_exhaustive_grid(ac, min_defense):
+    tavist = model.Tavist()
+    attacks = [12, 12, 7, 2]
+    stats = {}
+    choice = recommend_joint_setup(tavist, ac, attacks, [], min_defense=min_defense, stats=stats)
+
+    assert choice.dpr == pytest.approx(brute_force(tavist, ac, attacks, min_defense))
+    # expertise only costs attack bonus and ties go to less, so the floor is always chosen
+    assert choice.expertise == min_defense
+    assert stats["evaluations"] < 2 * 13 * 6
+
+
+def test_joint_setup_agrees_with_recommend_setup_and_restores_state():
+    tavist = model.Tavist()
+    tavist.set_power_attack(4)
+    attacks = [12, 12, 7, 2]
+    names = ["first", "speed", "second", "third"]
+    choice = recommend_joint_setup(tavist, 22, attacks, names)
+
+    assert (choice.power_attack, choice.two_handed) == model.recommend_setup(tavist, 22, attacks, names)
+    assert tavist.power_attack_value == 4
+    assert tavist.combat_expertise.bonus == 0
+
+
+def test_anytime_recommender_refines_to_the_joint_optimum():
+    tavist = model.Tavist()
+    attacks = [12, 12, 7, 2]
+    recommender = AnytimeRecommender(tavist, 26, attacks, [], min_defense=1)
+
+    first = recommender.run(0.0)
+    assert recommender.evaluations == 1
+    assert not recommender.done
+
+    final = recommender.run()
+    assert recommender.done
+    assert final.dpr >= first.dpr
+    assert final.dpr == pytest.approx(recommend_joint_setup(tavist, 26, attacks, [], min_defense=1).dpr)
+
+
+def test_coarse_to_fine_visits_every_value_once():
+    order = coarse_to_fine(0, 12)
+    assert order[:3] == [0, 8, 12]
+    assert sorted(order) == list(range(13))
+
+
+def test_prefetcher_fills_cache_for_neighbouring_acs():
+    tavist = model.Tavist()
+    attacks = [12, 12, 7, 2]
+    modes = setup_modes(tavist, attacks)
+    cache = RecommendationCache()
+    prefetcher = Prefetcher(cache, radius=2)
+
+    prefetcher.schedule(modes, 20, extra_acs=[25])
+    assert prefetcher.pending == 6
+    while prefetcher.step(1.0):
+        pass
+
+    for ac in (18, 19, 20, 21, 22, 25):
+        assert cache.get(modes, ac, 0) == recommend_joint_setup(tavist, ac, attacks, [])
+    # a different configuration misses the cache
+    tavist.set_fatigued(True)
+    assert cache.get(setup_modes(tavist, attacks), 20, 0) is None
+
+
+def test_recommend_for_targets_covers_every_tracked_target():
+    from tavist.recommend import recommend_for_targets
+    from tavist.tracking import TrackerRegistry
+
+    tavist = model.Tavist()
+    attacks = [12, 12, 7, 2]
+    registry = TrackerRegistry()
+    for name, (lower, upper) in {"goblin": (14, 16), "dragon": (33, 35)}.items():
+        registry.add(name)
+        registry.trackers[name].record_miss(lower)
+        registry.trackers[name].record_hit(upper)
+
+    recs = recommend_for_targets(registry, tavist, attacks, [])
+    assert [(r.name, r.ac) for r in recs] == [("goblin", 15), ("dragon", 34)]
+    for rec in recs:
+        assert rec.best == recommend_joint_setup(tavist, rec.ac, attacks, [])
+        assert rec.current_dpr == pytest.approx(model.expected_full_attack(tavist, rec.ac, False, attacks, []))
+
+
+def test_damage_reduction_favours_more_power_attack():
+    from tavist.target import Target
+
+    tavist = model.Tavist()
+    attacks = [12, 12, 7, 2]
+    target = Target(dr=15)
+    plain = recommend_joint_setup(tavist, 22, attacks, [])
+    armored = recommend_joint_setup(tavist, 22, attacks, [], target=target)
+
+    assert armored.power_attack > plain.power_attack
+    best = 0.0
+    for two_handed in (False, True):
+        for pa in range(13):
+            tavist.set_power_attack(pa)
+            best = max(best, model.expected_full_attack(tavist, 22, two_handed, attacks, [], target))
+    assert armored.dpr == pytest.approx(best)
+    assert setup_modes(tavist, attacks, target) != setup_modes(tavist, attacks)
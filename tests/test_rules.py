@@ -119,25 +119,25 @@ def test_main_window_builds_offscreen(monkeypatch):
     qapp.quit()
 
 
+def click_tracking_button(window, text):
+    from PySide6.QtWidgets import QPushButton
+
+    for btn in window.tracking_panel.findChildren(QPushButton):
+        if not btn.isHidden() and text in btn.text():
+            btn.click()
+            return True
+    return False
+
+
 def test_tracking_dialog_updates_bounds(monkeypatch):
     import os
     os.environ["QT_QPA_PLATFORM"] = "offscreen"
-    from PySide6.QtWidgets import QApplication, QDialog, QPushButton
+    from PySide6.QtWidgets import QApplication
 
     import main as app_main
 
     qapp = QApplication.instance() or QApplication([])
 
-    def fake_exec(self):
-        # simulate clicking "All Misses"
-        for btn in self.findChildren(QPushButton):
-            if btn.text() == "All Misses":
-                btn.click()
-                break
-        return QDialog.Accepted
-
-    monkeypatch.setattr(QDialog, "exec", fake_exec)
-
     window = app_main.MainWindow()
     tavist = app_main.Tavist()
     tracker = app_main.ACTargetTracker()
@@ -147,6 +147,7 @@ def test_tracking_dialog_updates_bounds(monkeypatch):
     ]
 
     app_main.tracking_dialog(window, tavist, tracker, results, [12, 12, 7, 2], ["first", "speed", "second", "third"])
+    assert click_tracking_button(window, "All Misses")
 
     assert tracker.lower > 0  # bounds tightened after all misses
     qapp.quit()
@@ -181,21 +182,11 @@ def test_ac_tracker_equal_bounds():
 def test_tracking_dialog_single_candidate(monkeypatch):
     import os
     os.environ["QT_QPA_PLATFORM"] = "offscreen"
-    from PySide6.QtWidgets import QApplication, QDialog, QPushButton
+    from PySide6.QtWidgets import QApplication
     import main as app_main
 
     qapp = QApplication.instance() or QApplication([])
 
-    def fake_exec(self):
-        # simulate clicking the only button
-        for btn in self.findChildren(QPushButton):
-            if "AC" in btn.text():
-                btn.click()
-                break
-        return QDialog.Accepted
-
-    monkeypatch.setattr(QDialog, "exec", fake_exec)
-
     window = app_main.MainWindow()
     tavist = app_main.Tavist()
     tracker = app_main.ACTargetTracker()
@@ -206,6 +197,7 @@ def test_tracking_dialog_single_candidate(monkeypatch):
     ]
 
     app_main.tracking_dialog(window, tavist, tracker, results, [12, 12, 7, 2], ["first", "speed", "second", "third"])
+    assert click_tracking_button(window, "(AC 15)")
 
     assert tracker.upper == 15
     assert tracker.lower == 10
@@ -215,21 +207,11 @@ def test_tracking_dialog_single_candidate(monkeypatch):
 def test_tracking_dialog_two_candidates_choose_low(monkeypatch):
     import os
     os.environ["QT_QPA_PLATFORM"] = "offscreen"
-    from PySide6.QtWidgets import QApplication, QDialog, QPushButton
+    from PySide6.QtWidgets import QApplication
     import main as app_main
 
     qapp = QApplication.instance() or QApplication([])
 
-    def fake_exec(self):
-        # simulate clicking the lowest AC hit (AC 18), not the higher one
-        for btn in sorted(self.findChildren(QPushButton), key=lambda b: b.text()):
-            if "(AC 18)" in btn.text():
-                btn.click()
-                break
-        return QDialog.Accepted
-
-    monkeypatch.setattr(QDialog, "exec", fake_exec)
-
     window = app_main.MainWindow()
     tavist = app_main.Tavist()
     tracker = app_main.ACTargetTracker()
@@ -241,6 +223,7 @@ def test_tracking_dialog_two_candidates_choose_low(monkeypatch):
     ]
 
     app_main.tracking_dialog(window, tavist, tracker, results, [12, 12, 7, 2], ["first", "speed", "second", "third"])
+    assert click_tracking_button(window, "(AC 18)")
 
     # choosing 18 should set upper to 18 and leave lower at 10
     assert tracker.upper == 18
@@ -251,19 +234,11 @@ def test_tracking_dialog_two_candidates_choose_low(monkeypatch):
 def test_tracking_dialog_does_not_prompt_at_bound(monkeypatch):
     import os
     os.environ["QT_QPA_PLATFORM"] = "offscreen"
-    from PySide6.QtWidgets import QApplication, QDialog, QPushButton
+    from PySide6.QtWidgets import QApplication
     import main as app_main
 
     qapp = QApplication.instance() or QApplication([])
 
-    called = {"count": 0}
-
-    def fake_exec(self):
-        called["count"] += 1
-        return QDialog.Accepted
-
-    monkeypatch.setattr(QDialog, "exec", fake_exec)
-
     window = app_main.MainWindow()
     tavist = app_main.Tavist()
     tracker = app_main.ACTargetTracker()
@@ -271,8 +246,8 @@ def test_tracking_dialog_does_not_prompt_at_bound(monkeypatch):
     tracker.upper = 20
     results = [{"label": "hit", "attack_total": 20, "damage_normal": 5}]
 
-    app_main.tracking_dialog(window, tavist, tracker, results, [12, 12, 7, 2], ["first", "speed", "second", "third"])
-    assert called["count"] == 0
+    shown = app_main.tracking_dialog(window, tavist, tracker, results, [12, 12, 7, 2], ["first", "speed", "second", "third"])
+    assert not shown and window.tracking_panel.isHidden()
     # accumulator should count this as guaranteed
     app_main.accumulate_known_hits(tracker, results)
     assert tracker.damage_done == 5
@@ -322,7 +297,7 @@ def test_power_attack_lock(monkeypatch):
 def test_tracking_dialog_no_prompt_when_solved(monkeypatch):
     import os
     os.environ["QT_QPA_PLATFORM"] = "offscreen"
-    from PySide6.QtWidgets import QApplication, QDialog
+    from PySide6.QtWidgets import QApplication
     import main as app_main
 
     qapp = QApplication.instance() or QApplication([])
@@ -333,15 +308,8 @@ def test_tracking_dialog_no_prompt_when_solved(monkeypatch):
     tracker.upper = 20
     results = [{"label": "hit", "attack_total": 25}]
 
-    called = {"count": 0}
-
-    def fake_exec(self):
-        called["count"] += 1
-        return QDialog.Accepted
-
-    monkeypatch.setattr(QDialog, "exec", fake_exec)
-    app_main.tracking_dialog(window, tavist, tracker, results, [12, 12, 7, 2], ["first", "speed", "second", "third"])
-    assert called["count"] == 0
+    shown = app_main.tracking_dialog(window, tavist, tracker, results, [12, 12, 7, 2], ["first", "speed", "second", "third"])
+    assert not shown and window.tracking_panel.isHidden()
     qapp.quit()
 
 
@@ -368,21 +336,11 @@ def test_external_bonuses_applied(monkeypatch):
 def test_tracking_dialog_adds_damage(monkeypatch):
     import os
     os.environ["QT_QPA_PLATFORM"] = "offscreen"
-    from PySide6.QtWidgets import QApplication, QDialog, QPushButton
+    from PySide6.QtWidgets import QApplication
     import main as app_main
 
     qapp = QApplication.instance() or QApplication([])
 
-    def fake_exec(self):
-        # click the lowest AC hit (AC 15)
-        for btn in self.findChildren(QPushButton):
-            if "(AC 15)" in btn.text():
-                btn.click()
-                break
-        return QDialog.Accepted
-
-    monkeypatch.setattr(QDialog, "exec", fake_exec)
-
     window = app_main.MainWindow()
     tavist = app_main.Tavist()
     tracker = app_main.ACTargetTracker()
@@ -394,6 +352,7 @@ def test_tracking_dialog_adds_damage(monkeypatch):
     ]
 
     app_main.tracking_dialog(window, tavist, tracker, results, [12, 12, 7, 2], ["first", "speed", "second", "third"])
+    assert click_tracking_button(window, "(AC 15)")
 
     # Should accumulate only hits >= chosen (15 and 25)
     assert tracker.damage_done == 15
@@ -403,21 +362,11 @@ def test_tracking_dialog_adds_damage(monkeypatch):
 def test_tracking_dialog_crit_confirm_logic(monkeypatch):
     import os
     os.environ["QT_QPA_PLATFORM"] = "offscreen"
-    from PySide6.QtWidgets import QApplication, QDialog, QPushButton
+    from PySide6.QtWidgets import QApplication
     import main as app_main
 
     qapp = QApplication.instance() or QApplication([])
 
-    def fake_exec(self):
-        # click the crit threat
-        for btn in self.findChildren(QPushButton):
-            if "(AC 18)" in btn.text():
-                btn.click()
-                break
-        return QDialog.Accepted
-
-    monkeypatch.setattr(QDialog, "exec", fake_exec)
-
     window = app_main.MainWindow()
     tavist = app_main.Tavist()
     tracker = app_main.ACTargetTracker()
@@ -428,6 +377,7 @@ def test_tracking_dialog_crit_confirm_logic(monkeypatch):
     ]
 
     app_main.tracking_dialog(window, tavist, tracker, results, [12, 12, 7, 2], ["first", "speed", "second", "third"])
+    assert click_tracking_button(window, "(AC 18)")
 
     # confirm >= bound, so crit damage should be counted
     assert tracker.damage_done == 9
@@ -437,23 +387,10 @@ def test_tracking_dialog_crit_confirm_logic(monkeypatch):
 def test_tracking_dialog_prompts_on_confirm_within_bounds(monkeypatch):
     import os
     os.environ["QT_QPA_PLATFORM"] = "offscreen"
-    from PySide6.QtWidgets import QApplication, QDialog, QPushButton
+    from PySide6.QtWidgets import QApplication
     import main as app_main
 
     qapp = QApplication.instance() or QApplication([])
-    called = {"count": 0}
-
-    def fake_exec(self):
-        called["count"] += 1
-        # click the only button (crit threat with confirm in range)
-        for btn in self.findChildren(QPushButton):
-            if "(AC 30)" in btn.text():
-                btn.click()
-                break
-        return QDialog.Accepted
-
-    monkeypatch.setattr(QDialog, "exec", fake_exec)
-
     window = app_main.MainWindow()
     tavist = app_main.Tavist()
     tracker = app_main.ACTargetTracker()
@@ -463,9 +400,10 @@ def test_tracking_dialog_prompts_on_confirm_within_bounds(monkeypatch):
         {"label": "crit", "attack_total": 30, "damage_normal": 5, "damage_critical": 11, "threat": True, "confirm_total": 18},
     ]
 
-    app_main.tracking_dialog(window, tavist, tracker, results, [12, 12, 7, 2], ["first", "speed", "second", "third"])
+    shown = app_main.tracking_dialog(window, tavist, tracker, results, [12, 12, 7, 2], ["first", "speed", "second", "third"])
+    assert click_tracking_button(window, "(AC 30)")
 
-    assert called["count"] == 1
+    assert shown
     # upper should tighten to confirm total
     assert tracker.upper == 18
     assert tracker.damage_done == 11
@@ -562,3 +500,388 @@ def test_new_opponent_resets_damage(monkeypatch):
     assert tracker.damage_done == 0
     assert "0" in window.damage_done.text()
     qapp.quit()
+
+
+def test_expected_full_attack_by_ac_matches_per_face_loop():
+    tavist = model.Tavist()
+    attacks = [12, 12, 7, 2]
+    tavist.set_power_attack(5)
+
+    def brute_force(profile, ac):
+        hits = [r for r in range(1, 21) if r != 1 and (r == 20 or r + profile.attack_bonus >= ac)]
+        threats = [r for r in hits if r >= profile.critical_threshold]
+        extra = profile.mean_crit - profile.mean_normal
+        return len(hits) / 20 * profile.mean_normal + len(threats) / 20 * len(hits) / 20 * extra
+
+    acs = list(range(0, 60))
+    for two_handed in (False, True):
+        profiles = model.full_attack_profiles(tavist, two_handed, attacks)
+        curve = model.expected_full_attack_by_ac(tavist, acs, two_handed, attacks)
+        for ac, dpr in zip(acs, curve):
+            assert dpr == pytest.approx(sum(brute_force(p, ac) for p in profiles))
+            assert dpr == pytest.approx(model.expected_full_attack(tavist, ac, two_handed, attacks, []))
+    assert tavist.power_attack_value == 5
+
+
+def test_off_hand_attacks_at_the_top_iterative():
+    from tavist.controller import full_attack_sequence
+
+    tavist = model.Tavist()
+    baseline = model.attack_profile(tavist.wakasashi_attack_action).attack_bonus  # BAB 12, as the baseline GUI used
+    assert model.full_attack_profiles(tavist, False, [12, 12, 7, 2])[-1].attack_bonus == baseline
+    # a customised list moves the off-hand with its top bonus rather than staying at 12
+    assert model.full_attack_profiles(tavist, False, [10, 5])[-1].attack_bonus == baseline - 2
+    assert full_attack_sequence(tavist, [10, 5], ["first", "second"])[-1][1:] == ("off-hand", 10)
+
+
+def make_crit_mode_action(mode):
+    attack = model.AttackRoll(bonuses=[model.Bonus(5, model.BonusType.BAB)], critical_threshold=19)
+    damage = model.DamageRoll(
+        type=model.DamageType.SLASHING,
+        dice=[model.WeaponDamageDice(d=6, label="weapon"), model.DamageDice(d=6, label="holy")],
+        bonuses=[model.Bonus(2, model.BonusType.ENHANCEMENT)],
+    )
+    return model.AttackAction(label="test", attack=attack, damage=damage, crit_damage=mode)
+
+
+def test_lazy_crit_damage_skips_crit_roll_without_threat(monkeypatch):
+    # attack 10 (no threat), normal weapon 3, holy 2; nothing else may be rolled
+    monkeypatch.setattr(model, "randint", make_randint([10, 3, 2]))
+    result = make_crit_mode_action(model.CritDamageMode.LAZY).do_attack()
+
+    assert result["threat"] is False
+    assert result["damage_normal"] == 7
+    assert result["damage_critical"] is None
+    assert result["breakdown_critical"] == {}
+
+
+def test_derived_crit_damage_reuses_normal_roll(monkeypatch):
+    # attack 19 (threat), confirm 15, normal weapon 3, holy 2, one extra weapon die 5
+    monkeypatch.setattr(model, "randint", make_randint([19, 15, 3, 2, 5]))
+    result = make_crit_mode_action(model.CritDamageMode.DERIVED).do_attack()
+
+    assert result["damage_normal"] == 7
+    assert result["damage_critical"] == 3 + 5 + 2 + 4
+    assert result["breakdown_critical"] == {"slashing": 12, "holy": 2}
+
+
+def test_tracker_registry_keeps_each_target():
+    from tavist.tracking import TrackerRegistry
+
+    registry = TrackerRegistry()
+    first = registry.add()
+    ogre = registry.add("Ogre")
+    assert registry.add("Ogre") == "Ogre 2"
+    assert registry.active == first
+
+    registry.switch(ogre).record_hit(20)
+    registry.current.damage_done = 12
+    registry.switch(first).record_miss(15)
+    assert (registry.trackers[ogre].upper, registry.trackers[ogre].damage_done) == (20, 12)
+    assert registry.current.lower == 15
+    assert registry.total_damage() == 12
+
+    registry.remove(first)
+    assert registry.active == ogre
+
+
+def test_new_opponent_keeps_previous_target(monkeypatch):
+    import os
+    os.environ["QT_QPA_PLATFORM"] = "offscreen"
+    from PySide6.QtWidgets import QApplication
+    import main as app_main
+    from tavist.tracking import TrackerRegistry
+
+    qapp = QApplication.instance() or QApplication([])
+    window = app_main.MainWindow()
+    tavist = app_main.Tavist()
+    registry = TrackerRegistry()
+    window._targets = registry
+    window._ac_tracker = registry.switch(registry.add())
+    window._ac_tracker.damage_done = 20
+    window._ac_tracker.record_hit(22)
+
+    app_main.wrap_auto_recommend(window, tavist, [12, 12, 7, 2], ["first", "speed", "second", "third"])()
+    assert registry.names() == ["Opponent 1", "Opponent 2"]
+    assert window._ac_tracker is registry.trackers["Opponent 2"]
+    assert window._ac_tracker.damage_done == 0
+    assert registry.trackers["Opponent 1"].upper == 22
+
+    app_main.switch_target(window, tavist, [12, 12, 7, 2], ["first", "speed", "second", "third"])("Opponent 1")
+    assert window._ac_tracker.damage_done == 20
+    assert "Opponent 2" in window.target_select.toolTip()
+    qapp.quit()
+
+
+def test_new_opponent_seeds_tracker_from_library(monkeypatch):
+    import os
+    os.environ["QT_QPA_PLATFORM"] = "offscreen"
+    from PySide6.QtWidgets import QApplication
+    import main as app_main
+    from tavist.library import Opponent, OpponentLibrary
+    from tavist.tracking import TrackerRegistry
+
+    qapp = QApplication.instance() or QApplication([])
+    window = app_main.MainWindow()
+    tavist = app_main.Tavist()
+    registry = TrackerRegistry()
+    window._targets = registry
+    window._ac_tracker = registry.switch(registry.add())
+    window._library = OpponentLibrary(":memory:")
+    window._library.upsert(Opponent("Hill Giant", cr=7, ac_lower=19, ac_upper=21))
+    window._library_targets = {}
+
+    window.opponent_name.setText("hill gaint")
+    app_main.wrap_auto_recommend(window, tavist, [12, 12, 7, 2], ["first", "speed", "second", "third"])()
+    assert registry.active == "Hill Giant"
+    assert (window._ac_tracker.lower, window._ac_tracker.upper) == (19, 21)
+    assert window.target_ac.text() == "20"
+
+    window._ac_tracker.record_hit(20)
+    app_main.update_dpr_label(window, tavist, [12, 12, 7, 2], ["first", "speed", "second", "third"])
+    window._library.flush()
+    assert window._library.get("Hill Giant").ac_upper == 20
+    window._library.close()
+    qapp.quit()
+
+
+def test_tracking_panel_reuses_its_buttons():
+    import os
+    os.environ["QT_QPA_PLATFORM"] = "offscreen"
+    from PySide6.QtWidgets import QApplication
+    import main as app_main
+
+    qapp = QApplication.instance() or QApplication([])
+    window = app_main.MainWindow()
+    tavist = app_main.Tavist()
+    tracker = app_main.ACTargetTracker()
+    attacks, names = [12, 12, 7, 2], ["first", "speed", "second", "third"]
+    full = [{"label": f"a{n}", "attack_total": total} for n, total in enumerate([30, 25, 20, 15, 10])]
+
+    assert app_main.tracking_dialog(window, tavist, tracker, full, attacks, names)
+    pool = list(window.tracking_panel.buttons)
+    assert app_main.tracking_dialog(window, tavist, tracker, full[3:], attacks, names)
+    assert window.tracking_panel.buttons == pool
+    assert [b.text() for b in pool if not b.isHidden()] == ["a4 (AC 10)", "a3 (AC 15)"]
+    assert click_tracking_button(window, "(AC 15)")
+    assert (tracker.lower, tracker.upper) == (10, 15)
+    assert window.tracking_panel.isHidden()
+    qapp.quit()
+
+
+def test_attack_lines_rerender_when_bounds_tighten():
+    import os
+    os.environ["QT_QPA_PLATFORM"] = "offscreen"
+    from PySide6.QtWidgets import QApplication
+    import main as app_main
+
+    qapp = QApplication.instance() or QApplication([])
+    window = app_main.MainWindow()
+    tracker = app_main.ACTargetTracker()
+    base = {"threat": False, "confirm_total": None, "damage_normal": 5, "breakdown_normal": {"slashing": 5}, "breakdown_critical": {}}
+    for label, total in [("high", 25), ("low", 15)]:
+        app_main.append_attack_line(window, {**base, "label": label, "attack_total": total}, tracker)
+        app_main.append_log(window, "")
+    blocks = lambda: window.log_output.toPlainText().split("\n")
+    assert blocks()[0].startswith("high: hits AC 25") and blocks()[2].startswith("low: hits AC 15")
+
+    tracker.record_hit(20)
+    app_main.refresh_attack_lines(window)
+    assert blocks()[0].startswith("* high: hits AC 25")
+    assert blocks()[2].startswith("low: hits AC 15")
+    assert window.log_output.document().findBlockByNumber(0).begin().fragment().charFormat().fontWeight() > 400
+    qapp.quit()
+
+
+def test_rerendered_attack_lines_are_journaled(tmp_path):
+    import os
+    os.environ["QT_QPA_PLATFORM"] = "offscreen"
+    from PySide6.QtWidgets import QApplication
+    import main as app_main
+    from tavist.journal import SessionJournal, replay
+
+    qapp = QApplication.instance() or QApplication([])
+    window = app_main.MainWindow()
+    path = tmp_path / "session.jsonl"
+    earlier = SessionJournal(path)
+    earlier.record("log", text="restored line")
+    earlier.close()
+    journal, state = SessionJournal.restore(path)
+    app_main.restore_session(window, state)
+    window._journal = journal
+    tracker = app_main.ACTargetTracker()
+    base = {"threat": False, "confirm_total": None, "damage_normal": 5, "breakdown_normal": {"slashing": 5}, "breakdown_critical": {}}
+    for label, total in [("high", 25), ("low", 15)]:
+        app_main.append_attack_line(window, {**base, "label": label, "attack_total": total}, tracker)
+
+    tracker.record_hit(20)
+    app_main.refresh_attack_lines(window)
+    journal.close()
+    # the next restore shows the lines as they read now, not as first rolled
+    log = replay(path).log
+    assert log[0] == "restored line"
+    assert log[1].startswith("* **high: hits AC 25") and log[2].startswith("low: hits AC 15")
+    assert [text for _, text in window._attack_lines[0].lines.values()] == log[1:]
+    qapp.quit()
+
+
+def test_typed_bonuses_do_not_stack():
+    from tavist.model import Bonus, BonusType, resolve_bonuses
+
+    morale_small = Bonus(1, BonusType.MORALE, "bless")
+    morale_big = Bonus(2, BonusType.MORALE, "heroism")
+    resolved = resolve_bonuses(
+        [
+            Bonus(2, BonusType.ENHANCEMENT),
+            morale_small,
+            morale_big,
+            Bonus(1, BonusType.DODGE),
+            Bonus(1, BonusType.DODGE),
+            Bonus(-1, BonusType.LUCK),
+            Bonus(-3, BonusType.LUCK),
+            Bonus(4, BonusType.ABILITY),
+            Bonus(-1, BonusType.ABILITY),
+        ]
+    )
+    assert resolved.total == 2 + 2 + 2 - 3 + 3
+    assert morale_big in resolved.applied and not any(b is morale_small for b in resolved.applied)
+
+
+def test_resolved_totals_follow_bonus_changes():
+    tavist = model.Tavist()
+    before = model.attack_profile(tavist.katana_attack_action).attack_bonus
+    tavist.katana_attack.bonuses.append(model.Bonus(3, model.BonusType.ENHANCEMENT, "greater magic weapon"))
+    assert model.attack_profile(tavist.katana_attack_action).attack_bonus == before + 1
+    tavist.set_power_attack(4)
+    assert model.attack_profile(tavist.katana_attack_action).attack_bonus == before - 3
+    tavist.katana_attack.bonuses.pop()
+    assert model.attack_profile(tavist.katana_attack_action).attack_bonus == before - 4
+
+
+def test_rolled_dice_keep_what_was_rolled_after_toggles(monkeypatch):
+    tavist = model.Tavist()
+    monkeypatch.setattr(model, "randint", make_randint([7, 3, 2, 1, 6, 4, 5]))
+    rolled = tavist.katana_damage.roll(critical=True)
+    damage_bonus = tavist.katana_damage.resolved_bonuses().total
+
+    # "Evil" adds the holy dice and Power Attack edits a live bonus
+    tavist.katana_damage.dice.append(tavist.holy_dice)
+    tavist.set_power_attack(6)
+    assert rolled.rolls == [[7, 3], [2]]
+    assert [die.label for die in rolled.dice] == ["weapon", "merciful"]
+    assert sum(b.bonus for b in rolled.bonuses) == damage_bonus
+    assert rolled.total == 12 + 2 * damage_bonus
+
+    again = tavist.katana_damage.roll()
+    assert len(again.dice) == 3 and again.offsets == (0, 1, 2, 4)
+    assert list(again.group(2)) == [4, 5]
+
+
+def test_results_table_sorts_and_filters_on_the_model():
+    import os
+    os.environ["QT_QPA_PLATFORM"] = "offscreen"
+    from PySide6.QtCore import Qt
+    from PySide6.QtWidgets import QApplication
+    import main as app_main
+
+    qapp = QApplication.instance() or QApplication([])
+    window = app_main.MainWindow()
+    table = window.results_model
+    base = {"threat": False, "confirm_total": None, "damage_critical": None, "breakdown_critical": {}}
+    table.append_round([
+        {**base, "label": "first", "attack_total": 20, "attack_die": 8, "damage_normal": 9, "breakdown_normal": {"slashing": 9}},
+        {**base, "label": "off-hand", "attack_total": 14, "attack_die": 4, "damage_normal": 5, "breakdown_normal": {"piercing": 5}},
+    ])
+    assert [table.headerData(c, Qt.Horizontal) for c in range(8, table.columnCount())] == ["piercing", "slashing"]
+
+    table.sort(2, Qt.DescendingOrder)
+    # rows arriving while sorted land in place
+    table.append_round([
+        {**base, "label": "first", "attack_total": 30, "attack_die": 20, "damage_normal": 12,
+         "breakdown_normal": {"slashing": 9, "fire": 3}, "threat": True, "confirm_total": 18,
+         "damage_critical": 21, "breakdown_critical": {"slashing": 18, "fire": 3}},
+    ])
+    assert [r["attack_total"] for r in table.rows()] == [30, 20, 14]
+    assert table.data(table.index(0, 0)) == "2"
+    # new labels are appended as columns, so earlier ones keep their place
+    assert table.headerData(10, Qt.Horizontal) == "fire"
+    assert table.data(table.index(0, 9)) == "9 / 18"
+
+    table.set_filter("first threat fire>=3")
+    assert [r["attack_total"] for r in table.rows()] == [30]
+    with pytest.raises(ValueError):
+        table.set_filter("total>=high")
+    with pytest.raises(ValueError):
+        table.set_filter("label>3")
+    # even a filter that blows up mid-rebuild closes the reset it opened
+    resets = []
+    table.modelReset.connect(lambda: resets.append(True))
+    table._filter = lambda r: r["missing"]
+    with pytest.raises(KeyError):
+        table._rebuild()
+    assert resets == [True]
+    table.set_filter("")
+    assert table.rowCount() == 3
+    qapp.quit()
+
+
+def test_cancelled_or_replaced_prompt_keeps_certain_hit_damage():
+    import os
+    os.environ["QT_QPA_PLATFORM"] = "offscreen"
+    from PySide6.QtWidgets import QApplication
+    import main as app_main
+
+    qapp = QApplication.instance() or QApplication([])
+    window = app_main.MainWindow()
+    tavist = app_main.Tavist()
+    tracker = app_main.ACTargetTracker(lower=10, upper=20)
+    attacks, names = [12, 12, 7, 2], ["first", "speed", "second", "third"]
+    base = {"threat": False, "confirm_total": None, "damage_critical": None}
+    results = [
+        {**base, "label": "sure", "attack_total": 25, "damage_normal": 7},
+        {**base, "label": "maybe", "attack_total": 15, "damage_normal": 5},
+    ]
+
+    assert app_main.tracking_dialog(window, tavist, tracker, results, attacks, names)
+    assert click_tracking_button(window, "Cancel")
+    assert tracker.damage_done == 7 and window.tracking_panel.isHidden()
+    assert (tracker.lower, tracker.upper) == (10, 20)
+
+    # the next attack's prompt replaces one that was never answered
+    assert app_main.tracking_dialog(window, tavist, tracker, results, attacks, names)
+    assert app_main.tracking_dialog(window, tavist, tracker, results[1:], attacks, names)
+    assert tracker.damage_done == 14
+    assert click_tracking_button(window, "(AC 15)")
+    assert tracker.damage_done == 19
+    qapp.quit()
+
+
+def test_tracked_hits_are_counted_after_the_answer_moves_the_bounds():
+    import os
+    os.environ["QT_QPA_PLATFORM"] = "offscreen"
+    from PySide6.QtWidgets import QApplication
+    import main as app_main
+
+    qapp = QApplication.instance() or QApplication([])
+    window = app_main.MainWindow()
+    window._stats = (app_main.CombatStats(), app_main.CombatStats())
+    window._targets = app_main.TrackerRegistry()
+    tavist = app_main.Tavist()
+    tracker = app_main.ACTargetTracker(lower=10, upper=99)
+    window._ac_tracker = tracker
+    window.tracking.setChecked(True)
+    attacks, names = [12, 12, 7, 2], ["first", "speed", "second", "third"]
+    base = {"threat": False, "confirm_total": None, "damage_critical": None, "breakdown_normal": {}}
+    results = [
+        {**base, "label": "first", "attack_total": 25, "attack_die": 12, "damage_normal": 7},
+        {**base, "label": "second", "attack_total": 15, "attack_die": 2, "damage_normal": 5},
+    ]
+
+    app_main.record_round_stats(window, tavist, results, attacks, names, full=True)
+    session = window._stats[0]
+    # the bounds know nothing yet, so the rolls are counted but not judged
+    assert (session.attacks, session.hits, session.misses) == (2, 0, 0)
+    assert app_main.tracking_dialog(window, tavist, tracker, results, attacks, names)
+    assert click_tracking_button(window, "(AC 25)")
+    assert (session.hits, session.misses) == (1, 1)
+    qapp.quit()
@@ -0,0 +1,136 @@
+import asyncio
+import json
+import struct
+
+import pytest
+
+from tavist.loadtest import StandInClient, StandInSubscriber, run_load
+from tavist.server import RollService, apply_mask, encode_frame, parse_acs, read_frame, start_server
+
+
+async def with_service(scenario):
+    service = RollService()
+    server = await start_server(service, "127.0.0.1", 0)
+    try:
+        return await scenario(service, server.sockets[0].getsockname()[1])
+    finally:
+        server.close()
+        await server.wait_closed()
+
+
+def test_full_attack_is_pushed_to_subscribers():
+    async def scenario(service, port):
+        listener = StandInSubscriber("127.0.0.1", port)
+        await listener.connect()
+        listen_task = asyncio.create_task(listener.listen())
+        await asyncio.sleep(0.01)
+
+        client = StandInClient("127.0.0.1", port)
+        await client.connect()
+        status, payload = await client.request("POST", "/full-attack")
+        await asyncio.sleep(0.01)
+        await listener.close()
+        await listen_task
+        await client.close()
+        return status, payload, listener.events
+
+    status, payload, events = asyncio.run(with_service(scenario))
+    assert status == 200
+    assert len(payload["results"]) == 5  # four iteratives plus the off-hand
+    assert [e["type"] for e in events] == ["full_attack"]
+    assert events[0]["lines"] == payload["lines"]
+
+
+def test_dpr_table_and_tracker_routes():
+    async def scenario(service, port):
+        client = StandInClient("127.0.0.1", port)
+        await client.connect()
+        dpr = await client.request("GET", "/dpr?acs=20-22")
+        tracker = await client.request("POST", "/tracker", {"hit": 25, "miss": 18})
+        missing = await client.request("GET", "/nope")
+        wrong_method = await client.request("GET", "/attack")
+        await client.close()
+        return dpr, tracker, missing, wrong_method
+
+    dpr, tracker, missing, wrong_method = asyncio.run(with_service(scenario))
+    assert dpr[0] == 200 and [row["ac"] for row in dpr[1]["rows"]] == [20, 21, 22]
+    assert tracker[1]["lower"] == 18 and tracker[1]["upper"] == 25
+    assert missing[0] == 404
+    assert wrong_method[0] == 405
+
+
+def test_bad_requests_are_rejected_with_400():
+    async def scenario(service, port):
+        client = StandInClient("127.0.0.1", port)
+        await client.connect()
+        not_an_object = await client.request("POST", "/tracker", [1])
+        too_wide = await client.request("GET", "/dpr?acs=0-200000")
+        still_serving = await client.request("GET", "/state")
+        await client.close()
+        return not_an_object, too_wide, still_serving
+
+    not_an_object, too_wide, still_serving = asyncio.run(with_service(scenario))
+    assert not_an_object[0] == 400
+    assert too_wide[0] == 400 and "at most 61" in too_wide[1]["error"]
+    assert still_serving[0] == 200
+
+
+def test_unanswered_round_keeps_its_certain_hits():
+    service = RollService()
+    service.update_tracker({"hit": 20, "miss": 10})
+    base = {"threat": False, "confirm_total": None, "damage_critical": None, "breakdown_critical": {}}
+    results = [
+        {**base, "label": "sure", "attack_total": 25, "damage_normal": 7, "breakdown_normal": {"slashing": 7}},
+        {**base, "label": "maybe", "attack_total": 15, "damage_normal": 5, "breakdown_normal": {"slashing": 5}},
+    ]
+    assert service._resolve("attack", results)["candidates"] == [15]
+    # a second attack without a selection supersedes the first prompt
+    service._resolve("attack", [dict(r) for r in results])
+    assert service.tracker.damage_done == 7
+    service.update_tracker({"selection": {"total": 15}})
+    assert service.tracker.damage_done == 12
+
+
+@pytest.mark.parametrize("selection", [[1], "15", 15, {"total": "15"}, {"total": True}, {"pick": 15}])
+def test_malformed_selection_is_a_400(selection):
+    service = RollService()
+    status, payload = service.dispatch("POST", "/tracker", {}, json.dumps({"selection": selection}).encode())
+    assert status == 400 and "selection" in payload["error"]
+
+
+def test_ac_lists_are_capped_and_unique():
+    assert parse_acs({"ac": ["20", "22"]}) == [20, 22]
+    with pytest.raises(ValueError):
+        parse_acs({"ac": [str(ac) for ac in range(62)]})
+    with pytest.raises(ValueError):
+        parse_acs({"ac": ["20", "20"]})
+
+
+def test_oversized_frames_are_closed_with_1009():
+    async def scenario(service, port):
+        listener = StandInSubscriber("127.0.0.1", port)
+        await listener.connect()
+        # claims an 8 GiB payload; the service must refuse it before buffering anything
+        listener.writer.write(bytes([0x81, 0x80 | 127]) + struct.pack("!Q", 1 << 33) + b"\x00" * 4)
+        await listener.writer.drain()
+        opcode, payload = await read_frame(listener.reader)
+        listener.writer.close()
+        return opcode, payload
+
+    opcode, payload = asyncio.run(with_service(scenario))
+    assert opcode == 0x8 and struct.unpack("!H", payload) == (1009,)
+
+
+def test_masked_frames_round_trip():
+    frame = encode_frame(b"hello", mask=b"\x01\x02\x03\x04")
+    assert frame[1] == 0x80 | 5
+    assert bytes(b ^ m for b, m in zip(frame[6:], b"\x01\x02\x03\x04\x01")) == b"hello"
+    assert apply_mask(apply_mask(b"hello", b"\x01\x02\x03\x04"), b"\x01\x02\x03\x04") == b"hello"
+    assert apply_mask(b"", b"\x01\x02\x03\x04") == b""
+
+
+def test_load_script_serves_concurrent_clients():
+    stats = asyncio.run(run_load(clients=8, requests=5, subscribers=3))
+    assert stats["requests"] == 40
+    assert stats["errors"] == 0
+    assert stats["events_per_subscriber"] > 0
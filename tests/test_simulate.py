@@ -0,0 +1,80 @@
+import io
+import json
+import random
+from itertools import islice
+
+import pytest
+
+from tavist import model
+from tavist.outcomes import full_attack_pmf, prob_at_least
+from tavist.simulate import (
+    ATTACK_NAMES,
+    ATTACKS,
+    adaptive_estimate,
+    batched,
+    encounter_rounds,
+    full_attack_stream,
+    power_attack_candidates,
+    soak,
+)
+
+
+def test_streams_are_lazy_and_restore_bab(capsys):
+    tavist = model.Tavist()
+    rounds = full_attack_stream(tavist, ATTACKS, ATTACK_NAMES)
+    first = list(islice(rounds, 3))
+    assert [len(r) for r in first] == [5, 5, 5]
+    assert [r["label"] for r in first[0]] == ATTACK_NAMES + ["off-hand"]
+    assert tavist.bab.bonus == 12
+    assert capsys.readouterr().out == ""
+    # streams only roll crit damage on a threat, and leave the GUI's mode as it was
+    assert all(r["damage_critical"] is None for r in first[0] + first[1] + first[2] if not r["threat"])
+    assert tavist.katana_attack_action.crit_damage is model.CritDamageMode.INDEPENDENT
+    assert [len(b) for b in batched(range(7), 3)] == [3, 3, 1]
+
+
+def test_soak_matches_expected_damage(monkeypatch):
+    # real dice, whatever an earlier test left patched in
+    monkeypatch.setattr(model, "randint", random.randint)
+    random.seed(4)
+    tavist = model.Tavist()
+    out = io.StringIO()
+    rounds = encounter_rounds(
+        tavist, 25, ATTACKS, ATTACK_NAMES, rounds=4000, rng=random.Random(1), crit_mode=model.CritDamageMode.DERIVED
+    )
+    stats = soak(rounds, 25, batch_size=256, out=out)
+    assert stats.damage.n == 4000
+    assert stats.attacks == 4000 * 5
+    # the mean of the simulated rounds lands within a few standard errors of the closed form
+    assert stats.damage.mean == pytest.approx(stats.expected.mean, abs=4 * stats.damage.stdev / 4000**0.5)
+    lines = out.getvalue().splitlines()
+    assert len(lines) == 4000 and json.loads(lines[-1])["round"] == 3999
+
+
+def test_adaptive_estimate_stops_at_the_requested_width():
+    tavist = model.Tavist()
+    candidates = power_attack_candidates(tavist, ATTACKS, [0, 3])
+    result = adaptive_estimate(candidates, 25, dpr_width=0.5, time_budget=10, rng=random.Random(3))
+    assert result.converged
+    for pa, metrics in result.estimates.items():
+        tavist.set_power_attack(pa)
+        exact = model.expected_full_attack(tavist, 25, False, ATTACKS, ATTACK_NAMES)
+        assert metrics["dpr"].half_width <= 0.5
+        assert abs(metrics["dpr"].mean - exact) <= 2 * metrics["dpr"].half_width
+    # independent rolls would leave the difference about 1.4 times as wide as either mean
+    assert result.estimates[3]["dpr_delta"].half_width < result.estimates[3]["dpr"].half_width * 0.75
+
+
+def test_kill_chance_in_the_natural_20_tail():
+    tavist = model.Tavist()
+    tavist.set_power_attack(4)
+    exact = prob_at_least(full_attack_pmf(tavist, 38, False, ATTACKS), 60)
+    candidates = power_attack_candidates(tavist, ATTACKS, [4])
+    result = adaptive_estimate(
+        candidates, 38, kill_hp=60, dpr_width=1.0, kill_width=0.1, time_budget=10, rng=random.Random(5)
+    )
+    kill = result.estimates[4]["kill"]
+    assert result.converged and kill.half_width <= 0.1 * exact * 1.1
+    assert abs(kill.mean - exact) <= 2 * kill.half_width
+    # uniform rolls would need around 230k rounds for a 10% interval on a 0.17% chance
+    assert kill.trials < 30000
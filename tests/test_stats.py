@@ -0,0 +1,38 @@
+import random
+import statistics
+
+from tavist.stats import CombatStats, D20Tally, Welford, load_history, save_history
+from tavist.tracking import ACTargetTracker
+
+
+def test_running_statistics_match_a_full_rescan():
+    rng = random.Random(7)
+    values = [rng.gauss(40, 12) for _ in range(500)]
+    faces = [rng.randint(1, 20) for _ in range(500)]
+    welford, tally = Welford(), D20Tally()
+    for value, face in zip(values, faces):
+        welford.add(value)
+        tally.add(face)
+
+    assert abs(welford.mean - statistics.fmean(values)) < 1e-9
+    assert abs(welford.variance - statistics.variance(values)) < 1e-6
+    expected = len(faces) / 20
+    chi = sum((faces.count(f) - expected) ** 2 / expected for f in range(1, 21))
+    assert abs(tally.chi_square - chi) < 1e-9
+    assert abs(tally.mean - statistics.fmean(faces)) < 1e-12
+
+
+def test_hits_and_confirms_count_only_when_the_bounds_settle_them(tmp_path):
+    stats = CombatStats()
+    tracker = ACTargetTracker(lower=18, upper=22)
+    stats.record_attack({"attack_die": 15, "attack_total": 30, "threat": True, "confirm_total": 25}, tracker)
+    stats.record_attack({"attack_die": 4, "attack_total": 16, "threat": False, "confirm_total": None}, tracker)
+    stats.record_attack({"attack_die": 9, "attack_total": 20, "threat": False, "confirm_total": None}, tracker)
+    stats.record_attack({"attack_die": 19, "attack_total": 34, "threat": True, "confirm_total": 12}, tracker)
+    stats.record_round(55, 48.5)
+
+    assert (stats.hits, stats.misses, stats.hit_rate) == (2, 1, 2 / 3)
+    assert (stats.threats, stats.confirmed, stats.unconfirmed) == (2, 1, 1)
+    save_history(stats, tmp_path / "stats.json")
+    assert load_history(tmp_path / "stats.json") == stats
+    assert load_history(tmp_path / "missing.json") == CombatStats()
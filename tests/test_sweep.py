@@ -0,0 +1,40 @@
+import pytest
+
+from tavist import model
+from tavist.sweep import SweepSpec, iterative_attacks, manifest_path, read_binary, sweep
+
+
+def test_binary_table_matches_expected_full_attack(tmp_path):
+    assert iterative_attacks(12) == [12, 12, 7, 2]
+    spec = SweepSpec(levels=(12,), acs=(20, 25), buffs=("surge",), format="bin")
+    assert sweep(spec, tmp_path / "table.bin", workers=2) == 2
+
+    rows = list(read_binary(tmp_path / "table.bin"))
+    assert len(rows) == 2 * 2 * 13 * 2
+    tavist = model.Tavist()
+    for _, level, mask, two_handed, pa, ac, dpr in rows:
+        if mask:
+            tavist.set_power_attack(pa)
+            expected = model.expected_full_attack(tavist, ac, bool(two_handed), [12, 12, 7, 2], [])
+            assert dpr == pytest.approx(expected, rel=1e-6)
+
+
+def test_interrupted_csv_sweep_resumes_to_the_same_table(tmp_path):
+    spec = SweepSpec(levels=(1, 2, 3), acs=(15, 20))
+    output = tmp_path / "table.csv"
+    sweep(spec, output, workers=1)
+    complete = output.read_text()
+
+    # cut the run short mid-unit: a torn manifest line and a partly written chunk
+    manifest = manifest_path(output)
+    lines = manifest.read_text().splitlines(keepends=True)
+    manifest.write_text("".join(lines[:6]) + lines[6][:5])
+    with open(output, "a") as fh:
+        fh.write("tavist,3,evil,")
+
+    assert sweep(spec, output, workers=2) == len(spec.units()) - 5
+    assert output.read_text() == complete
+    # the resumed manifest is whole again, so another run finds nothing left to do
+    assert sweep(spec, output, workers=1) == 0
+    with pytest.raises(ValueError):
+        sweep(SweepSpec(levels=(1,), acs=(15, 20)), output, workers=1)
@@ -0,0 +1,48 @@
+import random
+
+import pytest
+
+from tavist import model
+from tavist.controller import compute_damage_for_ac
+from tavist.target import Target, parse_target_spec, sample_hit_damage
+
+
+def test_parse_target_spec():
+    target = parse_target_spec("DR 10/slashing or piercing, fire 5, 20%")
+    assert target == Target(10, frozenset({"slashing", "piercing"}), (("fire", 5),), 20)
+    assert parse_target_spec("DR 5/-").dr_bypass == frozenset()
+    assert parse_target_spec("") == Target()
+    with pytest.raises(ValueError):
+        parse_target_spec("DR five")
+
+
+def test_exact_means_clip_each_hit_and_match_sampling():
+    tavist = model.Tavist()
+    damage = tavist.katana_attack_action.damage
+    bonus = damage.resolved_bonuses().total
+    target = Target(dr=20, concealment=50)
+
+    # d10 weapon + d6 merciful + flat bonus, DR comes off the whole hit but never below 0
+    brute = sum(max(0, w + m + bonus - 20) for w in range(1, 11) for m in range(1, 7)) / 60
+    normal, crit = target.hit_means(damage)
+    assert normal == pytest.approx(brute / 2)
+    # the clipped low rolls make this more than the plain mean less the DR
+    assert normal > (model.attack_profile(tavist.katana_attack_action).mean_normal - 20) / 2
+
+    samples = sample_hit_damage(tavist.katana_attack_action, target, 40000, True, random.Random(7))
+    assert sum(samples) / len(samples) == pytest.approx(crit, rel=0.05)
+
+
+def test_compute_damage_for_ac_reduces_every_hit():
+    hit = {
+        "attack_total": 30,
+        "threat": False,
+        "confirm_total": None,
+        "breakdown_normal": {"slashing": 8, "fire": 4},
+        "breakdown_critical": {},
+    }
+    target = parse_target_spec("DR 5/piercing, fire 10")
+
+    assert compute_damage_for_ac([hit, hit], 20) == (24, {"slashing": 16, "fire": 8})
+    assert compute_damage_for_ac([hit, hit], 20, target) == (6, {"slashing": 6, "fire": 0})
+    assert compute_damage_for_ac([hit], 20, parse_target_spec("DR 5/slashing")) == (12, hit["breakdown_normal"])